@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+benchmarks.py – micro-benchmarks for the DnDBot and Open5eClient hot paths.
+
+Run from the repository root, e.g.:
+    python old/benchmarks.py roll-many --rolls 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+
+import bot
+import lazy_json
+import storage
+from bot import DnDBot
+from open5eclient import JSONDict, Open5eClient
+from srd_mirror import SRDMirror
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    """Returns the fastest wall-clock time (seconds) of `repeat` calls to fn."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(title: str, timings: Dict[str, float]) -> None:
+    """Prints timings in milliseconds, with the speedup relative to the first entry."""
+    print(title)
+    baseline = next(iter(timings.values()))
+    for label, seconds in timings.items():
+        print(f"  {label:<28} {seconds * 1000:10.3f} ms   x{baseline / seconds:7.1f}")
+
+
+def bench_roll_many(args: argparse.Namespace) -> None:
+    """Per-call DnDBot.roll loop versus a single DnDBot.roll_many batch."""
+    dnd = DnDBot()
+    scenarios = {
+        f"{args.rolls} goblin attacks (1d20+4, adv)": (["1d20+4"] * args.rolls, True),
+        f"{args.rolls} fireballs (8d6)": (["8d6"] * args.rolls, False),
+        f"{args.rolls} mixed damage rolls": ((["1d8+3", "2d6+2", "1d12", "20d6"] * args.rolls)[:args.rolls], False),
+    }
+    for title, (specs, adv) in scenarios.items():
+        report(title, {
+            "roll() per call": best_of(lambda: [dnd.roll(s, advantage=adv) for s in specs], args.repeat),
+            "roll_many()": best_of(lambda: dnd.roll_many(specs, advantage=adv), args.repeat),
+        })
+
+
+def bench_dice_cache(args: argparse.Namespace) -> None:
+    """Rolling a repeated stat-block line with a cold versus a warm plan cache."""
+    dnd = DnDBot()
+    expression = "2d6+1d4+3"
+
+    def cold():
+        for _ in range(args.rolls):
+            bot._compile_normalized.cache_clear()
+            dnd.roll(expression)
+
+    def warm():
+        for _ in range(args.rolls):
+            dnd.roll(expression)
+
+    report(f"{args.rolls} rolls of '{expression}'", {
+        "parse every call": best_of(cold, args.repeat),
+        "cached plan": best_of(warm, args.repeat),
+    })
+
+
+def bench_dice_odds(args: argparse.Namespace) -> None:
+    """Monte Carlo odds from repeated roll() calls versus the exact dice_odds calculator."""
+    dnd = DnDBot()
+    expression, target = "8d6", 30
+
+    def monte_carlo():
+        return sum(dnd.roll(expression)["total"] >= target for _ in range(args.samples)) / args.samples
+
+    report(f"P({expression} >= {target})", {
+        f"{args.samples} roll() samples": best_of(monte_carlo, args.repeat),
+        "dice_odds() exact": best_of(lambda: dnd.dice_odds(expression, target=target), args.repeat),
+    })
+
+
+def bench_initiative(args: argparse.Namespace) -> None:
+    """Per-operation cost of add/lookup/damage/remove as the encounter grows."""
+    print("encounter size   add (us)   damage (us)   remove (us)")
+    for size in args.sizes:
+        dnd = DnDBot()
+        names = [f"Minion_{i}" for i in range(size)]
+        inits = [random.randint(1, 25) for _ in range(size)]
+        start = time.perf_counter()
+        for name, init in zip(names, inits):
+            dnd.add_combatant(name, init, 7, npc=True)
+        added = time.perf_counter()
+        for name in names:
+            dnd.deal_damage(name, 1)
+        damaged = time.perf_counter()
+        for name in reversed(names):
+            dnd.remove_combatant(name)
+        removed = time.perf_counter()
+        print(f"{size:>14} {(added - start) / size * 1e6:10.2f} {(damaged - added) / size * 1e6:13.2f} {(removed - damaged) / size * 1e6:13.2f}")
+
+
+def populated_bot(size: int) -> DnDBot:
+    """A bot with `size` minions, every third one carrying a status effect."""
+    dnd = DnDBot()
+    for i in range(size):
+        dnd.add_combatant(f"Minion_{i}", random.randint(1, 25), 7, npc=True)
+        if i % 3 == 0:
+            dnd.add_status_effect(f"Minion_{i}", "Frightened", duration_rounds=3)
+    return dnd
+
+
+def allocated_bytes(build: Callable[[], object]) -> int:
+    """Bytes still allocated by the object that build() returns."""
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def bench_combatants(args: argparse.Namespace) -> None:
+    """Memory of the slotted Combatant model versus the saved dict format, plus state round trips."""
+    for size in args.sizes:
+        dnd = populated_bot(size)
+        state = dnd.get_full_state()
+        saved = state["initiative_order"]
+        objects = allocated_bytes(lambda: [bot.Combatant.from_dict(c) for c in saved])
+        dicts = allocated_bytes(lambda: [c.to_dict() for c in dnd.combatants])
+        print(f"{size} combatants: {objects / size:.0f} B each as Combatant, {dicts / size:.0f} B each as dicts")
+        report(f"{size} combatants state round trip", {
+            "get_full_state()": best_of(dnd.get_full_state, args.repeat),
+            "load_full_state()": best_of(lambda: DnDBot().load_full_state(state), args.repeat),
+        })
+
+
+def bench_effects(args: argparse.Namespace) -> None:
+    """Cost of next_turn when every combatant carries long-running effects."""
+    print("encounter size   next_turn (us)")
+    for size in args.sizes:
+        dnd = populated_bot(size)
+        for i in range(size):
+            dnd.add_status_effect(f"Minion_{i}", "Blessed", duration_rounds=100)
+        turns = size * 3
+        start = time.perf_counter()
+        for _ in range(turns):
+            dnd.next_turn()
+        print(f"{size:>14} {(time.perf_counter() - start) / turns * 1e6:16.2f}")
+
+
+def bench_state_delta(args: argparse.Namespace) -> None:
+    """Bytes and time to persist one action: full snapshot versus operation-log delta."""
+    for size in args.sizes:
+        dnd = populated_bot(size)
+        version = dnd.state_version
+        dnd.deal_damage("Minion_0", 3)
+        snapshot = json.dumps(dnd.get_full_state(), separators=(",", ":"))
+        delta = json.dumps(dnd.get_state_delta(version), separators=(",", ":"))
+        print(f"{size} combatants, one deal_damage: snapshot {len(snapshot)} B, delta {len(delta)} B")
+        report(f"{size} combatants encode per action", {
+            "json(get_full_state())": best_of(lambda: json.dumps(dnd.get_full_state()), args.repeat),
+            "json(get_state_delta())": best_of(lambda: json.dumps(dnd.get_state_delta(version)), args.repeat),
+        })
+
+
+def bench_serialize(args: argparse.Namespace) -> None:
+    """Encode/decode time and bytes of a full state snapshot per available serializer."""
+    missing = [name for name in ("json", "orjson", "msgpack") if name not in storage.SERIALIZERS]
+    if missing:
+        print(f"Not installed, skipped: {', '.join(missing)}")
+    for size in args.sizes:
+        dnd = populated_bot(size)
+        for i in range(0, size, 2):
+            dnd.add_status_effect(f"Minion_{i}", "Blessed", duration_rounds=10, notes="+1d4 to attacks and saves")
+            dnd.deal_damage(f"Minion_{i}", 2)
+        state = dnd.get_full_state()
+        encoded = {name: storage.encode(state, name) for name in storage.SERIALIZERS}
+        print(f"{size} combatants: " + ", ".join(f"{name} {len(raw)} B" for name, raw in encoded.items()))
+        report(f"{size} combatants encode", {
+            name: best_of(lambda name=name: storage.encode(state, name), args.repeat) for name in encoded})
+        report(f"{size} combatants decode", {
+            name: best_of(lambda name=name, raw=raw: storage.SERIALIZERS[name].loads(storage.decode_record(raw)[1]),
+                          args.repeat)
+            for name, raw in encoded.items()})
+
+
+def bench_lazy_load(args: argparse.Namespace) -> None:
+    """Fetching one NPC from a large campaign file: full load versus the lazy memory-mapped index."""
+    path = os.path.join(tempfile.mkdtemp(), "campaign.json")
+    campaign = {"id": "camp_bench", "title": "Bench", "players": [], "locations": [], "factions": [], "quests": [],
+                "lastSession": 0, "npcs": [{"id": f"npc_{i}", "name": f"NPC {i}", "loc": f"loc_{i % 50}",
+                                            "notes": [f"Rumour {j} about NPC {i}" for j in range(args.notes)]}
+                                           for i in range(args.npcs)]}
+    storage.write_json(path, campaign)
+    target = f"npc_{args.npcs // 2}"
+    print(f"{args.npcs} NPCs, {os.path.getsize(path)} B")
+    full = allocated_bytes(lambda: storage.read_json(path))
+    lazy = allocated_bytes(lambda: lazy_json.LazyJSONFile(path))
+    print(f"  memory: full load {full / 1e6:.1f} MB, lazy index {lazy / 1e6:.1f} MB")
+    opened = lazy_json.LazyJSONFile(path)
+    report(f"find {target}", {
+        "read_json() + scan": best_of(lambda: next(n for n in storage.read_json(path)["npcs"] if n["id"] == target), args.repeat),
+        "LazyJSONFile() + find()": best_of(lambda: lazy_json.LazyJSONFile(path).find("npcs", target), args.repeat),
+        "find() on an open file": best_of(lambda: opened.find("npcs", target), args.repeat),
+    })
+    opened.close()
+
+
+def bench_search(args: argparse.Namespace) -> None:
+    """Local FTS search over a synced mirror versus the remote /v2/search/ endpoint."""
+    mirror = SRDMirror(args.db)
+    client = Open5eClient(use_cache=False)
+    for query in args.queries:
+        timings = {
+            "SRDMirror.search() (FTS5)": best_of(lambda: mirror.search(query), args.repeat),
+            "name LIKE scan": best_of(lambda: mirror._search_names(query, None, 50), args.repeat),
+        }
+        try:
+            timings["Open5eClient.search()"] = best_of(lambda: client.search(query), args.repeat)
+        except requests.RequestException as e:
+            print(f"  (remote search unavailable: {e})")
+        report(f"search '{query}' ({len(mirror.search(query))} local results)", timings)
+    mirror.close()
+
+
+def fixture_key(path: str, query: str = "") -> str:
+    """Normalized 'path?query' key for a recorded response."""
+    items = sorted(parse_qsl(query))
+    return f"{path}?{urlencode(items)}" if items else path
+
+
+def synthetic_fixtures(creatures: int, page_size: int = 50) -> Dict[str, JSONDict]:
+    """Deterministic stand-in for a recording: paginated creatures plus lookup resources."""
+    rng = random.Random(5)
+    sizes = ["tiny", "small", "medium", "large", "huge"]
+    documents = ["srd", "tob", "cc"]
+    fixtures: Dict[str, JSONDict] = {}
+    docs = []
+    for i in range(creatures):
+        doc = {
+            "key": f"creature-{i}", "name": f"Creature {i}", "url": f"https://api.open5e.com/v2/creatures/creature-{i}/",
+            "document": f"https://api.open5e.com/v2/documents/{rng.choice(documents)}/", "size": rng.choice(sizes),
+            "armor_class": rng.randint(10, 20), "hit_points": rng.randint(5, 300), "challenge_rating_decimal": rng.randint(0, 20),
+            "desc": "Lorem ipsum dolor sit amet. " * rng.randint(5, 40),
+            "actions": [{"name": "Bite", "attacks": [{"name": "Bite", "to_hit_mod": 5, "damage_die_count": 2,
+                                                      "damage_die_type": "D8", "damage_bonus": 3, "damage_type": "piercing"}]}],
+        }
+        docs.append(doc)
+        fixtures[f"/v2/creatures/{doc['key']}/"] = doc
+    pages = max(1, -(-creatures // page_size))
+    for page in range(1, pages + 1):
+        body = {
+            "count": creatures,
+            "next": f"https://api.open5e.com/v2/creatures/?page={page + 1}" if page < pages else None,
+            "previous": None,
+            "results": docs[(page - 1) * page_size:page * page_size],
+        }
+        fixtures[fixture_key("/v2/creatures/", f"page={page}" if page > 1 else "")] = body
+    for resource, keys in (("sizes", sizes), ("documents", documents), ("damagetypes", ["piercing"])):
+        fixtures[f"/v2/{resource}/"] = {"count": len(keys), "next": None, "previous": None,
+                                        "results": [{"key": key, "name": key.title()} for key in keys]}
+        for key in keys:
+            fixtures[f"/v2/{resource}/{key}/"] = {"key": key, "name": key.title()}
+    return fixtures
+
+
+def record_fixtures(path: str, creatures: int) -> None:
+    """Record the API responses the open5e benchmark needs into a JSON fixtures file."""
+    client = Open5eClient(use_cache=False)
+    fixtures: Dict[str, JSONDict] = {}
+
+    def keep(response, *args, **kwargs):
+        if response.ok:
+            url = urlparse(response.url)
+            fixtures[fixture_key(url.path, url.query)] = response.json()
+
+    client.session.hooks["response"].append(keep)
+    listed = client.get_creatures(paginate=True)
+    for creature in listed[:creatures]:
+        client.get_creature(creature["key"])
+    client.resolve_references(listed[:creatures])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f)
+    print(f"Recorded {len(fixtures)} responses to {path}")
+
+
+def fixture_server(fixtures: Dict[str, JSONDict], latency: float) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve fixtures on a local port, adding `latency` seconds to every response."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            body = fixtures.get(fixture_key(url.path, url.query))
+            time.sleep(latency)
+            payload = json.dumps(body).encode() if body is not None else b""
+            self.send_response(200 if body is not None else 404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def bench_open5e(args: argparse.Namespace) -> None:
+    """Open5eClient paths against a local fixture server, with the client's own stats."""
+    if args.record:
+        record_fixtures(args.record, args.creatures)
+        return
+    if args.fixtures:
+        with open(args.fixtures, "r", encoding="utf-8") as f:
+            fixtures = json.load(f)
+    else:
+        fixtures = synthetic_fixtures(args.creatures)
+    server, url = fixture_server(fixtures, args.latency / 1000)
+    keys = [c["key"] for c in Open5eClient(url, use_cache=False).get_creatures(paginate=True)][:args.creatures]
+
+    def fresh(**kwargs) -> Open5eClient:
+        return Open5eClient(url, **kwargs)
+
+    report(f"list all creatures ({args.latency} ms per response)", {
+        "serial pages": best_of(lambda: fresh(use_cache=False, page_workers=1).get_creatures(paginate=True), args.repeat),
+        "concurrent pages": best_of(lambda: fresh(use_cache=False).get_creatures(paginate=True), args.repeat),
+    })
+    warm = fresh()
+    for key in keys:
+        warm.get_creature(key)
+    report(f"get_creature x{len(keys)}", {
+        "no cache": best_of(lambda: [fresh(use_cache=False).get_creature(k) for k in keys], args.repeat),
+        "warm cache": best_of(lambda: [warm.get_creature(k) for k in keys], args.repeat),
+    })
+    listed = fresh().get_creatures(paginate=True)[:args.creatures]
+    report(f"resolve references of {len(listed)} creatures", {
+        "one get per reference": best_of(lambda: [fresh(use_cache=False)._make_request(f"/v2/documents/{c['document'].rstrip('/').rsplit('/', 1)[-1]}/")
+                                                  for c in listed if isinstance(c.get("document"), str)], args.repeat),
+        "resolve_references()": best_of(lambda: fresh().resolve_references(listed), args.repeat),
+    })
+
+    # One instrumented session for the stats breakdown
+    client = fresh()
+    client.get_creatures(paginate=True)
+    for key in keys:
+        client.get_creature(key)
+        client.get_creature(key)
+    client.resolve_references(listed)
+    stats = client.stats()
+    print("client.stats()")
+    for template, endpoint in stats["endpoints"].items():
+        print(f"  {template:<26} {endpoint['requests']:>5} req  {endpoint['bytes']:>9} B  mean {endpoint['mean_ms']:8.3f} ms"
+              f"  p95 <={endpoint['p95_ms']} ms  {endpoint['sources']}")
+    print(f"  pagination {stats['pagination']}  cache hit ratio {stats['cache']['hit_ratio']:.2%}")
+    server.shutdown()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--repeat", type=int, default=5, help="Runs per timing (best is reported)")
+    sub = p.add_subparsers(dest="benchmark", required=True)
+
+    roll_many = sub.add_parser("roll-many", help="Bulk dice engine vs per-call roll")
+    roll_many.add_argument("--rolls", type=int, default=1000, help="Rolls per batch")
+    roll_many.set_defaults(func=bench_roll_many)
+
+    dice_cache = sub.add_parser("dice-cache", help="Compiled dice plans with and without the LRU cache")
+    dice_cache.add_argument("--rolls", type=int, default=1000, help="Rolls per timing")
+    dice_cache.set_defaults(func=bench_dice_cache)
+
+    dice_odds = sub.add_parser("dice-odds", help="Exact dice distributions vs Monte Carlo sampling")
+    dice_odds.add_argument("--samples", type=int, default=10000, help="Monte Carlo samples")
+    dice_odds.set_defaults(func=bench_dice_odds)
+
+    initiative = sub.add_parser("initiative", help="Initiative tracker scaling with encounter size")
+    initiative.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000], help="Encounter sizes")
+    initiative.set_defaults(func=bench_initiative)
+
+    combatants = sub.add_parser("combatants", help="Combatant model memory and state serialization")
+    combatants.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="Encounter sizes")
+    combatants.set_defaults(func=bench_combatants)
+
+    effects = sub.add_parser("effects", help="Status effect expiry cost per turn")
+    effects.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000], help="Encounter sizes")
+    effects.set_defaults(func=bench_effects)
+
+    state_delta = sub.add_parser("state-delta", help="Full snapshots vs incremental state deltas")
+    state_delta.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Encounter sizes")
+    state_delta.set_defaults(func=bench_state_delta)
+
+    serialize = sub.add_parser("serialize", help="State snapshot encode/decode per serializer")
+    serialize.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Encounter sizes")
+    serialize.set_defaults(func=bench_serialize)
+
+    lazy_load = sub.add_parser("lazy-load", help="Full campaign file load vs the lazy memory-mapped index")
+    lazy_load.add_argument("--npcs", type=int, default=20000, help="NPCs in the generated campaign")
+    lazy_load.add_argument("--notes", type=int, default=20, help="Notes per NPC")
+    lazy_load.set_defaults(func=bench_lazy_load)
+
+    search = sub.add_parser("search", help="Local full-text search vs the remote search endpoint")
+    search.add_argument("--db", default="srd.db", help="Mirror database built by 'srd_mirror.py sync'")
+    search.add_argument("--queries", nargs="+", default=["fireball", "dragon", "fire bal", "gobln"], help="Queries to time")
+    search.set_defaults(func=bench_search)
+
+    open5e = sub.add_parser("open5e", help="Open5eClient against a local fixture server")
+    open5e.add_argument("--fixtures", help="Recorded responses (JSON); default: synthetic fixtures")
+    open5e.add_argument("--record", metavar="PATH", help="Record fixtures from the live API to PATH and exit")
+    open5e.add_argument("--creatures", type=int, default=200, help="Creatures to fetch individually")
+    open5e.add_argument("--latency", type=float, default=20, help="Added server latency per response (ms)")
+    open5e.set_defaults(func=bench_open5e)
+
+    args = p.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,610 @@
+import bisect
+import copy
+import heapq
 import random
 import re
-from typing import List, Dict, Any, Optional, Tuple
+import types
+from dataclasses import dataclass, field
+from collections import deque
+from functools import lru_cache, wraps
+from typing import Callable, ClassVar, List, Dict, Any, Mapping, Optional, Sequence, Tuple, Union
 from datetime import datetime
 import unicodedata
 import json # For an internal method to demonstrate JSON string export/import
 import os
+import numpy as np
+
+import lazy_json
+import storage
+from campaign_store import CampaignStore
+from session_archive import SessionArchive
+
+# --- Dice Expressions ---
+# Grammar: terms joined by + or -, where a term is a flat number or a dice group
+#   [N]dM[khK|klK][!][r[o][<|>]V]    e.g. '2d6+1d4+3', '4d6kh3', '1d6!', '2d6ro<2', 'd%'
+#   khK/klK  keep the K highest/lowest dice (K defaults to 1)
+#   !        exploding: a die showing its max face is rolled again and added
+#   rV       reroll while the die shows V; 'r<V' means V or lower, 'r>V' means V or higher
+#   roV      reroll once instead of until the condition fails
+_TERM_RE = re.compile(r"([+-])?(?:(\d*)d(\d+|%)((?:k[hl]?\d*|!|ro?[<>]?\d+)*)|(\d+))")
+_DICE_MOD_RE = re.compile(r"k([hl]?)(\d*)|(!)|r(o?)([<>]?)(\d+)")
+MAX_EXPLOSIONS = 100  # Per die, so a lucky streak can't loop forever
+DICE_PLAN_CACHE_SIZE = 512
+STATE_LOG_LIMIT = 1000  # Operations kept in memory for get_state_delta
+STATE_LOG_COMPACT_OPS = 200  # save_state_delta rewrites the snapshot after this many logged operations
+UNDO_LIMIT = 100  # Actions kept on the undo journal
+
+@dataclass(frozen=True)
+class DiceTerm:
+    """One dice group of a compiled expression, e.g. the '4d6kh3' in '4d6kh3+2'."""
+    sign: int
+    num: int
+    die: int
+    keep: Optional[Tuple[str, int]] = None  # ("h" or "l", count)
+    explode: bool = False
+    reroll: Optional[Tuple[str, int, bool]] = None  # (comparison "<", ">" or "=", value, once)
+
+    @property
+    def plain(self) -> bool:
+        """True if the group is a bare NdM with no keep, explode or reroll modifiers."""
+        return self.keep is None and not self.explode and self.reroll is None
+
+    def rerolls(self, value: int) -> bool:
+        """True if a die showing value must be rerolled."""
+        op, target, _ = self.reroll
+        if op == "<":
+            return value <= target
+        if op == ">":
+            return value >= target
+        return value == target
+
+@dataclass(frozen=True)
+class DicePlan:
+    """A compiled dice expression: the dice groups plus the summed flat modifier."""
+    expression: str
+    terms: Tuple[DiceTerm, ...]
+    modifier: int
+
+    @property
+    def dice_sizes(self) -> frozenset:
+        return frozenset(t.die for t in self.terms)
+
+    @property
+    def single_d20(self) -> bool:
+        """True if the plan is one plain d20 plus a modifier, the shape advantage applies to."""
+        return len(self.terms) == 1 and self.terms[0] == DiceTerm(1, 1, 20)
+
+def normalize_dice_expression(expression: str) -> str:
+    """Strips whitespace and lowercases a dice expression; this is the plan cache key."""
+    return expression.replace(' ', '').lower()
+
+@lru_cache(maxsize=DICE_PLAN_CACHE_SIZE)
+def _compile_normalized(expression: str) -> DicePlan:
+    terms = []
+    modifier = 0
+    pos = 0
+    while pos < len(expression):
+        match = _TERM_RE.match(expression, pos)
+        if not match or match.end() == pos or (pos > 0 and not match.group(1)):
+            raise ValueError(f"Invalid dice expression near '{expression[pos:]}'.")
+        sign_str, num_str, die_str, mods, flat = match.groups()
+        sign = -1 if sign_str == "-" else 1
+        pos = match.end()
+        if flat is not None:
+            modifier += sign * int(flat)
+            continue
+
+        num = int(num_str) if num_str else 1
+        die = 100 if die_str == "%" else int(die_str)
+        keep = reroll = None
+        explode = False
+        for mod in _DICE_MOD_RE.finditer(mods):
+            keep_dir, keep_count, bang, once, op, value = mod.groups()
+            if bang:
+                if explode:
+                    raise ValueError("A dice group can only explode once.")
+                explode = True
+            elif value is not None:
+                if reroll:
+                    raise ValueError("Only one reroll rule is allowed per dice group.")
+                reroll = (op or "=", int(value), bool(once))
+            else:
+                if keep:
+                    raise ValueError("Only one keep rule is allowed per dice group.")
+                keep = (keep_dir or "h", min(int(keep_count) if keep_count else 1, num))
+        term = DiceTerm(sign, num, die, keep, explode, reroll)
+        if reroll and not reroll[2] and all(term.rerolls(v) for v in range(1, die + 1)):
+            raise ValueError(f"Reroll rule would reroll every face of a d{die}.")
+        terms.append(term)
+
+    if not expression:
+        raise ValueError("Empty dice expression.")
+    return DicePlan(expression, tuple(terms), modifier)
+
+def compile_dice_expression(expression: str) -> DicePlan:
+    """
+    Compiles a dice expression into a reusable DicePlan. Plans are kept in a bounded
+    LRU cache keyed by the normalized expression, so repeated stat-block lines skip parsing.
+    Raises:
+        ValueError: If the expression does not match the grammar.
+    """
+    return _compile_normalized(normalize_dice_expression(expression))
+
+def _roll_term(term: DiceTerm, randint: Callable[[int, int], int]) -> Tuple[List[int], List[int]]:
+    """Rolls one dice group. Returns (kept, dropped) die values."""
+    values = []
+    for _ in range(term.num):
+        value = randint(1, term.die)
+        if term.reroll:
+            if term.reroll[2]:
+                if term.rerolls(value):
+                    value = randint(1, term.die)
+            else:
+                while term.rerolls(value):
+                    value = randint(1, term.die)
+        if term.explode:
+            face, chain = value, 0
+            while face == term.die and chain < MAX_EXPLOSIONS:
+                face = randint(1, term.die)
+                value += face
+                chain += 1
+        values.append(value)
+    if not term.keep:
+        return values, []
+    direction, count = term.keep
+    order = sorted(range(len(values)), key=values.__getitem__, reverse=(direction == "h"))
+    kept_idx = set(order[:count])
+    kept = [v for i, v in enumerate(values) if i in kept_idx]
+    dropped = [v for i, v in enumerate(values) if i not in kept_idx]
+    return kept, dropped
+
+def _roll_term_batch(term: DiceTerm, count: int, rng: np.random.Generator) -> np.ndarray:
+    """Rolls one dice group `count` times at once. Returns the signed subtotal per roll."""
+    dice = rng.integers(1, term.die + 1, size=(count, term.num))
+    if term.reroll:
+        op, target, once = term.reroll
+        condition = {"<": np.less_equal, ">": np.greater_equal, "=": np.equal}[op]
+        mask = condition(dice, target)
+        while mask.any():
+            dice[mask] = rng.integers(1, term.die + 1, size=int(mask.sum()))
+            if once:
+                break
+            mask = condition(dice, target)
+    if term.explode:
+        live = dice == term.die
+        for _ in range(MAX_EXPLOSIONS):
+            if not live.any():
+                break
+            faces = rng.integers(1, term.die + 1, size=int(live.sum()))
+            dice[live] += faces
+            live[live] = faces == term.die
+    if term.keep:
+        direction, keep_count = term.keep
+        dice = np.sort(dice, axis=1)
+        dice = dice[:, dice.shape[1] - keep_count:] if direction == "h" else dice[:, :keep_count] # -0: would keep all
+    return term.sign * dice.sum(axis=1)
+
+
+# --- Exact Dice Distributions ---
+# A PMF is (offset, probs): probs[i] is the chance of rolling offset + i.
+PMF = Tuple[int, np.ndarray]
+PMF_TAIL_EPSILON = 1e-15  # Exploding chains stop once the remaining mass is below this
+
+def _frozen(probs: np.ndarray) -> np.ndarray:
+    probs.flags.writeable = False
+    return probs
+
+@lru_cache(maxsize=None)
+def _die_pmf(die: int, explode: bool, reroll: Optional[Tuple[str, int, bool]]) -> np.ndarray:
+    """PMF of a single die after reroll and explode rules; index is the die's value."""
+    probs = np.zeros(die + 1)
+    probs[1:] = 1.0 / die
+    if reroll:
+        term = DiceTerm(1, 1, die, reroll=reroll)
+        rerolled = np.array([v > 0 and term.rerolls(v) for v in range(die + 1)])
+        if reroll[2]:
+            # A face in the reroll set is replaced by one fresh uniform roll
+            probs = np.where(rerolled, 0.0, probs) + rerolled.sum() / die / die
+            probs[0] = 0.0
+        else:
+            probs = np.where(rerolled, 0.0, 1.0 / (die - rerolled.sum()))
+            probs[0] = 0.0
+    if explode:
+        # Extra rolls are plain faces; each max face adds `die` and rolls again
+        uniform = np.zeros(die + 1)
+        uniform[1:die] = 1.0 / die
+        result = probs.copy()
+        result[die] = 0.0
+        carry, shift = probs[die], die
+        for _ in range(MAX_EXPLOSIONS):
+            if carry < PMF_TAIL_EPSILON:
+                break
+            result = np.pad(result, (0, shift + die + 1 - len(result)))
+            result[shift:shift + die + 1] += carry * uniform
+            carry /= die
+            shift += die
+        result = np.pad(result, (0, shift + 1 - len(result)))
+        result[shift] += carry
+        probs = result
+    return _frozen(probs)
+
+def _keep_pmf(face_probs: np.ndarray, num: int, direction: str, keep: int) -> np.ndarray:
+    """
+    PMF of the sum of the kept dice for num dice sharing face_probs. Walks the faces from
+    best to worst, choosing how many dice land on each, so no outcome is enumerated.
+    """
+    faces = [v for v in range(len(face_probs)) if face_probs[v] > 0]
+    if direction == "h":
+        faces.reverse()
+    binom = [[1.0] * (r + 1) for r in range(num + 1)]
+    for r in range(num + 1):
+        for c in range(1, r):
+            binom[r][c] = binom[r - 1][c - 1] + binom[r - 1][c]
+    # state: (dice still unassigned, dice kept so far) -> PMF of the kept sum
+    states = {(num, 0): np.ones(1)}
+    for face in faces:
+        p = face_probs[face]
+        next_states: Dict[Tuple[int, int], np.ndarray] = {}
+        for (remaining, kept), sums in states.items():
+            for c in range(remaining + 1):
+                weight = binom[remaining][c] * p ** c
+                if weight == 0.0:
+                    continue
+                taken = min(c, keep - kept)
+                key = (remaining - c, kept + taken)
+                shifted = np.pad(sums * weight, (face * taken, 0))
+                current = next_states.get(key)
+                if current is None:
+                    next_states[key] = shifted
+                else:
+                    size = max(len(current), len(shifted))
+                    next_states[key] = np.pad(current, (0, size - len(current))) + np.pad(shifted, (0, size - len(shifted)))
+        states = next_states
+    return states.get((0, keep), np.ones(1))
+
+@lru_cache(maxsize=None)
+def _sum_pmf(die: int, explode: bool, reroll: Optional[Tuple[str, int, bool]], num: int) -> np.ndarray:
+    """PMF of the sum of num identical dice, built by repeated squaring of the single-die PMF."""
+    if num == 0:
+        return _frozen(np.ones(1))
+    if num == 1:
+        return _die_pmf(die, explode, reroll)
+    half = _sum_pmf(die, explode, reroll, num // 2)
+    probs = np.convolve(half, half)
+    if num % 2:
+        probs = np.convolve(probs, _die_pmf(die, explode, reroll))
+    return _frozen(probs)
+
+@lru_cache(maxsize=DICE_PLAN_CACHE_SIZE)
+def _term_pmf(term: DiceTerm) -> PMF:
+    if term.keep:
+        probs = _keep_pmf(_die_pmf(term.die, term.explode, term.reroll), term.num, *term.keep)
+    else:
+        probs = _sum_pmf(term.die, term.explode, term.reroll, term.num)
+    if term.sign < 0:
+        return -(len(probs) - 1), _frozen(probs[::-1].copy())
+    return 0, probs
+
+@lru_cache(maxsize=DICE_PLAN_CACHE_SIZE)
+def dice_plan_pmf(plan: DicePlan) -> PMF:
+    """Exact distribution of a compiled plan's total, memoized per plan and per dice group."""
+    offset, probs = plan.modifier, np.ones(1)
+    for term in plan.terms:
+        term_offset, term_probs = _term_pmf(term)
+        offset += term_offset
+        probs = np.convolve(probs, term_probs)
+    # Drop the zero-probability floor left by value-indexed die PMFs
+    nonzero = np.flatnonzero(probs)
+    return offset + nonzero[0], _frozen(probs[nonzero[0]:nonzero[-1] + 1].copy())
+
+def dice_plan_bounds(plan: DicePlan) -> Tuple[int, int]:
+    """
+    Lowest and highest totals the roller can produce. Exploding dice are bounded by the
+    roller's MAX_EXPLOSIONS cap, far past the tail dice_plan_pmf keeps.
+    """
+    low = high = plan.modifier
+    for term in plan.terms:
+        faces = np.flatnonzero(_die_pmf(term.die, False, term.reroll))
+        lo, hi = int(faces[0]), int(faces[-1])
+        if term.explode and hi == term.die:
+            hi = term.die * (MAX_EXPLOSIONS + 1)
+            if lo == term.die: # Every roll explodes at least once
+                lo = term.die + 1 if term.die > 1 else hi
+        count = min(term.keep[1], term.num) if term.keep else term.num
+        if term.sign > 0:
+            low, high = low + count * lo, high + count * hi
+        else:
+            low, high = low - count * hi, high - count * lo
+    return low, high
+
+def _pmf_mean(pmf: PMF, floor: Optional[int] = None) -> float:
+    offset, probs = pmf
+    values = np.arange(offset, offset + len(probs))
+    if floor is not None:
+        values = np.maximum(values, floor)
+    return float(values @ probs)
+
+# --- Combatant Model ---
+@dataclass(slots=True)
+class StatusEffect:
+    """A status effect on a combatant. Converts losslessly to and from the saved dict format."""
+    name: str
+    duration_rounds: Optional[int] = None
+    notes: str = ""
+    applied_round: int = 0
+    ends: Optional[str] = None  # "start_of_turn" / "end_of_turn" of anchor; None expires at a round boundary
+    anchor: Optional[str] = None  # Combatant whose turn ends the effect
+    expires_round: Optional[int] = None  # Round in which the effect expires; None if indefinite
+    extra: Optional[Dict[str, Any]] = None  # Unrecognized saved keys, written back unchanged
+
+    FIELDS: ClassVar[Tuple[str, ...]] = ("name", "duration_rounds", "notes", "applied_round", "ends", "anchor", "expires_round")
+    TURN_BOUNDARIES: ClassVar[Tuple[str, ...]] = ("start_of_turn", "end_of_turn")
+
+    def to_dict(self, combat_round: Optional[int] = None) -> Dict[str, Any]:
+        """Saved dict form; with combat_round, 'duration_rounds' is the number of rounds remaining."""
+        duration = self.duration_rounds
+        if combat_round is not None and self.expires_round is not None:
+            duration = self.expires_round - combat_round
+        data = {
+            "name": self.name,
+            "duration_rounds": duration,
+            "notes": self.notes,
+            "applied_round": self.applied_round,
+        }
+        if self.expires_round is not None:
+            data["expires_round"] = self.expires_round
+        if self.ends:
+            data["ends"] = self.ends
+            data["anchor"] = self.anchor
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StatusEffect":
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS}
+        return cls(data["name"], data.get("duration_rounds"), data.get("notes", ""), data.get("applied_round", 0),
+                   data.get("ends"), data.get("anchor"), data.get("expires_round"), extra or None)
+
+@dataclass(slots=True)
+class Combatant:
+    """A combatant in the initiative order. Converts losslessly to and from the saved dict format."""
+    name: str
+    initiative: int
+    max_hp: int
+    current_hp: int
+    status_effects: List[StatusEffect] = field(default_factory=list)
+    npc: bool = False
+    player_controlled: bool = False
+    dex_modifier: int = 0
+    tiebreaker: int = 0  # Roll-off for ties on initiative and dex
+    member_hp: Optional[np.ndarray] = None  # Per-member HP for a horde; max_hp is then per member
+    saves: Optional[Dict[str, int]] = None  # Saving throw bonus by ability ("dex", "wis", ...)
+    resistances: Optional[List[str]] = None  # Damage types taken at half
+    immunities: Optional[List[str]] = None  # Damage types ignored
+    vulnerabilities: Optional[List[str]] = None  # Damage types taken double
+    extra: Optional[Dict[str, Any]] = None  # Unrecognized saved keys, written back unchanged
+
+    FIELDS: ClassVar[Tuple[str, ...]] = ("name", "initiative", "max_hp", "current_hp", "status_effects", "npc", "player_controlled", "dex_modifier", "tiebreaker", "group_size", "member_hp", "saves", "resistances", "immunities", "vulnerabilities")
+    DEFENSES: ClassVar[Tuple[str, ...]] = ("saves", "resistances", "immunities", "vulnerabilities")
+
+    @property
+    def is_group(self) -> bool:
+        return self.member_hp is not None
+
+    def damage_multiplier(self, damage_type: Optional[str]) -> float:
+        """0 if immune, 0.5 if resistant, 2 if vulnerable to damage_type, otherwise 1."""
+        if not damage_type:
+            return 1.0
+        damage_type = damage_type.lower()
+        if self.immunities and damage_type in self.immunities:
+            return 0.0
+        if self.resistances and damage_type in self.resistances:
+            return 0.5
+        if self.vulnerabilities and damage_type in self.vulnerabilities:
+            return 2.0
+        return 1.0
+
+    def effect(self, effect_name: str) -> Optional[StatusEffect]:
+        for effect in self.status_effects:
+            if effect.name == effect_name:
+                return effect
+        return None
+
+    def to_dict(self, combat_round: Optional[int] = None) -> Dict[str, Any]:
+        data = {
+            "name": self.name,
+            "initiative": self.initiative,
+            "max_hp": self.max_hp,
+            "current_hp": self.current_hp,
+            "status_effects": [e.to_dict(combat_round) for e in self.status_effects],
+            "npc": self.npc,
+            "player_controlled": self.player_controlled,
+            "dex_modifier": self.dex_modifier,
+            "tiebreaker": self.tiebreaker,
+        }
+        if self.member_hp is not None:
+            data["group_size"] = len(self.member_hp)
+            data["member_hp"] = self.member_hp.tolist()
+        for key in self.DEFENSES:
+            value = getattr(self, key)
+            if value:
+                data[key] = dict(value) if key == "saves" else list(value)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Combatant":
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS}
+        return cls(
+            name=data["name"],
+            initiative=data["initiative"],
+            max_hp=data["max_hp"],
+            current_hp=data.get("current_hp", data["max_hp"]),
+            status_effects=[StatusEffect.from_dict(e) for e in data.get("status_effects", [])],
+            npc=data.get("npc", False),
+            player_controlled=data.get("player_controlled", False),
+            dex_modifier=data.get("dex_modifier", 0),
+            tiebreaker=data.get("tiebreaker", 0),
+            member_hp=np.asarray(data["member_hp"], dtype=np.int32) if "member_hp" in data else None,
+            saves=data.get("saves"),
+            resistances=data.get("resistances"),
+            immunities=data.get("immunities"),
+            vulnerabilities=data.get("vulnerabilities"),
+            extra=extra or None,
+        )
+
+# --- Initiative ---
+class InitiativeOrder:
+    """
+    Combatants kept sorted by initiative with bisect insertion, plus a name index so
+    lookups, inserts and removals don't scan the whole encounter. Ties on initiative are
+    broken by dexterity modifier, then by a roll-off, then by insertion order.
+    """
+
+    def __init__(self):
+        self.entries: List[Combatant] = []  # Combatants in turn order
+        self._keys: List[Tuple] = []  # Sort key of each entry, parallel to entries
+        self._by_name: Dict[str, Combatant] = {}
+        self._key_by_name: Dict[str, Tuple] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, idx: int) -> Combatant:
+        return self.entries[idx]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def get(self, name: str) -> Optional[Combatant]:
+        return self._by_name.get(name)
+
+    def key_of(self, name: str) -> Optional[Tuple]:
+        return self._key_by_name.get(name)
+
+    def index_of(self, name: str) -> int:
+        """Position of the named combatant in turn order, or -1 if absent."""
+        key = self._key_by_name.get(name)
+        if key is None:
+            return -1
+        return bisect.bisect_left(self._keys, key)
+
+    def add(self, combatant: Combatant) -> int:
+        """Inserts a combatant in turn order. Returns its position."""
+        self._seq += 1
+        key = (-combatant.initiative, -combatant.dex_modifier, -combatant.tiebreaker, self._seq)
+        idx = bisect.bisect_right(self._keys, key)
+        self._keys.insert(idx, key)
+        self.entries.insert(idx, combatant)
+        self._by_name[combatant.name] = combatant
+        self._key_by_name[combatant.name] = key
+        return idx
+
+    def insert_at(self, combatant: Combatant, idx: int) -> int:
+        """
+        Inserts a combatant at a known position (e.g., replaying another bot's log), choosing a
+        tie-order sequence between its neighbours. Falls back to add() if idx doesn't fit its key.
+        """
+        prefix = (-combatant.initiative, -combatant.dex_modifier, -combatant.tiebreaker)
+        prev_key = self._keys[idx - 1] if 0 < idx <= len(self._keys) else None
+        next_key = self._keys[idx] if 0 <= idx < len(self._keys) else None
+        low = prev_key[3] if prev_key and prev_key[:3] == prefix else None
+        high = next_key[3] if next_key and next_key[:3] == prefix else None
+        if high is None:
+            self._seq += 1
+            seq = self._seq if low is None else max(self._seq, low + 1)
+        else:
+            seq = high - 1 if low is None else (low + high) / 2
+        key = prefix + (seq,)
+        if (prev_key is not None and not prev_key < key) or (next_key is not None and not key < next_key) or idx > len(self._keys):
+            return self.add(combatant)
+        self._keys.insert(idx, key)
+        self.entries.insert(idx, combatant)
+        self._by_name[combatant.name] = combatant
+        self._key_by_name[combatant.name] = key
+        return idx
+
+    def replace(self, combatant: Combatant) -> bool:
+        """Swaps in a new object for an existing combatant of the same name, keeping its place."""
+        idx = self.index_of(combatant.name)
+        if idx == -1:
+            return False
+        self.entries[idx] = combatant
+        self._by_name[combatant.name] = combatant
+        return True
+
+    def remove(self, name: str) -> int:
+        """Removes the named combatant. Returns the position it held, or -1 if absent."""
+        idx = self.index_of(name)
+        if idx == -1:
+            return -1
+        del self._keys[idx]
+        del self.entries[idx]
+        del self._by_name[name]
+        del self._key_by_name[name]
+        return idx
+
+    @classmethod
+    def from_list(cls, combatants: List[Dict[str, Any]]) -> "InitiativeOrder":
+        """Builds an order from saved combatant dicts; equal keys keep their saved relative order."""
+        order = cls()
+        for combatant in combatants:
+            order.add(Combatant.from_dict(combatant))
+        return order
+
+# --- Status Effect Expiry ---
+# Expiry points are (round, initiative sort key, phase) with phase 0 at the start of a turn
+# and 1 at its end. Round-boundary expiries use the empty key, which sorts before every
+# combatant, so they fire as the first turn of their round starts.
+START_OF_TURN, END_OF_TURN = 0, 1
+
+class EffectScheduler:
+    """
+    Min-heap of status effect expiry points, so advancing a turn only touches effects that
+    actually expire. Removed effects are dropped lazily when their entry reaches the top.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, point: Tuple, combatant_name: str, effect: StatusEffect) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (point, self._seq, combatant_name, effect))
+
+    def pop_due(self, point: Tuple):
+        """Yields (combatant name, effect, expiry point) for every entry at or before point."""
+        while self._heap and self._heap[0][0] <= point:
+            due, _, combatant_name, effect = heapq.heappop(self._heap)
+            yield combatant_name, effect, due
+
+# --- Undo Journal ---
+def _journaled(method):
+    """
+    Groups the state operations recorded by one public mutator call (including nested calls)
+    into a single undo journal entry.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._action_depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._action_depth -= 1
+            if self._action_depth == 0 and self._action_ops:
+                self._undo_journal.append((method.__name__, self._action_ops, self._action_inverse))
+                self._redo_journal.clear()
+                self._action_ops, self._action_inverse = [], []
+    return wrapper
 
 class DnDBot:
     """
@@ -17,8 +617,25 @@ class DnDBot:
         """
         Initializes the DnDBot with an empty state.
         """
-        self.initiative_order: List[Dict[str, Any]] = []  # List of combatant dicts
-        self.current_turn_idx: int = 0  # Index in initiative_order
+        self._order = InitiativeOrder()  # Combatants in turn order, indexed by name
+        self._effects = EffectScheduler()  # Pending status effect expiries
+        self.expired_effects: List[Dict[str, Any]] = []  # Expiry events from the last next_turn
+        self.effect_expiry_listeners: List[Callable[[Dict[str, Any]], None]] = []  # Called with each expiry event
+        # Append-only operation log behind get_state_delta/apply_delta
+        self.state_version: int = 0
+        self._state_log: List[Dict[str, Any]] = []
+        self._log_base_version: int = 0  # Ops at or below this version were compacted away
+        self._snapshot_version: int = 0  # Version of the last full snapshot taken or loaded
+        self._writer: Optional[storage.WriteBehindWriter] = None  # Created by the first autosave_json
+        self.state_serializer: Optional[str] = None  # storage.SERIALIZERS name for state snapshots; None = fastest JSON
+        self.campaign_store: Optional[CampaignStore] = None  # Set by use_campaign_store
+        # Undo/redo: (action name, forward ops, inverse ops) per public mutator call
+        self._undo_journal: deque = deque(maxlen=UNDO_LIMIT)
+        self._redo_journal: List[Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]] = []
+        self._action_depth = 0
+        self._action_ops: List[Dict[str, Any]] = []
+        self._action_inverse: List[Dict[str, Any]] = []
+        self.current_turn_idx: int = 0  # Index in combatants
         self.combat_round: int = 0
 
         # In-game time
@@ -30,46 +647,70 @@ class DnDBot:
         }
         # Standard D&D dice
         self.allowed_dice = {4, 6, 8, 10, 12, 20, 100}
+        # Generator backing the vectorized bulk rolls in roll_many
+        self._rng = np.random.default_rng()
+
+    @property
+    def combatants(self) -> List[Combatant]:
+        """The live Combatant entries in turn order. Treat as read-only; use the combat methods to change them."""
+        return self._order.entries
+
+    @property
+    def initiative_order(self) -> Tuple[Mapping[str, Any], ...]:
+        """
+        Combatants in turn order with the dict keys this attribute had before Combatant objects.
+        The entries are read-only snapshots, so `initiative_order[0]["current_hp"] = 1` raises
+        TypeError instead of silently doing nothing: use the combat/HP/effect methods.
+        """
+        return tuple(types.MappingProxyType(c) for c in self.get_initiative_order_details())
 
     # --- Dice Rolling ---
     def _roll_individual_dice(self, num: int, die: int) -> List[int]:
         """Helper to roll individual dice."""
         return [random.randint(1, die) for _ in range(num)]
 
+    def _compile(self, dice_str: str) -> Tuple[Optional[DicePlan], Optional[str]]:
+        """
+        Compiles a dice expression through the shared plan cache and checks its dice sizes.
+        Returns:
+            Tuple: (plan, None) on success, or (None, error message).
+        """
+        try:
+            plan = compile_dice_expression(dice_str)
+        except ValueError as e:
+            return None, f"{e} Expected dice like '2d6+3', '4d6kh3', '1d6!' or '2d6+1d4+3'."
+        if not plan.dice_sizes <= self.allowed_dice:
+            return None, f"Invalid die size. Allowed dice: {sorted(list(self.allowed_dice))}"
+        return plan, None
+
     def roll(self, dice_str: str, advantage: bool = False, disadvantage: bool = False) -> Dict[str, Any]:
         """
-        Rolls dice in NdM[+/-X] format (e.g., '2d6+3', '1d20-1').
-        Supports advantage and disadvantage for d20 rolls.
+        Rolls a dice expression (e.g., '2d6+3', '1d20-1', '2d6+1d4+3', '4d6kh3', '1d6!', '2d6ro<2').
+        Supports advantage and disadvantage for single d20 rolls.
         Only standard D&D dice (d4, d6, d8, d10, d12, d20, d100) are allowed.
 
         Args:
-            dice_str (str): Dice string in NdM[+/-X] format.
+            dice_str (str): Dice expression; see the grammar at the top of this module.
             advantage (bool): If true, roll 2d20 and take the higher for the primary die.
             disadvantage (bool): If true, roll 2d20 and take the lower for the primary die.
 
         Returns:
-            Dict[str, Any]: Dictionary with 'rolls', 'modifier', 'total', 'final_d20_roll' (if applicable),
-                            or 'error' if invalid.
+            Dict[str, Any]: Dictionary with 'rolls' (kept dice), 'modifier', 'total', 'final_d20_roll' (if applicable),
+                            'dropped' (if a keep rule discarded dice), 'terms' (per-group breakdown for
+                            multi-group expressions), or 'error' if invalid.
         """
-        dice_str = dice_str.replace(' ', '').lower()
-        match = re.fullmatch(r"(\d*)d(\d+)([+-]\d+)?", dice_str)
-        if not match:
-            return {"error": "Invalid dice format. Expected NdM[+/-X] (e.g., '2d6+3', 'd20-1')."}
-
-        num_str, die_str, mod_str = match.groups()
-        num = int(num_str) if num_str else 1
-        die = int(die_str)
-        mod = int(mod_str) if mod_str else 0
+        plan, error = self._compile(dice_str)
+        if error:
+            return {"error": error}
+        mod = plan.modifier
 
-        if die not in self.allowed_dice:
-            return {"error": f"Invalid die size. Allowed dice: {sorted(list(self.allowed_dice))}"}
         if advantage and disadvantage:
             return {"error": "Cannot roll with both advantage and disadvantage."}
 
         rolls = []
         final_d20_roll = None
 
-        if die == 20 and num == 1 and (advantage or disadvantage):
+        if plan.single_d20 and (advantage or disadvantage):
             roll1 = random.randint(1, 20)
             roll2 = random.randint(1, 20)
             if advantage:
@@ -87,18 +728,197 @@ class DnDBot:
                 "type": "advantage" if advantage else "disadvantage"
             }
             return result
-        elif die == 20 and num > 1 and (advantage or disadvantage):
+        elif advantage or disadvantage:
             return {"error": "Advantage/disadvantage typically applies to a single d20 roll, not multiple d20s in one command like '2d20'."}
 
+        if len(plan.terms) == 1 and plan.terms[0].plain and plan.terms[0].sign > 0:
+            # Fast path for the classic NdM[+/-X] roll
+            rolls = self._roll_individual_dice(plan.terms[0].num, plan.terms[0].die)
+            return {"rolls": rolls, "modifier": mod, "total": sum(rolls) + mod}
+
+        total = mod
+        dropped = []
+        terms = []
+        for term in plan.terms:
+            kept, lost = _roll_term(term, random.randint)
+            rolls.extend(kept)
+            dropped.extend(lost)
+            total += term.sign * sum(kept)
+            terms.append({"sign": term.sign, "die": term.die, "rolls": kept, "dropped": lost, "subtotal": term.sign * sum(kept)})
+        result = {"rolls": rolls, "modifier": mod, "total": total}
+        if dropped:
+            result["dropped"] = dropped
+        if len(terms) > 1:
+            result["terms"] = terms
+        return result
+
+    def roll_many(self, specs: List[str], advantage: bool = False, disadvantage: bool = False, seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Rolls a whole batch of dice strings in one vectorized pass (e.g., 40 goblin attacks
+        or a save for every creature in a horde). Identical specs are compiled once and each
+        dice group is rolled for all of them together as a single (count, num) matrix of dice.
+
+        Args:
+            specs (List[str]): Dice expressions (same grammar as roll), one per roll.
+            advantage (bool): Roll every spec with advantage. Each spec must be a single d20.
+            disadvantage (bool): Roll every spec with disadvantage. Each spec must be a single d20.
+            seed (Optional[int]): Seed for a reproducible batch. Uses the bot's generator if omitted.
+
+        Returns:
+            Dict[str, Any]: 'totals' and 'modifiers' as int arrays aligned with specs. With advantage
+                            or disadvantage also 'd20_outcomes' (shape (n, 2)), 'final_d20_rolls' and 'type'.
+                            Returns 'error' if any spec is invalid.
+        """
+        if advantage and disadvantage:
+            return {"error": "Cannot roll with both advantage and disadvantage."}
+        rng = np.random.default_rng(seed) if seed is not None else self._rng
+
+        # Group positions by spec so each distinct expression is parsed and rolled once
+        groups: Dict[str, List[int]] = {}
+        for i, spec in enumerate(specs):
+            groups.setdefault(normalize_dice_expression(spec), []).append(i)
+
+        count = len(specs)
+        totals = np.zeros(count, dtype=np.int64)
+        modifiers = np.zeros(count, dtype=np.int64)
+        d20_outcomes = np.zeros((count, 2), dtype=np.int64) if (advantage or disadvantage) else None
 
-        rolls = self._roll_individual_dice(num, die)
-        total = sum(rolls) + mod
-        return {"rolls": rolls, "modifier": mod, "total": total}
+        for spec, positions in groups.items():
+            plan, error = self._compile(spec)
+            if error:
+                return {"error": f"{spec}: {error}"}
+            mod = plan.modifier
+            idx = np.asarray(positions)
+            modifiers[idx] = mod
+
+            if d20_outcomes is not None:
+                if not plan.single_d20:
+                    return {"error": f"{spec}: Advantage/disadvantage only applies to a single d20 roll."}
+                pairs = np.sort(rng.integers(1, 21, size=(len(positions), 2)), axis=1)
+                d20_outcomes[idx] = pairs
+                totals[idx] = (pairs[:, 1] if advantage else pairs[:, 0]) + mod
+            else:
+                subtotal = np.full(len(positions), mod, dtype=np.int64)
+                for term in plan.terms:
+                    subtotal += _roll_term_batch(term, len(positions), rng)
+                totals[idx] = subtotal
+
+        result = {"totals": totals, "modifiers": modifiers}
+        if d20_outcomes is not None:
+            result["d20_outcomes"] = d20_outcomes
+            result["final_d20_rolls"] = totals - modifiers
+            result["type"] = "advantage" if advantage else "disadvantage"
+        return result
+
+    # --- Dice Analytics ---
+    def _analytics_plan(self, dice_str: str, advantage: bool, disadvantage: bool) -> Tuple[Optional[DicePlan], Optional[str]]:
+        """Compiles dice_str, turning a single d20 into 2d20kh1/2d20kl1 for advantage/disadvantage."""
+        plan, error = self._compile(dice_str)
+        if error:
+            return None, error
+        if advantage and disadvantage:
+            return None, "Cannot roll with both advantage and disadvantage."
+        if advantage or disadvantage:
+            if not plan.single_d20:
+                return None, "Advantage/disadvantage only applies to a single d20 roll."
+            keep = ("h" if advantage else "l", 1)
+            plan = DicePlan(plan.expression, (DiceTerm(1, 2, 20, keep=keep),), plan.modifier)
+        return plan, None
+
+    def dice_odds(self, dice_str: str, target: Optional[int] = None, advantage: bool = False, disadvantage: bool = False, include_distribution: bool = True) -> Dict[str, Any]:
+        """
+        Computes the exact outcome distribution of any expression roll accepts, without rolling.
+        Args:
+            dice_str (str): Dice expression, e.g. '8d6', '4d6kh3', '1d20+5'.
+            target (Optional[int]): If given, also report the chance of rolling at least this total.
+            advantage (bool): Treat a single d20 as rolled with advantage.
+            disadvantage (bool): Treat a single d20 as rolled with disadvantage.
+            include_distribution (bool): Include the {total: probability} table, leaving out totals
+                whose probability rounds to 0.
+        Returns:
+            Dict[str, Any]: 'min', 'max', 'mean', 'stdev', optionally 'distribution' and 'at_least',
+                            or 'error' if invalid. 'min'/'max' are the totals the roller can produce;
+                            with exploding dice, 'explosion_cap' gives the explosions allowed per die.
+        """
+        plan, error = self._analytics_plan(dice_str, advantage, disadvantage)
+        if error:
+            return {"error": error}
+        offset, probs = dice_plan_pmf(plan)
+        values = np.arange(offset, offset + len(probs))
+        mean = float(values @ probs)
+        low, high = dice_plan_bounds(plan)
+        result = {
+            "expression": plan.expression,
+            "min": low,
+            "max": high,
+            "mean": round(mean, 4),
+            "stdev": round(float(np.sqrt(((values - mean) ** 2) @ probs)), 4),
+        }
+        if any(t.explode for t in plan.terms):
+            result["explosion_cap"] = MAX_EXPLOSIONS
+        if include_distribution:
+            rounded = np.round(probs, 6)
+            shown = np.flatnonzero(rounded) # Exploding tails and impossible totals (e.g. 6 on 1d6!)
+            result["distribution"] = {int(values[i]): float(rounded[i]) for i in shown}
+        if target is not None:
+            result["at_least"] = round(float(probs[max(0, target - offset):].sum()), 6)
+        return result
+
+    def hit_chance(self, attack_bonus: int, ac: int, advantage: bool = False, disadvantage: bool = False, crit_range: int = 20) -> Dict[str, Any]:
+        """
+        Exact chance for an attack roll to hit a given AC. A natural 1 always misses and a
+        natural roll of crit_range or higher always hits as a critical.
+        Returns:
+            Dict[str, Any]: 'hit' (including crits), 'crit' and 'miss' probabilities, or 'error'.
+        """
+        plan, error = self._analytics_plan("1d20", advantage, disadvantage)
+        if error:
+            return {"error": error}
+        offset, probs = dice_plan_pmf(plan)
+        faces = np.arange(offset, offset + len(probs))
+        crit = (faces >= crit_range) & (faces > 1)
+        hit = crit | ((faces > 1) & (faces + attack_bonus >= ac))
+        return {
+            "hit": round(float(probs[hit].sum()), 6),
+            "crit": round(float(probs[crit].sum()), 6),
+            "miss": round(float(probs[~hit].sum()), 6),
+        }
+
+    def expected_damage(self, attack_bonus: int, ac: int, damage_dice: str, advantage: bool = False, disadvantage: bool = False, crit_range: int = 20) -> Dict[str, Any]:
+        """
+        Expected damage per attack against an AC, counting misses as 0 and doubling the
+        damage dice on a critical hit. Negative totals count as 0 damage.
+        Returns:
+            Dict[str, Any]: 'hit_chance', 'crit_chance', 'damage_on_hit', 'damage_on_crit' and
+                            'expected_damage', or 'error' if invalid.
+        """
+        chances = self.hit_chance(attack_bonus, ac, advantage, disadvantage, crit_range)
+        if "error" in chances:
+            return chances
+        plan, error = self._compile(damage_dice)
+        if error:
+            return {"error": error}
+        crit_plan = DicePlan(plan.expression, tuple(
+            DiceTerm(t.sign, t.num * 2, t.die, (t.keep[0], t.keep[1] * 2) if t.keep else None, t.explode, t.reroll)
+            for t in plan.terms
+        ), plan.modifier)
+        on_hit = _pmf_mean(dice_plan_pmf(plan), floor=0)
+        on_crit = _pmf_mean(dice_plan_pmf(crit_plan), floor=0)
+        normal_hit = chances["hit"] - chances["crit"]
+        return {
+            "hit_chance": chances["hit"],
+            "crit_chance": chances["crit"],
+            "damage_on_hit": round(on_hit, 4),
+            "damage_on_crit": round(on_crit, 4),
+            "expected_damage": round(normal_hit * on_hit + chances["crit"] * on_crit, 4),
+        }
 
     # --- Initiative and Combat ---
-    def add_combatant(self, name: str, initiative: int, max_hp: int, current_hp: Optional[int] = None, npc: bool = False, player_controlled: bool = False) -> bool:
+    @_journaled
+    def add_combatant(self, name: str, initiative: int, max_hp: int, current_hp: Optional[int] = None, npc: bool = False, player_controlled: bool = False, dex_modifier: int = 0) -> bool:
         """
-        Adds a combatant to the initiative order. Re-sorts the order.
+        Adds a combatant to the initiative order at its sorted position.
+        Ties on initiative go to the higher dex_modifier, then to a d20 roll-off.
         Args:
             name (str): Name of the combatant.
             initiative (int): Initiative score.
@@ -106,29 +926,116 @@ class DnDBot:
             current_hp (Optional[int]): Current HP. Defaults to max_hp.
             npc (bool): True if this combatant is an NPC.
             player_controlled (bool): True if this is a player character or an NPC directly controlled by a player.
+            dex_modifier (int): Dexterity modifier, the first initiative tiebreaker.
         Returns:
             bool: True if successful, False if combatant name already exists.
         """
-        if any(c["name"] == name for c in self.initiative_order):
+        if name in self._order:
             return False # Name already exists
 
-        combatant = {
-            "name": name,
-            "initiative": initiative,
-            "max_hp": max_hp,
-            "current_hp": current_hp if current_hp is not None else max_hp,
-            "status_effects": [], # List of {"name": str, "duration_rounds": Optional[int], "notes": str}
-            "npc": npc,
-            "player_controlled": player_controlled,
-        }
-        self.initiative_order.append(combatant)
-        self.initiative_order.sort(key=lambda x: x["initiative"], reverse=True)
+        undo_turn = self._turn_op()
+        combatant = Combatant(
+            name=name,
+            initiative=initiative,
+            max_hp=max_hp,
+            current_hp=current_hp if current_hp is not None else max_hp,
+            npc=npc,
+            player_controlled=player_controlled,
+            dex_modifier=dex_modifier,
+            tiebreaker=random.randint(1, 20), # Roll-off for ties on initiative and dex
+        )
+        idx = self._order.add(combatant)
         # If this is the first combatant, set turn and round
-        if len(self.initiative_order) == 1:
+        if len(self._order) == 1:
             self.current_turn_idx = 0
             self.combat_round = 1 
+        elif idx <= self.current_turn_idx:
+            self.current_turn_idx += 1 # Keep the turn with whoever currently holds it
+        self._record({"op": "add", "index": idx, "combatant": combatant.to_dict(self.combat_round)}, {"op": "remove", "name": name})
+        self._record(self._turn_op(), undo_turn)
         return True
 
+    @_journaled
+    def add_group(self, name: str, initiative: int, count: int, max_hp: int, npc: bool = True, dex_modifier: int = 0, member_hp: Optional[Sequence[int]] = None) -> bool:
+        """
+        Adds a horde of identical creatures (e.g., 50 skeletons) as a single initiative entry
+        backed by a per-member HP array. Damage to many members is applied with damage_group.
+        Args:
+            name (str): Name of the group.
+            initiative (int): Initiative score shared by the whole group.
+            count (int): Number of members.
+            max_hp (int): Maximum hit points of each member.
+            npc (bool): True if the group is made of NPCs.
+            dex_modifier (int): Dexterity modifier, the first initiative tiebreaker.
+            member_hp (Optional[Sequence[int]]): Starting HP per member. Defaults to max_hp for everyone.
+        Returns:
+            bool: True if successful, False if the name already exists or the sizes don't match.
+        """
+        hp = np.full(count, max_hp, dtype=np.int32) if member_hp is None else np.asarray(member_hp, dtype=np.int32)
+        if count < 1 or len(hp) != count or not self.add_combatant(name, initiative, max_hp, npc=npc, dex_modifier=dex_modifier):
+            return False
+        group = self._order.get(name)
+        undo = self._put_op(group)
+        group.member_hp = np.clip(hp, 0, max_hp)
+        group.current_hp = int(group.member_hp.sum())
+        self._record(self._put_op(group), undo)
+        return True
+
+    def _group_targets(self, group: Combatant, members: Optional[Union[int, Sequence[int]]]) -> np.ndarray:
+        """Member indices hit by a group effect: all living members, the first N living ones, or explicit indices."""
+        if members is None or isinstance(members, int):
+            living = np.flatnonzero(group.member_hp > 0)
+            return living if members is None else living[:max(0, members)]
+        idx = np.asarray(members, dtype=np.int64)
+        if idx.size and (idx.min() < 0 or idx.max() >= len(group.member_hp)):
+            raise ValueError(f"Member indices must be between 0 and {len(group.member_hp) - 1}.")
+        return idx
+
+    @_journaled
+    def damage_group(self, name: str, damage: Union[int, Sequence[int]], members: Optional[Union[int, Sequence[int]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Deals damage to many members of a group in one vectorized step (e.g., a fireball over the horde).
+        Args:
+            name (str): Name of the group.
+            damage (Union[int, Sequence[int]]): Damage for every targeted member, or one value per targeted member.
+            members (Optional[Union[int, Sequence[int]]]): None for all living members, N for the first N living
+                                                           members, or a list of member indices.
+        Returns:
+            Optional[Dict[str, Any]]: 'targets', 'damage_dealt', 'killed', 'survivors' and 'current_hp' (group total),
+                                      None if the group is not found, or 'error' for mismatched arguments.
+        """
+        group = self._order.get(name)
+        if not group or not group.is_group:
+            return None
+        try:
+            idx = self._group_targets(group, members)
+        except ValueError as e:
+            return {"error": str(e)}
+        dmg = np.asarray(damage, dtype=np.int64)
+        if dmg.ndim and dmg.shape != idx.shape:
+            return {"error": f"Expected one damage value or {idx.size} values (one per targeted member), got {dmg.size}."}
+        unique = np.unique(idx)
+        if unique.size != idx.size:
+            if dmg.ndim:
+                return {"error": "Member indices must be unique when giving one damage value per member."}
+            idx = unique # A member listed twice is still hit once
+        dmg = np.maximum(dmg, 0)
+        undo = self._hp_op(group, idx)
+        before = group.member_hp[idx]
+        after = np.maximum(before - dmg, 0)
+        group.member_hp[idx] = after
+        group.current_hp = int(group.member_hp.sum())
+        self._record(self._hp_op(group, idx), undo)
+        return {
+            "name": name,
+            "targets": int(idx.size),
+            "damage_dealt": int((before - after).sum()),
+            "killed": int(((before > 0) & (after == 0)).sum()),
+            "survivors": int((group.member_hp > 0).sum()),
+            "current_hp": group.current_hp,
+        }
+
+    @_journaled
     def remove_combatant(self, name: str) -> bool:
         """
         Removes a combatant from the initiative order by name.
@@ -136,24 +1043,18 @@ class DnDBot:
         Returns:
             bool: True if successful, False if combatant not found.
         """
-        original_len = len(self.initiative_order)
-        if original_len == 0:
-            return False
-
-        idx_to_remove = -1
-        for i, c in enumerate(self.initiative_order):
-            if c["name"] == name:
-                idx_to_remove = i
-                break
-        
-        if idx_to_remove == -1:
+        combatant = self._order.get(name)
+        if not combatant:
             return False # Not found
+        undo_add = {"op": "add", "index": self._order.index_of(name), "combatant": combatant.to_dict(self.combat_round)}
+        undo_turn = self._turn_op()
+        idx_to_remove = self._order.remove(name)
 
-        self.initiative_order.pop(idx_to_remove)
-
-        if not self.initiative_order: # List became empty
+        if not self._order: # List became empty
             self.current_turn_idx = 0
             self.combat_round = 0 # Reset combat round
+            self._record({"op": "remove", "name": name}, undo_add)
+            self._record(self._turn_op(), undo_turn)
             return True
 
         # Adjust current_turn_idx
@@ -163,7 +1064,7 @@ class DnDBot:
             # If the current combatant was removed, the index now effectively points to the next one,
             # or is out of bounds if it was the last one.
             # We ensure it's within bounds for the next `next_turn` call.
-            if self.current_turn_idx >= len(self.initiative_order):
+            if self.current_turn_idx >= len(self._order):
                 self.current_turn_idx = 0 # Wrap around for the next `next_turn` call which will advance it
                 # This also means a round likely passed if we were at the end.
                 # However, round increment is handled by next_turn.
@@ -171,125 +1072,351 @@ class DnDBot:
         # Ensure current_turn_idx is always valid
         if self.current_turn_idx < 0: # Should not happen with above logic but as a safeguard
             self.current_turn_idx = 0
-        if self.current_turn_idx >= len(self.initiative_order): # If it was last and list shrunk
+        if self.current_turn_idx >= len(self._order): # If it was last and list shrunk
             self.current_turn_idx = 0
 
+        self._record({"op": "remove", "name": name}, undo_add)
+        self._record(self._turn_op(), undo_turn)
         return True
 
+    @_journaled
     def next_turn(self) -> Optional[str]:
         """
         Advances to the next combatant. Increments round if it cycles.
+        Effects ending at the end of the outgoing combatant's turn, at the round boundary or at
+        the start of the incoming combatant's turn expire here; their events are kept in
+        expired_effects and passed to each of effect_expiry_listeners.
         Returns:
             Optional[str]: Name of the next combatant, or None if no combatants.
         """
-        if not self.initiative_order:
+        if not self.combatants:
             return None
         
+        self.expired_effects = []
+        undo_turn = self._turn_op()
+        outgoing = self.combatants[self.current_turn_idx]
+        self._expire_effects((self.combat_round, self._order.key_of(outgoing.name), END_OF_TURN))
+
         self.current_turn_idx = (self.current_turn_idx + 1)
-        if self.current_turn_idx >= len(self.initiative_order):
+        if self.current_turn_idx >= len(self.combatants):
             self.current_turn_idx = 0
             self.combat_round += 1
-            # Tick down status effect durations
-            for combatant in self.initiative_order:
-                active_effects = []
-                for effect in combatant.get("status_effects", []):
-                    if effect.get("duration_rounds") is not None:
-                        effect["duration_rounds"] -= 1
-                        if effect["duration_rounds"] > 0:
-                            active_effects.append(effect)
-                    else: # Permanent or indefinite until removed
-                        active_effects.append(effect)
-                combatant["status_effects"] = active_effects
-        
-        return self.initiative_order[self.current_turn_idx]["name"]
+
+        incoming = self.combatants[self.current_turn_idx]
+        self._expire_effects((self.combat_round, self._order.key_of(incoming.name), START_OF_TURN))
+        self._record(self._turn_op(), undo_turn)
+        return incoming.name
+
+    def _expire_effects(self, point: Tuple) -> None:
+        """Removes every scheduled effect due at or before point and emits its expiry event."""
+        for combatant_name, effect, due in self._effects.pop_due(point):
+            combatant = self._order.get(combatant_name)
+            if not combatant or not any(e is effect for e in combatant.status_effects):
+                continue # Removed by hand, or its combatant left the fight
+            undo = self._put_op(combatant)
+            combatant.status_effects = [e for e in combatant.status_effects if e is not effect]
+            self._record(self._put_op(combatant), undo)
+            event = {
+                "combatant": combatant_name,
+                "effect": effect.name,
+                "round": self.combat_round,
+                "ends": effect.ends or "round",
+                "anchor": effect.anchor,
+            }
+            self.expired_effects.append(event)
+            for listener in self.effect_expiry_listeners:
+                listener(event)
+
+    def _schedule_effect(self, combatant_name: str, effect: StatusEffect) -> None:
+        """Queues the effect's expiry point, if it has one."""
+        if effect.expires_round is None:
+            return
+        if effect.ends:
+            # An anchor that has left the fight falls back to the round boundary
+            key = self._order.key_of(effect.anchor) or ()
+            phase = START_OF_TURN if effect.ends == "start_of_turn" else END_OF_TURN
+            self._effects.schedule((effect.expires_round, key, phase), combatant_name, effect)
+        else:
+            self._effects.schedule((effect.expires_round, (), START_OF_TURN), combatant_name, effect)
+
+    def _rebuild_effect_schedule(self) -> None:
+        """Re-queues every timed effect, e.g. after loading a saved state."""
+        self._effects = EffectScheduler()
+        for combatant in self.combatants:
+            for effect in combatant.status_effects:
+                if effect.expires_round is None and effect.duration_rounds is not None:
+                    effect.expires_round = self.combat_round + effect.duration_rounds
+                self._schedule_effect(combatant.name, effect)
 
     def get_initiative_order_details(self) -> List[Dict[str, Any]]:
         """Returns the full details of combatants in initiative order."""
-        return self.initiative_order
+        return [c.to_dict(self.combat_round) for c in self.combatants]
 
     def get_current_combatant_details(self) -> Optional[Dict[str, Any]]:
         """Returns the details of the current combatant."""
-        if self.initiative_order:
-            return self.initiative_order[self.current_turn_idx]
+        if self.combatants:
+            return self.combatants[self.current_turn_idx].to_dict(self.combat_round)
         return None
 
     def get_combatant(self, name: str) -> Optional[Dict[str, Any]]:
-        """Gets details for a specific combatant by name."""
-        for c in self.initiative_order:
-            if c["name"] == name:
-                return c
-        return None
+        """Gets details for a specific combatant by name, as a snapshot dict (edit it through the HP/effect methods)."""
+        combatant = self._order.get(name)
+        return combatant.to_dict(self.combat_round) if combatant else None
 
     # --- HP Management ---
     def _modify_hp(self, name: str, amount: int) -> Optional[Dict[str, Any]]:
         """Helper to modify HP, ensuring it stays within 0 and max_hp."""
-        combatant = self.get_combatant(name)
+        combatant = self._order.get(name)
         if not combatant:
             return None
         
-        combatant["current_hp"] = max(0, min(combatant["max_hp"], combatant["current_hp"] + amount))
-        return combatant
+        if combatant.is_group:
+            # One creature at a time: damage the first living member, heal the most injured one
+            living = np.flatnonzero(combatant.member_hp > 0)
+            if living.size:
+                target = living[0] if amount < 0 else living[np.argmin(combatant.member_hp[living])]
+                changed = np.array([target])
+                undo = self._hp_op(combatant, changed)
+                combatant.member_hp[target] = max(0, min(combatant.max_hp, int(combatant.member_hp[target]) + amount))
+                combatant.current_hp = int(combatant.member_hp.sum())
+                self._record(self._hp_op(combatant, changed), undo)
+            return combatant.to_dict(self.combat_round)
 
+        undo = self._hp_op(combatant)
+        combatant.current_hp = max(0, min(combatant.max_hp, combatant.current_hp + amount))
+        self._record(self._hp_op(combatant), undo)
+        return combatant.to_dict(self.combat_round)
+
+    @_journaled
     def deal_damage(self, name: str, damage: int) -> Optional[Dict[str, Any]]:
         """Deals damage to a combatant."""
         if damage < 0: damage = 0 # Damage cannot be negative
         return self._modify_hp(name, -damage)
 
+    @_journaled
     def heal(self, name: str, healing: int) -> Optional[Dict[str, Any]]:
         """Heals a combatant."""
         if healing < 0: healing = 0 # Healing cannot be negative
         return self._modify_hp(name, healing)
 
+    @_journaled
     def set_hp(self, name: str, hp: int, set_max_too: bool = False) -> Optional[Dict[str, Any]]:
         """Sets current HP. Optionally also sets max_hp."""
-        combatant = self.get_combatant(name)
+        combatant = self._order.get(name)
         if not combatant:
             return None
         
+        living = np.flatnonzero(combatant.member_hp > 0) if combatant.is_group else None
+        undo = self._hp_op(combatant, living)
         if set_max_too:
-            combatant["max_hp"] = max(0,hp) # Max HP shouldn't be negative
-        combatant["current_hp"] = max(0, min(combatant["max_hp"], hp))
-        return combatant
+            combatant.max_hp = max(0,hp) # Max HP shouldn't be negative
+        if combatant.is_group:
+            # Sets every living member; fallen members stay down
+            combatant.member_hp[living] = max(0, min(combatant.max_hp, hp))
+            combatant.current_hp = int(combatant.member_hp.sum())
+        else:
+            combatant.current_hp = max(0, min(combatant.max_hp, hp))
+        self._record(self._hp_op(combatant, living), undo)
+        return combatant.to_dict(self.combat_round)
     
+    @_journaled
     def set_max_hp(self, name: str, max_hp: int, adjust_current_hp: bool = True) -> Optional[Dict[str, Any]]:
         """Sets max HP for a combatant. Optionally adjusts current HP to match if it exceeds new max."""
-        combatant = self.get_combatant(name)
+        combatant = self._order.get(name)
         if not combatant:
             return None
-        combatant["max_hp"] = max(0, max_hp) # Max HP shouldn't be negative
+        capped = None
+        if adjust_current_hp and combatant.is_group:
+            capped = np.flatnonzero(combatant.member_hp > max(0, max_hp)) # Only these members change
+        undo = self._hp_op(combatant, capped)
+        combatant.max_hp = max(0, max_hp) # Max HP shouldn't be negative
         if adjust_current_hp:
-            combatant["current_hp"] = min(combatant["current_hp"], combatant["max_hp"])
-        return combatant
+            if combatant.is_group:
+                combatant.member_hp[capped] = combatant.max_hp
+                combatant.current_hp = int(combatant.member_hp.sum())
+            else:
+                combatant.current_hp = min(combatant.current_hp, combatant.max_hp)
+        self._record(self._hp_op(combatant, capped), undo)
+        return combatant.to_dict(self.combat_round)
+
+
+    # --- Area Effects ---
+    @_journaled
+    def set_defenses(self, name: str, saves: Optional[Dict[str, int]] = None, resistances: Optional[List[str]] = None, immunities: Optional[List[str]] = None, vulnerabilities: Optional[List[str]] = None) -> bool:
+        """
+        Records a combatant's (or group's) saving throw bonuses and damage defenses, used by apply_area_effect.
+        Args:
+            saves (Optional[Dict[str, int]]): Save bonus by ability, e.g. {"dex": 2, "wis": -1}.
+            resistances / immunities / vulnerabilities (Optional[List[str]]): Damage types, e.g. ["fire", "poison"].
+        Returns:
+            bool: False if the combatant is not found.
+        """
+        combatant = self._order.get(name)
+        if not combatant:
+            return False
+        undo = self._put_op(combatant)
+        if saves is not None:
+            combatant.saves = {ability[:3].lower(): bonus for ability, bonus in saves.items()}
+        if resistances is not None:
+            combatant.resistances = [t.lower() for t in resistances]
+        if immunities is not None:
+            combatant.immunities = [t.lower() for t in immunities]
+        if vulnerabilities is not None:
+            combatant.vulnerabilities = [t.lower() for t in vulnerabilities]
+        self._record(self._put_op(combatant), undo)
+        return True
+
+    @_journaled
+    def apply_area_effect(self, targets: List[str], dice: str, save_dc: Optional[int] = None, save_ability: Optional[str] = None, half_on_save: bool = True, damage_type: Optional[str] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Resolves a multi-target damaging effect (e.g., Fireball) in one call: rolls the damage once,
+        rolls every target's save in a single vectorized batch (one per living member for groups),
+        halves or negates damage on a save, applies resistances, immunities and vulnerabilities,
+        and updates HP.
+        Args:
+            targets (List[str]): Combatant or group names caught in the area.
+            dice (str): Damage dice expression, e.g. '8d6'.
+            save_dc (Optional[int]): Save DC. If omitted, every target takes full damage.
+            save_ability (Optional[str]): Ability for the save, e.g. 'dex'. Bonuses come from set_defenses.
+            half_on_save (bool): Half damage on a successful save; if False a save negates it.
+            damage_type (Optional[str]): Damage type checked against defenses, e.g. 'fire'.
+            seed (Optional[int]): Seed for reproducible damage and save rolls.
+        Returns:
+            Dict[str, Any]: 'damage_roll', 'results' (one compact entry per target), 'downed' and 'not_found',
+                            or 'error' if the dice are invalid.
+        """
+        plan, error = self._compile(dice)
+        if error:
+            return {"error": error}
+        if save_dc is not None and not save_ability:
+            return {"error": "save_ability is required when save_dc is given."}
+        ability = save_ability[:3].lower() if save_ability else None
+        rng = np.random.default_rng(seed) if seed is not None else self._rng
+        damage_roll = max(0, plan.modifier + sum(int(_roll_term_batch(t, 1, rng)[0]) for t in plan.terms))
+
+        # One save per single combatant and per living group member, rolled together
+        hit: List[Combatant] = []
+        members: List[np.ndarray] = []
+        bonuses: List[np.ndarray] = []
+        not_found = []
+        for name in dict.fromkeys(targets):
+            combatant = self._order.get(name)
+            if not combatant:
+                not_found.append(name)
+                continue
+            idx = self._group_targets(combatant, None) if combatant.is_group else np.zeros(1, dtype=np.int64)
+            hit.append(combatant)
+            members.append(idx)
+            bonuses.append(np.full(idx.size, (combatant.saves or {}).get(ability, 0), dtype=np.int64))
+        sizes = [idx.size for idx in members]
+        bonus = np.concatenate(bonuses) if bonuses else np.zeros(0, dtype=np.int64)
+        if save_dc is not None:
+            saves = rng.integers(1, 21, size=bonus.size) + bonus
+            saved = saves >= save_dc
+        else:
+            saves = None
+            saved = np.zeros(bonus.size, dtype=bool)
+        damage = np.where(saved, damage_roll // 2 if half_on_save else 0, damage_roll)
+
+        results = []
+        downed = []
+        offset = 0
+        for combatant, idx, size in zip(hit, members, sizes):
+            dmg = damage[offset:offset + size]
+            made = saved[offset:offset + size]
+            multiplier = combatant.damage_multiplier(damage_type)
+            dmg = (dmg * multiplier).astype(np.int64)
+            if combatant.is_group:
+                entry = self.damage_group(combatant.name, dmg, members=idx)
+                entry["saved"] = int(made.sum())
+                if entry["survivors"] == 0 and entry["killed"]:
+                    downed.append(combatant.name)
+            else:
+                undo = self._hp_op(combatant)
+                before = combatant.current_hp
+                combatant.current_hp = max(0, before - int(dmg[0]))
+                self._record(self._hp_op(combatant), undo)
+                entry = {"name": combatant.name, "saved": bool(made[0]), "damage": before - combatant.current_hp, "current_hp": combatant.current_hp}
+                if saves is not None:
+                    entry["save"] = int(saves[offset])
+                if before > 0 and combatant.current_hp == 0:
+                    downed.append(combatant.name)
+            if multiplier != 1.0:
+                entry["multiplier"] = multiplier
+            results.append(entry)
+            offset += size
 
+        return {
+            "damage_roll": damage_roll,
+            "damage_type": damage_type,
+            "save_dc": save_dc,
+            "save_ability": ability,
+            "results": results,
+            "downed": downed,
+            "not_found": not_found,
+        }
 
     # --- Status Effects ---
-    def add_status_effect(self, name: str, effect_name: str, duration_rounds: Optional[int] = None, notes: str = "") -> bool:
-        """Adds a status effect to a combatant."""
-        combatant = self.get_combatant(name)
+    @_journaled
+    def add_status_effect(self, name: str, effect_name: str, duration_rounds: Optional[int] = None, notes: str = "", ends: Optional[str] = None, anchor: Optional[str] = None) -> bool:
+        """
+        Adds a status effect to a combatant.
+        Args:
+            name (str): Combatant receiving the effect.
+            effect_name (str): Name of the effect, e.g. "Frightened".
+            duration_rounds (Optional[int]): Without `ends`, the effect expires when this many rounds have
+                                             passed. With `ends`, it counts the anchor's upcoming turns (default 1).
+                                             None means indefinite.
+            notes (str): Free-form notes.
+            ends (Optional[str]): "start_of_turn" or "end_of_turn" to expire on the anchor's turn boundary,
+                                  e.g. "until the end of X's next turn".
+            anchor (Optional[str]): Combatant whose turn ends the effect. Defaults to `name`.
+        Returns:
+            bool: False if the combatant or anchor is not found or `ends` is invalid.
+        """
+        combatant = self._order.get(name)
         if not combatant:
             return False
         # Avoid duplicate effects by name; could be extended to allow stacking with different rules
-        if any(e["name"] == effect_name for e in combatant["status_effects"]):
+        if combatant.effect(effect_name):
             # Optionally, refresh duration here if desired, or just return False/True
             return True # Or False if strict no duplicates allowed
-            
-        combatant["status_effects"].append({
-            "name": effect_name,
-            "duration_rounds": duration_rounds,
-            "notes": notes,
-            "applied_round": self.combat_round 
-        })
+
+        undo = self._put_op(combatant)
+        effect = StatusEffect(effect_name, duration_rounds, notes, self.combat_round)
+        if ends:
+            anchor = anchor or name
+            anchor_key = self._order.key_of(anchor)
+            if ends not in StatusEffect.TURN_BOUNDARIES or anchor_key is None:
+                return False
+            turns = duration_rounds if duration_rounds is not None else 1
+            current_key = self._order.key_of(self.combatants[self.current_turn_idx].name)
+            # The anchor's first upcoming turn is this round if it hasn't acted yet, otherwise next round
+            first_round = self.combat_round if anchor_key > current_key else self.combat_round + 1
+            effect.ends, effect.anchor = ends, anchor
+            effect.duration_rounds = turns
+            effect.expires_round = first_round + max(turns, 1) - 1
+        elif duration_rounds is not None:
+            effect.expires_round = self.combat_round + duration_rounds
+        combatant.status_effects.append(effect)
+        self._schedule_effect(name, effect)
+        self._record(self._put_op(combatant), undo)
         return True
 
+    @_journaled
     def remove_status_effect(self, name: str, effect_name: str) -> bool:
         """Removes a status effect from a combatant."""
-        combatant = self.get_combatant(name)
+        combatant = self._order.get(name)
         if not combatant:
             return False
         
-        initial_len = len(combatant["status_effects"])
-        combatant["status_effects"] = [e for e in combatant["status_effects"] if e["name"] != effect_name]
-        return len(combatant["status_effects"]) < initial_len
+        undo = self._put_op(combatant)
+        initial_len = len(combatant.status_effects)
+        combatant.status_effects = [e for e in combatant.status_effects if e.name != effect_name]
+        if len(combatant.status_effects) == initial_len:
+            return False
+        self._record(self._put_op(combatant), undo)
+        return True
 
     # --- In-Game Time ---
     def get_in_game_datetime_str(self) -> str:
@@ -297,8 +1424,10 @@ class DnDBot:
         gt = self.game_time
         return f"Year {gt['year']}, Day {gt['day']}, {gt['hour']:02d}:{gt['minute']:02d}"
 
+    @_journaled
     def advance_time(self, years: int = 0, days: int = 0, hours: int = 0, minutes: int = 0) -> None:
         """Advances the in-game time."""
+        undo = self._time_op()
         # Rough calculation, assumes 30 days/month, 365 days/year for simplicity.
         # D&D calendars can be more complex (e.g., Harptos). This is a basic version.
         self.game_time["minute"] += minutes
@@ -315,6 +1444,7 @@ class DnDBot:
         self.game_time["day"] = (self.game_time["day"] -1) % 365 + 1 # Keep day between 1-365
 
         self.game_time["year"] += years
+        self._record(self._time_op(), undo)
 
     # --- State Persistence (for GPT interaction) ---
     def get_full_state(self) -> Dict[str, Any]:
@@ -323,10 +1453,11 @@ class DnDBot:
         This can be serialized to JSON by the calling application (e.g., the GPT).
         """
         return {
-            "initiative_order": self.initiative_order,
+            "initiative_order": [c.to_dict(self.combat_round) for c in self.combatants],
             "current_turn_idx": self.current_turn_idx,
             "combat_round": self.combat_round,
-            "game_time": self.game_time,
+            "game_time": dict(self.game_time),
+            "version": self.state_version,
         }
 
     def load_full_state(self, state: Dict[str, Any]) -> bool:
@@ -336,22 +1467,29 @@ class DnDBot:
             bool: True if loading was successful (basic check), False otherwise.
         """
         try:
-            self.initiative_order = state.get("initiative_order", [])
+            initiative_order = state.get("initiative_order", [])
             self.current_turn_idx = state.get("current_turn_idx", 0)
             self.combat_round = state.get("combat_round", 0)
             self.game_time = state.get("game_time", {"year": 1491, "day": 1, "hour": 12, "minute": 0})
             
             # Basic validation
-            if not isinstance(self.initiative_order, list) or \
+            if not isinstance(initiative_order, list) or \
                not isinstance(self.current_turn_idx, int) or \
                not isinstance(self.combat_round, int) or \
                not isinstance(self.game_time, dict):
                 raise ValueError("Invalid state structure.")
+            self._order = InitiativeOrder.from_list(initiative_order)
+            self._rebuild_effect_schedule()
+            self.game_time = dict(self.game_time)
+            self.state_version = state.get("version", 0)
+            self._state_log = []
+            self._log_base_version = self._snapshot_version = self.state_version
+            self._clear_journal()
 
             # Further ensure current_turn_idx is valid for the loaded initiative_order
-            if self.initiative_order and self.current_turn_idx >= len(self.initiative_order):
+            if self.combatants and self.current_turn_idx >= len(self.combatants):
                 self.current_turn_idx = 0
-            elif not self.initiative_order:
+            elif not self.combatants:
                  self.current_turn_idx = 0
 
 
@@ -362,6 +1500,235 @@ class DnDBot:
             return False
         return True
 
+    # --- Incremental State (operation log) ---
+    def _record(self, op: Dict[str, Any], inverse: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Appends a state operation to the log under the next version number. With an inverse,
+        the pair is also added to the undo journal entry of the current action.
+        """
+        self.state_version += 1
+        op["v"] = self.state_version
+        self._state_log.append(op)
+        if len(self._state_log) > STATE_LOG_LIMIT:
+            # Readers further behind than the retained window get a full snapshot instead
+            drop = len(self._state_log) - STATE_LOG_LIMIT
+            self._log_base_version = self._state_log[drop - 1]["v"]
+            del self._state_log[:drop]
+        if inverse is not None and self._action_depth:
+            self._action_ops.append(op)
+            self._action_inverse.append(inverse)
+
+    def _put_op(self, combatant: Combatant) -> Dict[str, Any]:
+        return {"op": "put", "combatant": combatant.to_dict(self.combat_round)}
+
+    def _hp_op(self, combatant: Combatant, members: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """An HP-only change, logged compactly; for a group only the given members' HP is logged."""
+        op = {"op": "hp", "name": combatant.name, "current_hp": combatant.current_hp, "max_hp": combatant.max_hp}
+        if members is not None:
+            op["members"] = members.tolist()
+            op["member_hp"] = combatant.member_hp[members].tolist()
+        return op
+
+    def _turn_op(self) -> Dict[str, Any]:
+        return {"op": "turn", "current_turn_idx": self.current_turn_idx, "combat_round": self.combat_round}
+
+    def _time_op(self) -> Dict[str, Any]:
+        return {"op": "time", "game_time": dict(self.game_time)}
+
+    def _apply_op(self, op: Dict[str, Any]) -> None:
+        """Replays one logged operation onto this bot's state."""
+        kind = op["op"]
+        if kind in ("add", "put"):
+            combatant = Combatant.from_dict(op["combatant"])
+            if kind == "add" or not self._order.replace(combatant):
+                self._order.insert_at(combatant, op.get("index", len(self._order)))
+            for effect in combatant.status_effects:
+                self._schedule_effect(combatant.name, effect)
+        elif kind == "hp":
+            combatant = self._order.get(op["name"])
+            if combatant is None:
+                raise KeyError(f"No combatant named '{op['name']}'.")
+            if "members" in op:
+                if not combatant.is_group:
+                    raise ValueError(f"'{op['name']}' is not a group.")
+                combatant.member_hp[np.asarray(op["members"], dtype=np.int64)] = op["member_hp"]
+            combatant.current_hp, combatant.max_hp = op["current_hp"], op["max_hp"]
+        elif kind == "remove":
+            self._order.remove(op["name"])
+        elif kind == "turn":
+            self.current_turn_idx = op["current_turn_idx"]
+            self.combat_round = op["combat_round"]
+        elif kind == "time":
+            self.game_time = dict(op["game_time"])
+        else:
+            raise ValueError(f"Unknown state operation '{kind}'.")
+
+    def get_state_delta(self, since_version: int) -> Dict[str, Any]:
+        """
+        Returns the operations applied after since_version, so a save only ships what changed.
+        Falls back to a full snapshot if since_version is older than the retained log.
+        Returns:
+            Dict[str, Any]: {'base_version', 'version', 'ops'}, {'version', 'snapshot'}, or 'error'.
+        """
+        if since_version > self.state_version:
+            return {"error": f"Version {since_version} is newer than the current version {self.state_version}."}
+        if since_version < self._log_base_version:
+            return {"version": self.state_version, "snapshot": self.get_full_state()}
+        start = len(self._state_log) - (self.state_version - since_version)
+        ops = copy.deepcopy(self._state_log[start:]) # Callers may edit or serialize them; the log must stay intact
+        return {"base_version": since_version, "version": self.state_version, "ops": ops}
+
+    def apply_delta(self, delta: Dict[str, Any]) -> bool:
+        """
+        Applies a delta from get_state_delta (e.g., loaded from a save). Operations this bot has
+        already seen are skipped; the applied ones are logged so this bot can serve deltas too.
+        The delta is applied all or nothing: if any operation fails, the state is rolled back.
+        Returns:
+            bool: True if applied, False if the delta starts after this bot's version or is invalid.
+        """
+        if "snapshot" in delta:
+            return self.load_full_state(delta["snapshot"])
+        if delta.get("base_version", 0) > self.state_version:
+            return False # A gap: some operations in between are missing
+        checkpoint = None
+        try:
+            ops = [op for op in delta.get("ops", []) if op["v"] > self.state_version]
+            if not ops:
+                return True
+            checkpoint = self._checkpoint()
+            for op in ops:
+                self._apply_op(op)
+                self.state_version = op["v"] - 1
+                self._record(copy.deepcopy(op))
+        except Exception as e:
+            print(f"Error applying state delta: {e}")
+            if checkpoint is not None:
+                self._rollback(checkpoint)
+            return False
+        self._clear_journal() # Local undo history no longer matches the replayed state
+        return True
+
+    def _checkpoint(self) -> Tuple:
+        """Everything apply_delta may change, for _rollback."""
+        return (self.get_full_state(), list(self._state_log), self._log_base_version, self._snapshot_version,
+                list(self._undo_journal), list(self._redo_journal))
+
+    def _rollback(self, checkpoint: Tuple) -> None:
+        state, log, base_version, snapshot_version, undo, redo = checkpoint
+        self.load_full_state(state)
+        self._state_log, self._log_base_version, self._snapshot_version = log, base_version, snapshot_version
+        self._undo_journal.extend(undo)
+        self._redo_journal = redo
+
+    def compact_state_log(self) -> Dict[str, Any]:
+        """Drops the operation log and returns a full snapshot to persist in its place."""
+        self._state_log = []
+        self._log_base_version = self._snapshot_version = self.state_version
+        return self.get_full_state()
+
+    def save_state(self, file_path: str) -> bool:
+        """Saves a full state snapshot with state_serializer. Returns True if successful."""
+        return self.save_json(file_path, self.get_full_state(), self.state_serializer)
+
+    def load_state(self, file_path: str) -> bool:
+        """Loads a snapshot saved by save_state or save_json, whatever its serializer."""
+        state = self.load_json(file_path)
+        return state is not None and self.load_full_state(state)
+
+    def save_state_delta(self, snapshot_path: str, log_path: str, since_version: int) -> Optional[int]:
+        """
+        Appends the operations after since_version to a JSON-lines log file. Once the log has
+        grown past STATE_LOG_COMPACT_OPS operations, writes a fresh snapshot and truncates the log.
+        Returns:
+            Optional[int]: The version now persisted (pass it as since_version next time), or None on error.
+        """
+        delta = self.get_state_delta(since_version)
+        if "error" in delta:
+            return None
+        try:
+            if "snapshot" in delta or not os.path.exists(snapshot_path) or \
+               self.state_version - self._snapshot_version > STATE_LOG_COMPACT_OPS:
+                if not self.save_json(snapshot_path, self.compact_state_log(), self.state_serializer):
+                    return None
+                open(log_path, "wb").close()
+            elif delta["ops"]:
+                with open(log_path, "ab") as f:
+                    f.write(b"".join(storage.encode_json(op) + b"\n" for op in delta["ops"]))
+        except Exception as e:
+            print(f"Error saving state delta to {log_path}: {e}")
+            return None
+        return self.state_version
+
+    def load_state_with_log(self, snapshot_path: str, log_path: str) -> bool:
+        """Loads a snapshot written by save_state_delta and replays its operation log."""
+        snapshot = self.load_json(snapshot_path)
+        if snapshot is None or not self.load_full_state(snapshot):
+            return False
+        if not os.path.exists(log_path):
+            return True
+        try:
+            with open(log_path, "rb") as f:
+                lines = [line for line in f if line.strip()]
+            ops = [storage.decode_payload("json", line) for line in lines[:-1]]
+            if lines:
+                try:
+                    ops.append(storage.decode_payload("json", lines[-1]))
+                except ValueError:
+                    print(f"Ignoring a partially written last entry in {log_path}") # Crash mid-append
+        except Exception as e:
+            print(f"Error loading state log from {log_path}: {e}")
+            return False
+        return self.apply_delta({"base_version": self.state_version, "ops": ops})
+
+    # --- Undo / Redo ---
+    def _clear_journal(self) -> None:
+        self._undo_journal.clear()
+        self._redo_journal.clear()
+
+    def undo(self, steps: int = 1) -> List[str]:
+        """
+        Reverts the most recent actions by replaying their recorded inverse operations; only the
+        combatants an action touched are restored, so each step costs the same whatever the encounter size.
+        Args:
+            steps (int): Number of actions to undo. Defaults to 1.
+        Returns:
+            List[str]: Names of the undone actions (e.g., 'deal_damage'), most recent first.
+        """
+        undone = []
+        while len(undone) < steps and self._undo_journal:
+            action, ops, inverse = self._undo_journal.pop()
+            for op in reversed(inverse):
+                self._apply_op(op)
+                self._record(dict(op))
+            self._redo_journal.append((action, ops, inverse))
+            undone.append(action)
+        return undone
+
+    def redo(self, steps: int = 1) -> List[str]:
+        """
+        Re-applies actions reverted by undo. Any new action clears the redo history.
+        Args:
+            steps (int): Number of actions to redo. Defaults to 1.
+        Returns:
+            List[str]: Names of the redone actions, oldest first.
+        """
+        redone = []
+        while len(redone) < steps and self._redo_journal:
+            action, ops, inverse = self._redo_journal.pop()
+            for op in ops:
+                self._apply_op(op)
+                self._record(dict(op))
+            self._undo_journal.append((action, ops, inverse))
+            redone.append(action)
+        return redone
+
+    def get_undo_history(self) -> Dict[str, List[str]]:
+        """Returns the action names available to undo (most recent last) and to redo (next first)."""
+        return {
+            "undo": [action for action, _, _ in self._undo_journal],
+            "redo": [action for action, _, _ in reversed(self._redo_journal)],
+        }
+
     # --- Utility Functions (from original script) ---
     def get_current_real_datetime(self) -> str:
         """Returns the current real-world date and time."""
@@ -393,25 +1760,78 @@ class DnDBot:
             os.makedirs(os.path.join(campaign_path, sub), exist_ok=True)
         return campaign_path
 
-    def save_json(self, file_path: str, data: Dict[str, Any]) -> bool:
-        """Saves a dictionary as a minified JSON file. Returns True if successful."""
+    def save_json(self, file_path: str, data: Dict[str, Any], serializer: Optional[str] = None) -> bool:
+        """
+        Saves a dictionary as minified JSON after a checksum header line, so the file is not plain
+        JSON: read it back with load_json (storage.read_json), not json.load. The write is atomic
+        (temp file, fsync, rename), so a crash mid-save leaves the previous file intact.
+        serializer picks another encoder from storage.SERIALIZERS (e.g. "msgpack"); load_json
+        detects the format by itself. Returns True if successful.
+        """
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, separators=(",", ":"))
+            storage.write_json(file_path, data, serializer)
             return True
         except Exception as e:
             print(f"Error saving JSON to {file_path}: {e}")
             return False
 
     def load_json(self, file_path: str) -> Optional[Dict[str, Any]]:
-        """Loads a JSON file and returns its contents as a dictionary, or None if error."""
+        """Loads a file saved by save_json (any serializer) or a plain JSON file. Returns None if missing or corrupt."""
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return storage.read_json(file_path)
+        except storage.CorruptFileError as e:
+            print(f"Corrupt JSON file {file_path}: {e}")
+            return None
         except Exception as e:
             print(f"Error loading JSON from {file_path}: {e}")
             return None
 
+    def open_campaign_file(self, file_path: str) -> Optional[lazy_json.LazyJSONFile]:
+        """
+        Opens a large campaign or character file lazily: the file is memory-mapped and indexed,
+        and only the entries you access are decoded, e.g. f.find("npcs", "npc_captain_vexa"),
+        f.item("quests", 0) or f["title"]. Close it (or use `with`) when done.
+        Opening costs about as much time as load_json (one pass over the file); the gain is
+        memory and, for a file kept open, lookups that take microseconds. For a single lookup
+        in a small file, load_json is just as good.
+        Returns None if the file is missing, corrupt or not a JSON object.
+        """
+        try:
+            return lazy_json.LazyJSONFile(file_path)
+        except Exception as e:
+            print(f"Error opening {file_path}: {e}")
+            return None
+
+    def validate_record(self, data: Dict[str, Any], kind: str) -> List[str]:
+        """
+        Validates a campaign, character, npc or session record against its template schema.
+        Returns:
+            List[str]: Problems found (empty if valid), or a single error for an unknown kind.
+        """
+        if kind not in lazy_json.SCHEMAS:
+            return [f"Unknown record kind '{kind}'. Use one of: {', '.join(lazy_json.SCHEMAS)}."]
+        return lazy_json.validate(data, lazy_json.SCHEMAS[kind])
+
+    def autosave_json(self, file_path: str, data: Dict[str, Any]) -> bool:
+        """
+        Queues a save through the write-behind buffer: a burst of autosaves to the same file
+        becomes one atomic write after storage.AUTOSAVE_DELAY seconds. Call flush_autosaves()
+        before reading the file back.
+        Returns True if queued, False if the data can't be serialized.
+        """
+        if self._writer is None:
+            self._writer = storage.WriteBehindWriter()
+        try:
+            self._writer.save(file_path, data)
+            return True
+        except (TypeError, ValueError) as e:
+            print(f"Error saving JSON to {file_path}: {e}")
+            return False
+
+    def flush_autosaves(self) -> bool:
+        """Writes any pending autosaves now. Returns True if all were written."""
+        return self._writer.flush() if self._writer is not None else True
+
     def validate_character_name(self, name: str, existing_names: List[str]) -> bool:
         """Ensures the character name is unique and valid (alphanumeric, not empty, not already used)."""
         if not name or not name.strip():
@@ -423,24 +1843,75 @@ class DnDBot:
             return False
         return True
 
+    def use_campaign_store(self, db_path: str) -> CampaignStore:
+        """
+        Switches session archiving and live-session resets to a single-file SQLite campaign
+        store (see campaign_store.py) instead of per-file JSON. Import existing campaign
+        folders with store.import_folder().
+        Returns:
+            CampaignStore: The opened store.
+        """
+        if self.campaign_store is not None:
+            self.campaign_store.close()
+        self.campaign_store = CampaignStore(db_path)
+        return self.campaign_store
+
     def archive_session(self, campaign_name: str, session_data: Dict[str, Any]) -> bool:
-        """Archives the current session data into the /archive/ folder. Returns True if successful."""
+        """
+        Archives the session into the campaign's compressed, indexed /archive/ (see session_archive.py),
+        or into the campaign store if one is in use. Returns True if successful.
+        """
+        if self.campaign_store is not None:
+            try:
+                self.campaign_store.archive_session(campaign_name, session_data)
+                return True
+            except Exception as e:
+                print(f"Error archiving session: {e}")
+                return False
+        try:
+            self._session_archive(campaign_name).append(session_data)
+            return True
+        except Exception as e:
+            print(f"Error archiving session: {e}")
+            return False
+
+    def _session_archive(self, campaign_name: str) -> SessionArchive:
         campaign_path = self.create_campaign_folders(campaign_name)
-        archive_path = os.path.join(campaign_path, "archive")
-        # Find next available session number
-        existing = [f for f in os.listdir(archive_path) if f.startswith("session_") and f.endswith(".json")]
-        session_nums = [int(f.split("_")[1].split(".")[0]) for f in existing if f.split("_")[1].split(".")[0].isdigit()]
-        next_num = max(session_nums, default=0) + 1
-        archive_file = os.path.join(archive_path, f"session_{next_num}.json")
-        return self.save_json(archive_file, session_data)
+        return SessionArchive(os.path.join(campaign_path, "archive"))
+
+    def get_archived_session(self, campaign_name: str, session_number: int) -> Optional[Dict[str, Any]]:
+        """Loads one archived session by number, without reading the others. Returns None if not found."""
+        try:
+            if self.campaign_store is not None:
+                return self.campaign_store.get_session(campaign_name, session_number)
+            return self._session_archive(campaign_name).get(session_number)
+        except Exception as e:
+            print(f"Error loading session {session_number}: {e}")
+            return None
+
+    def list_archived_sessions(self, campaign_name: str) -> List[Dict[str, Any]]:
+        """Lists archived sessions (number, date, location) from the archive index, oldest first."""
+        try:
+            if self.campaign_store is not None:
+                return self.campaign_store.sessions(campaign_name)
+            return self._session_archive(campaign_name).sessions()
+        except Exception as e:
+            print(f"Error listing sessions: {e}")
+            return []
 
     def reset_live_session(self, campaign_name: str) -> bool:
         """Resets the live session file for the campaign (empties or recreates session_live.json)."""
+        if self.campaign_store is not None:
+            try:
+                self.campaign_store.put_live_session(campaign_name, {})
+                return True
+            except Exception as e:
+                print(f"Error resetting live session: {e}")
+                return False
         campaign_path = self.create_campaign_folders(campaign_name)
         state_path = os.path.join(campaign_path, "state", "session_live.json")
         try:
-            with open(state_path, "w", encoding="utf-8") as f:
-                json.dump({}, f)
+            storage.write_json(state_path, {})
             return True
         except Exception as e:
             print(f"Error resetting live session: {e}")
@@ -0,0 +1,407 @@
+"""
+campaign_store.py – optional single-file SQLite backend for campaign data.
+
+Campaigns, characters, NPCs, live and archived sessions and the roll log live in indexed
+tables of one database (WAL mode, one transaction per action), so lookups such as "all NPCs
+at loc_tidebreak" or "session 37" are index queries instead of directory scans. Campaign
+folders in the JSON layout can be imported and exported:
+
+    python old/campaign_store.py import "ChatGPT Table Top/My Campaign" --db campaigns.db
+    python old/campaign_store.py export "My Campaign" out/ --db campaigns.db
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import storage
+from session_archive import MANIFEST_FILE, SessionArchive
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    name TEXT PRIMARY KEY,
+    title TEXT,
+    last_session INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS characters (
+    id TEXT PRIMARY KEY,
+    campaign TEXT NOT NULL REFERENCES campaigns (name) ON DELETE CASCADE,
+    player TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_characters_campaign ON characters (campaign, player);
+CREATE TABLE IF NOT EXISTS npcs (
+    id TEXT PRIMARY KEY,
+    campaign TEXT NOT NULL REFERENCES campaigns (name) ON DELETE CASCADE,
+    name TEXT,
+    loc TEXT,
+    standing TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_npcs_loc ON npcs (campaign, loc);
+CREATE INDEX IF NOT EXISTS idx_npcs_name ON npcs (campaign, name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS sessions (
+    campaign TEXT NOT NULL REFERENCES campaigns (name) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    date TEXT,
+    loc TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (campaign, number)
+);
+CREATE TABLE IF NOT EXISTS live_sessions (
+    campaign TEXT PRIMARY KEY REFERENCES campaigns (name) ON DELETE CASCADE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rolls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign TEXT NOT NULL REFERENCES campaigns (name) ON DELETE CASCADE,
+    session INTEGER,
+    at TEXT NOT NULL,
+    who TEXT,
+    expression TEXT NOT NULL,
+    total INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rolls_session ON rolls (campaign, session);
+"""
+
+_SESSION_FILE = re.compile(r"^session_(\d+)\.json$")
+
+
+def _session_number(filename: str) -> Optional[int]:
+    match = _SESSION_FILE.match(filename)
+    return int(match.group(1)) if match else None
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"))
+
+
+class CampaignStore:
+    """SQLite campaign database. Every public write is one transaction."""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the campaign database.
+        Args:
+            path (str): Path of the SQLite file.
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL") # Durable at checkpoints; safe against corruption
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(SCHEMA)
+        self._depth = 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Groups writes into one transaction; nested uses join the outer one."""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute("COMMIT")
+
+    def _query(self, sql: str, values: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, values).fetchall()
+
+    # --- Campaigns ---
+    def put_campaign(self, name: str, data: Dict[str, Any]) -> None:
+        """Creates or replaces a campaign (campaign.json contents) under its folder name."""
+        with self.transaction() as db:
+            db.execute(
+                "INSERT INTO campaigns (name, title, last_session, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET title = excluded.title, "
+                "last_session = MAX(campaigns.last_session, excluded.last_session), data = excluded.data",
+                (name, data.get("title"), int(data.get("lastSession") or 0), _dumps(data)))
+
+    def _ensure_campaign(self, db: sqlite3.Connection, name: str) -> None:
+        db.execute("INSERT OR IGNORE INTO campaigns (name, title, data) VALUES (?, ?, ?)",
+                   (name, name, _dumps({"title": name, "lastSession": 0})))
+
+    def get_campaign(self, name: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT data, last_session FROM campaigns WHERE name = ?", (name,))
+        if not rows:
+            return None
+        data = json.loads(rows[0][0])
+        data["lastSession"] = rows[0][1]
+        return data
+
+    def campaigns(self) -> List[str]:
+        return [row[0] for row in self._query("SELECT name FROM campaigns ORDER BY name")]
+
+    # --- Characters ---
+    def put_character(self, campaign: str, data: Dict[str, Any]) -> None:
+        """Creates or replaces a character (character.json contents, keyed by its 'id')."""
+        with self.transaction() as db:
+            self._ensure_campaign(db, campaign)
+            db.execute("INSERT OR REPLACE INTO characters (id, campaign, player, data) VALUES (?, ?, ?, ?)",
+                       (data["id"], campaign, data.get("player"), _dumps(data)))
+
+    def get_character(self, character_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT data FROM characters WHERE id = ?", (character_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def characters(self, campaign: str, player: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Characters of a campaign, optionally only those of one player."""
+        if player is None:
+            rows = self._query("SELECT data FROM characters WHERE campaign = ? ORDER BY id", (campaign,))
+        else:
+            rows = self._query("SELECT data FROM characters WHERE campaign = ? AND player = ? ORDER BY id",
+                               (campaign, player))
+        return [json.loads(row[0]) for row in rows]
+
+    # --- NPCs ---
+    def put_npc(self, campaign: str, data: Dict[str, Any]) -> None:
+        """Creates or replaces an NPC (npc.json contents, keyed by its 'id')."""
+        with self.transaction() as db:
+            self._ensure_campaign(db, campaign)
+            db.execute("INSERT OR REPLACE INTO npcs (id, campaign, name, loc, standing, data) VALUES (?, ?, ?, ?, ?, ?)",
+                       (data["id"], campaign, data.get("name"), data.get("loc"), data.get("standing"), _dumps(data)))
+
+    def get_npc(self, npc_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT data FROM npcs WHERE id = ?", (npc_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def npcs(self, campaign: str, loc: Optional[str] = None, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """NPCs of a campaign, optionally filtered by location id (e.g. 'loc_tidebreak') or exact name."""
+        sql, values = "SELECT data FROM npcs WHERE campaign = ?", [campaign]
+        if loc is not None:
+            sql += " AND loc = ?"
+            values.append(loc)
+        if name is not None:
+            sql += " AND name = ? COLLATE NOCASE"
+            values.append(name)
+        return [json.loads(row[0]) for row in self._query(sql + " ORDER BY id", tuple(values))]
+
+    # --- Sessions ---
+    def archive_session(self, campaign: str, data: Dict[str, Any], number: Optional[int] = None) -> int:
+        """
+        Archives a session under the next session number (or the given one).
+        Returns:
+            int: The session number.
+        """
+        with self.transaction() as db:
+            self._ensure_campaign(db, campaign)
+            if number is None:
+                number = db.execute("SELECT COALESCE(MAX(number), 0) + 1 FROM sessions WHERE campaign = ?",
+                                    (campaign,)).fetchone()[0]
+            db.execute("INSERT OR REPLACE INTO sessions (campaign, number, date, loc, data) VALUES (?, ?, ?, ?, ?)",
+                       (campaign, number, data.get("date"), data.get("loc"), _dumps(data)))
+            db.execute("UPDATE campaigns SET last_session = MAX(last_session, ?) WHERE name = ?", (number, campaign))
+        return number
+
+    def get_session(self, campaign: str, number: int) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT data FROM sessions WHERE campaign = ? AND number = ?", (campaign, number))
+        return json.loads(rows[0][0]) if rows else None
+
+    def sessions(self, campaign: str) -> List[Dict[str, Any]]:
+        """Index of archived sessions: number, date and location, oldest first."""
+        rows = self._query("SELECT number, date, loc FROM sessions WHERE campaign = ? ORDER BY number", (campaign,))
+        return [{"session": number, "date": date, "loc": loc} for number, date, loc in rows]
+
+    def put_live_session(self, campaign: str, data: Dict[str, Any]) -> None:
+        with self.transaction() as db:
+            self._ensure_campaign(db, campaign)
+            db.execute("INSERT OR REPLACE INTO live_sessions (campaign, data) VALUES (?, ?)", (campaign, _dumps(data)))
+
+    def get_live_session(self, campaign: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT data FROM live_sessions WHERE campaign = ?", (campaign,))
+        return json.loads(rows[0][0]) if rows else None
+
+    # --- Roll Log ---
+    def log_roll(self, campaign: str, expression: str, total: Optional[int], who: Optional[str] = None,
+                 session: Optional[int] = None, detail: Optional[Dict[str, Any]] = None,
+                 at: Optional[str] = None) -> int:
+        """
+        Appends a roll to the campaign's roll log.
+        Returns:
+            int: The roll's id.
+        """
+        with self.transaction() as db:
+            self._ensure_campaign(db, campaign)
+            cursor = db.execute(
+                "INSERT INTO rolls (campaign, session, at, who, expression, total, detail) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (campaign, session, at or datetime.now().strftime('%Y-%m-%d %H:%M:%S'), who, expression, total,
+                 _dumps(detail) if detail is not None else None))
+        return cursor.lastrowid
+
+    def rolls(self, campaign: str, session: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Logged rolls of a campaign (optionally one session), oldest first."""
+        sql, values = "SELECT session, at, who, expression, total, detail FROM rolls WHERE campaign = ?", [campaign]
+        if session is not None:
+            sql += " AND session = ?"
+            values.append(session)
+        sql += " ORDER BY id DESC"
+        if limit is not None: # Latest `limit` rolls
+            sql += " LIMIT ?"
+            values.append(limit)
+        rows = self._query(sql, tuple(values))
+        return [{"session": s, "at": at, "who": who, "expression": e, "total": t,
+                 **({"detail": json.loads(d)} if d else {})} for s, at, who, e, t, d in reversed(rows)]
+
+    # --- JSON Layout Import/Export ---
+    def import_folder(self, campaign_folder: str, campaign: Optional[str] = None) -> Dict[str, int]:
+        """
+        Imports a campaign folder in the JSON layout, in one transaction. Files are recognised
+        by name (campaign.json, state/session_live.json, archive/session_<n>.json, rolls.json)
+        or by their ids ('camp_', 'pc_', 'npc_'); a file may also hold a list of records.
+        Archive folders with a manifest.json are read through SessionArchive, so compressed
+        segments and the legacy files it indexes are imported too. Unreadable files are
+        reported and skipped.
+        Returns:
+            Dict[str, int]: Records imported per kind.
+        """
+        campaign = campaign or os.path.basename(os.path.normpath(campaign_folder))
+        counts = {"campaign": 0, "characters": 0, "npcs": 0, "sessions": 0, "live": 0, "rolls": 0}
+        with self.transaction() as db:
+            self._ensure_campaign(db, campaign)
+            for root, _, files in os.walk(campaign_folder):
+                if MANIFEST_FILE in files:
+                    archived = self._import_archive(campaign, root, counts)
+                    files = [f for f in files if f != MANIFEST_FILE and _session_number(f) not in archived]
+                for filename in sorted(files):
+                    if not filename.endswith(".json"):
+                        continue
+                    path = os.path.join(root, filename)
+                    try:
+                        data = storage.read_json(path)
+                    except Exception as e:
+                        print(f"Skipping {path}: {e}")
+                        continue
+                    self._import_file(campaign, filename, data, counts)
+        return counts
+
+    def _import_archive(self, campaign: str, folder: str, counts: Dict[str, int]) -> Set[int]:
+        """Imports the sessions of a SessionArchive folder and returns their numbers."""
+        try:
+            archive = SessionArchive(folder)
+        except Exception as e:
+            print(f"Skipping the manifest in {folder}: {e}")
+            return set()
+        imported = set()
+        for entry in archive.sessions():
+            try:
+                data = archive.get(entry["session"])
+            except Exception as e:
+                print(f"Skipping session {entry['session']} in {folder}: {e}")
+                continue
+            if data is not None:
+                self.archive_session(campaign, data, entry["session"])
+                counts["sessions"] += 1
+                imported.add(entry["session"])
+        return imported
+
+    def _import_file(self, campaign: str, filename: str, data: Any, counts: Dict[str, int]) -> None:
+        session = _SESSION_FILE.match(filename)
+        if session:
+            self.archive_session(campaign, data, int(session.group(1)))
+            counts["sessions"] += 1
+        elif filename in ("session_live.json", "session-live.json"):
+            self.put_live_session(campaign, data)
+            counts["live"] += 1
+        elif filename == "rolls.json":
+            for roll in data:
+                self.log_roll(campaign, roll["expression"], roll.get("total"), roll.get("who"),
+                              roll.get("session"), roll.get("detail"), roll.get("at"))
+                counts["rolls"] += 1
+        else:
+            for record in data if isinstance(data, list) else [data]:
+                self._import_record(campaign, filename, record, counts)
+
+    def _import_record(self, campaign: str, filename: str, record: Any, counts: Dict[str, int]) -> None:
+        if not isinstance(record, dict):
+            return
+        record_id = str(record.get("id", ""))
+        if filename == "campaign.json" or record_id.startswith("camp_"):
+            self.put_campaign(campaign, record)
+            counts["campaign"] += 1
+            for npc in record.get("npcs", []):
+                self._import_record(campaign, "npcs.json", npc, counts)
+        elif record_id.startswith("npc_"):
+            self.put_npc(campaign, record)
+            counts["npcs"] += 1
+        elif record_id.startswith("pc_") or ("player" in record and "id" in record):
+            self.put_character(campaign, record)
+            counts["characters"] += 1
+
+    def export_folder(self, campaign: str, folder: str) -> Dict[str, int]:
+        """
+        Writes a campaign back out in the JSON layout under folder/<campaign>/:
+        campaign.json, npcs.json, characters/<id>.json, state/session_live.json,
+        archive/session_<n>.json and archive/rolls.json.
+        Returns:
+            Dict[str, int]: Records exported per kind.
+        """
+        path = os.path.join(folder, campaign)
+        for sub in ("state", "lore", "archive", "characters"):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+        counts = {"campaign": 0, "characters": 0, "npcs": 0, "sessions": 0, "live": 0, "rolls": 0}
+        data = self.get_campaign(campaign)
+        if data is not None:
+            storage.write_json(os.path.join(path, "campaign.json"), data)
+            counts["campaign"] = 1
+        npcs = self.npcs(campaign)
+        if npcs:
+            storage.write_json(os.path.join(path, "npcs.json"), npcs)
+            counts["npcs"] = len(npcs)
+        for character in self.characters(campaign):
+            storage.write_json(os.path.join(path, "characters", f"{character['id']}.json"), character)
+            counts["characters"] += 1
+        live = self.get_live_session(campaign)
+        if live is not None:
+            storage.write_json(os.path.join(path, "state", "session_live.json"), live)
+            counts["live"] = 1
+        for row in self._query("SELECT number, data FROM sessions WHERE campaign = ? ORDER BY number", (campaign,)):
+            storage.write_json(os.path.join(path, "archive", f"session_{row[0]}.json"), json.loads(row[1]))
+            counts["sessions"] += 1
+        rolls = self.rolls(campaign)
+        if rolls:
+            storage.write_json(os.path.join(path, "archive", "rolls.json"), rolls)
+            counts["rolls"] = len(rolls)
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Import or export campaigns between the JSON layout and SQLite.")
+    p.add_argument("--db", default="campaigns.db", help="Campaign database path")
+    sub = p.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Import a campaign folder")
+    imp.add_argument("folder", help="Campaign folder, e.g. 'ChatGPT Table Top/My Campaign'")
+    imp.add_argument("--name", help="Campaign name (default: the folder name)")
+    exp = sub.add_parser("export", help="Export a campaign to the JSON layout")
+    exp.add_argument("campaign", help="Campaign name")
+    exp.add_argument("folder", help="Folder to write <campaign>/ into")
+    args = p.parse_args()
+
+    store = CampaignStore(args.db)
+    if args.command == "import":
+        print(store.import_folder(args.folder, args.name))
+    else:
+        print(store.export_folder(args.campaign, args.folder))
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+lazy_json.py – lazy, memory-mapped access to large campaign files, plus schema validation.
+
+LazyJSONFile maps a campaign/character file and makes one vectorised (numpy) pass over its bytes
+to index the byte ranges of every top-level value and of every element of top-level arrays (npcs,
+locations, factions, quests, history, ...). Only the entries actually accessed are decoded:
+
+    with LazyJSONFile("campaign.json") as campaign:
+        vexa = campaign.find("npcs", "npc_captain_vexa")
+
+Opening takes about as long as storage.read_json; the index is far smaller than the decoded
+document, and lookups on an open file cost microseconds.
+
+SCHEMAS holds JSON schemas for the templates in this folder (campaign, character, npc, session).
+validate() uses the jsonschema package when it is installed and a built-in subset (type,
+properties, required, items, enum, minimum, maximum, pattern) otherwise.
+"""
+import hashlib
+import mmap
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import storage
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+# Records conventionally start with their id ("id": "npc_..."), which is read straight off the bytes
+_LEADING_ID = re.compile(rb'\s*"id"\s*:\s*(' + _STRING + rb')')
+_BLANK = re.compile(rb'\s*')
+_QUOTE, _BACKSLASH, _LBRACE, _RBRACE, _LBRACKET, _RBRACKET, _COMMA, _COLON = b'"\\{}[],:'
+SCAN_CHUNK = 1 << 16  # Bytes classified per numpy pass; small enough for the temporaries to stay in cache
+
+Span = Tuple[int, int]
+
+
+def _structure(buf, start: int, end: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds, with vectorised passes over buf[start:end], the bytes the index needs: brackets and
+    separators outside strings that sit at most two levels deep, plus the quotes of top-level strings.
+    Returns:
+        Tuple: (positions, bytes, nesting depth after each byte).
+    """
+    data = np.frombuffer(buf, dtype=np.uint8)
+    found = []
+    escape_next, in_string, depth = False, False, 0
+    try:
+        for base in range(start, end, SCAN_CHUNK):
+            chunk = data[base:min(base + SCAN_CHUNK, end)]
+            special = chunk == _QUOTE
+            for byte in b'\\{}[],:':
+                special |= chunk == byte
+            idx = np.flatnonzero(special)
+            if escape_next and len(idx) and idx[0] == 0: # Escaped by a backslash at the end of the last chunk
+                idx = idx[1:]
+            chars = chunk[idx]
+            backslash = chars == _BACKSLASH
+            escape_next = False
+            if backslash.any():
+                # In a run of backslashes, every other one (from the first) escapes the byte after it
+                slashes = idx[backslash]
+                run_start = np.ones(len(slashes), dtype=bool)
+                run_start[1:] = np.diff(slashes) != 1
+                starts = np.flatnonzero(run_start)
+                offset = np.arange(len(slashes)) - np.repeat(starts, np.diff(np.append(starts, len(slashes))))
+                escaping = slashes[offset % 2 == 0]
+                escape_next = escaping[-1] == len(chunk) - 1
+                keep = ~backslash & ~np.isin(idx, escaping + 1, assume_unique=True)
+                idx, chars = idx[keep], chars[keep]
+            quotes = chars == _QUOTE
+            inside = np.logical_xor.accumulate(quotes) ^ in_string # True from an opening quote to its closing one
+            if len(inside):
+                in_string = bool(inside[-1])
+            outside = ~inside & ~quotes
+            delta = (outside & ((chars == _LBRACE) | (chars == _LBRACKET))).astype(np.int64)
+            delta -= outside & ((chars == _RBRACE) | (chars == _RBRACKET))
+            after = depth + np.cumsum(delta)
+            if len(after):
+                depth = int(after[-1])
+            keep = (outside & (after - delta <= 2)) | (quotes & (after == 1))
+            found.append((idx[keep] + base, chars[keep], after[keep]))
+    finally:
+        del data # An exported buffer would stop the mmap from closing
+    if not found:
+        return np.zeros(0, np.int64), np.zeros(0, np.uint8), np.zeros(0, np.int64)
+    return tuple(np.concatenate(parts) for parts in zip(*found))
+
+
+def _scan(buf, start: int, end: int) -> Tuple[Dict[str, Span], Dict[str, List[Span]], Dict[str, Dict[str, int]], Dict[str, List[int]]]:
+    """
+    Indexes a JSON object in buf[start:end] without decoding it.
+    Returns:
+        Tuple: (top-level key -> value span, array key -> element spans, array key -> {leading id: index},
+                array key -> indexes of object elements without a leading id).
+    Raises:
+        ValueError: If the document isn't a single, complete JSON object.
+    """
+    first = _BLANK.match(buf, start, end).end()
+    if first >= end or buf[first] != _LBRACE:
+        raise ValueError("Top-level JSON value is not an object.")
+    positions, chars, depths = _structure(buf, first, end)
+    closed = np.flatnonzero((depths == 0) & (chars != _QUOTE))
+    if not len(closed):
+        raise ValueError("Truncated JSON document.")
+    last = closed[0] # The top-level object's closing brace
+    quotes = positions[:last][chars[:last] == _QUOTE]
+    top = np.flatnonzero((depths[:last] == 1) & ((chars[:last] == _COLON) | (chars[:last] == _COMMA))).tolist()
+    spans: Dict[str, Span] = {}
+    elements: Dict[str, List[Span]] = {}
+    ids: Dict[str, Dict[str, int]] = {}
+    unindexed: Dict[str, List[int]] = {}
+    for k, following in zip(top, top[1:] + [int(last)]):
+        if chars[k] != _COLON:
+            continue
+        q = np.searchsorted(quotes, positions[k]) # The key is the last string before the colon
+        key = storage.decode_payload("json", buf[quotes[q - 2]:quotes[q - 1] + 1])
+        spans[key] = (int(positions[k]) + 1, int(positions[following]))
+        if k + 1 < following and chars[k + 1] == _LBRACKET:
+            elements[key], ids[key], unindexed[key] = _index_array(buf, positions[k + 1:following + 1],
+                                                                   chars[k + 1:following + 1], depths[k + 1:following + 1])
+    return spans, elements, ids, unindexed
+
+
+def _index_array(buf, positions: np.ndarray, chars: np.ndarray, depths: np.ndarray) -> Tuple[List[Span], Dict[str, int], List[int]]:
+    """Element spans, leading ids and unindexed objects of a top-level array, from its structural bytes."""
+    close = int(np.flatnonzero(depths == 1)[0])
+    inner = slice(1, close)
+    separators = positions[inner][(chars[inner] == _COMMA) & (depths[inner] == 2)]
+    starts = [int(positions[0]) + 1] + (separators + 1).tolist()
+    stops = separators.tolist() + [int(positions[close])]
+    if len(starts) == 1 and _BLANK.match(buf, starts[0], stops[0]).end() == stops[0]:
+        return [], {}, [] # An empty array
+    indexed, names, unindexed = [], [], []
+    objects = positions[inner][(chars[inner] == _LBRACE) & (depths[inner] == 3)]
+    for index, brace in zip(np.searchsorted(separators, objects).tolist(), objects.tolist()):
+        leading = _LEADING_ID.match(buf, brace + 1, stops[index])
+        if leading:
+            indexed.append(index)
+            names.append(buf[leading.start(1):leading.end(1)])
+        else:
+            unindexed.append(index)
+    names = storage.decode_payload("json", b"[" + b",".join(names) + b"]") # One decode for every id
+    ids = dict(zip(names, indexed))
+    if len(ids) < len(names): # Duplicate ids: the first element wins
+        ids = {}
+        for name, index in zip(names, indexed):
+            ids.setdefault(name, index)
+    return list(zip(starts, stops)), ids, unindexed
+
+
+class LazyJSONFile:
+    """A read-only, memory-mapped JSON object that decodes values on access."""
+
+    def __init__(self, file_path: str, verify: bool = True):
+        """
+        Maps and indexes a JSON file (plain, or written by storage.write_json).
+        Args:
+            file_path (str): The file to open.
+            verify (bool): Check the storage header's checksum (a hash pass, no decoding).
+        Raises:
+            OSError, storage.CorruptFileError, ValueError: If the file is missing, corrupt or not a JSON object.
+        """
+        self.path = file_path
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"{file_path} is empty.")
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            start = self._check_header(verify)
+            self._spans, self._elements, self._ids, self._unindexed = _scan(self._buf, start, len(self._buf))
+        except BaseException:
+            self._buf.close()
+            raise
+
+    def _check_header(self, verify: bool) -> int:
+        """Returns the payload's offset, validating the storage header if there is one."""
+        if not self._buf[:len(storage.STORE_MAGIC) + 1] == storage.STORE_MAGIC + b" ":
+            return 0
+        newline = self._buf.find(b"\n")
+        try:
+            _, fmt, length, digest = self._buf[:newline].decode("ascii").split(" ")
+            length = int(length)
+        except ValueError:
+            raise storage.CorruptFileError("Unreadable storage header.")
+        if fmt != "json":
+            raise ValueError(f"Lazy loading needs JSON, not '{fmt}'.")
+        if len(self._buf) - newline - 1 != length:
+            raise storage.CorruptFileError(f"Expected {length} bytes, found {len(self._buf) - newline - 1} (truncated file?).")
+        if verify:
+            with memoryview(self._buf) as view:
+                if hashlib.sha256(view[newline + 1:]).hexdigest() != digest:
+                    raise storage.CorruptFileError("Checksum mismatch.")
+        return newline + 1
+
+    def _decode(self, span: Span) -> Any:
+        return storage.decode_payload("json", self._buf[span[0]:span[1]])
+
+    def keys(self) -> List[str]:
+        return list(self._spans)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._spans
+
+    def __getitem__(self, key: str) -> Any:
+        return self._decode(self._spans[key])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self._spans else default
+
+    def count(self, key: str) -> int:
+        """Number of elements in a top-level array (0 if the key isn't an array)."""
+        return len(self._elements.get(key, ()))
+
+    def item(self, key: str, index: int) -> Any:
+        """Decodes one element of a top-level array."""
+        return self._decode(self._elements[key][index])
+
+    def iter_items(self, key: str) -> Iterator[Any]:
+        """Decodes the elements of a top-level array one at a time."""
+        for span in self._elements.get(key, ()):
+            yield self._decode(span)
+
+    def ids(self, key: str) -> List[str]:
+        """The string 'id's of the objects in a top-level array."""
+        found = list(self._ids.get(key, {}))
+        for index in self._unindexed.get(key, ()):
+            entity_id = self.item(key, index).get("id")
+            if isinstance(entity_id, str):
+                found.append(entity_id)
+        return found
+
+    def find(self, key: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Decodes only the element of a top-level array whose 'id' is entity_id, or None."""
+        index = self._ids.get(key, {}).get(entity_id)
+        if index is not None:
+            return self.item(key, index)
+        for index in self._unindexed.get(key, ()): # Objects whose id isn't their first key
+            element = self.item(key, index)
+            if element.get("id") == entity_id:
+                return element
+        return None
+
+    def load(self) -> Dict[str, Any]:
+        """Decodes the whole document."""
+        return {key: self._decode(span) for key, span in self._spans.items()}
+
+    def validate(self, schema: Dict[str, Any]) -> List[str]:
+        """Validates against an object schema one top-level value at a time, without loading the whole file."""
+        errors = [f"$: missing required '{key}'" for key in schema.get("required", []) if key not in self._spans]
+        properties = schema.get("properties", {})
+        for key in self._spans:
+            if key in properties:
+                errors.extend(validate(self[key], properties[key], f"$.{key}"))
+        return errors
+
+    def close(self) -> None:
+        self._buf.close()
+
+    def __enter__(self) -> "LazyJSONFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --- Schemas ---
+_STR_SCHEMA = {"type": "string"}
+_COUNT = {"type": "integer", "minimum": 0}
+_LIST = {"type": "array"}
+_ENTITY_LIST = {"type": "array", "items": {"type": ["object", "string"]}} # Full records or their ids
+
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "campaign": {
+        "type": "object",
+        "required": ["id", "title", "players", "locations", "factions", "npcs", "quests", "lastSession"],
+        "properties": {
+            "id": {"type": "string", "pattern": "^camp_"},
+            "title": _STR_SCHEMA, "dm": _STR_SCHEMA, "system": _STR_SCHEMA, "tone": _STR_SCHEMA,
+            "houseRules": {"type": "array", "items": _STR_SCHEMA},
+            "players": {"type": "array", "items": {
+                "type": "object", "required": ["discord"],
+                "properties": {"discord": _STR_SCHEMA, "character": _STR_SCHEMA}}},
+            "locations": _ENTITY_LIST, "factions": _ENTITY_LIST, "npcs": _ENTITY_LIST,
+            "quests": _ENTITY_LIST, "clocks": _LIST,
+            "lastSession": _COUNT,
+        },
+    },
+    "character": {
+        "type": "object",
+        "required": ["id", "player", "class", "abilities", "hp"],
+        "properties": {
+            "id": {"type": "string", "pattern": "^pc_"},
+            "player": _STR_SCHEMA, "race": _STR_SCHEMA, "background": _STR_SCHEMA, "alignment": _STR_SCHEMA,
+            "class": {"type": "object", "required": ["name", "lv"],
+                      "properties": {"name": _STR_SCHEMA, "lv": {"type": "integer", "minimum": 1, "maximum": 20}}},
+            "xp": _COUNT,
+            "abilities": {"type": "object", "required": ["str", "dex", "con", "int", "wis", "cha"],
+                          "properties": {ability: {"type": "integer", "minimum": 0, "maximum": 30}
+                                         for ability in ("str", "dex", "con", "int", "wis", "cha")}},
+            "pb": {"type": "integer", "minimum": 2, "maximum": 6},
+            "ac": _COUNT, "speed": _COUNT,
+            "hp": {"type": "object", "required": ["max", "current"],
+                   "properties": {"max": _COUNT, "current": {"type": "integer"}, "temp": _COUNT}},
+            "slots": {"type": "object"}, "coins": {"type": "object"},
+            "skillsPro": _LIST, "features": _LIST, "inventory": _LIST, "history": _LIST,
+        },
+    },
+    "npc": {
+        "type": "object",
+        "required": ["id", "name"],
+        "properties": {
+            "id": {"type": "string", "pattern": "^npc_"},
+            "name": _STR_SCHEMA, "role": _STR_SCHEMA, "motivation": _STR_SCHEMA, "secret": _STR_SCHEMA, "standing": _STR_SCHEMA,
+            "loc": {"type": ["string", "null"]},
+            "currentHP": {"type": ["integer", "null"]},
+            "notes": _LIST,
+        },
+    },
+    "session": {
+        "type": "object",
+        "required": ["session"],
+        "properties": {
+            "session": _COUNT, "date": _STR_SCHEMA, "igStart": _STR_SCHEMA, "loc": _STR_SCHEMA,
+            "agenda": _LIST, "scenes": _LIST, "encounter": {"type": "object"}, "pcs": {"type": "object"},
+            "loot": _LIST, "updates": _LIST,
+        },
+    },
+}
+
+TEMPLATES = {"campaign.json": "campaign", "character.json": "character", "npc.json": "npc", "session-live.json": "session"}
+
+_TYPES = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def validate(data: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """
+    Validates data against a JSON schema.
+    Returns:
+        List[str]: Error messages ("<path>: <problem>"); empty if valid.
+    """
+    if jsonschema is not None:
+        return [f"{path}{''.join(f'[{p}]' if isinstance(p, int) else f'.{p}' for p in e.absolute_path)}: {e.message}"
+                for e in jsonschema.Draft7Validator(schema).iter_errors(data)]
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else types
+        if not any(_TYPES[t](data) for t in types):
+            return [f"{path}: expected {' or '.join(types)}, got {type(data).__name__}"]
+    errors = []
+    if "enum" in schema and data not in schema["enum"]:
+        errors.append(f"{path}: {data!r} is not one of {schema['enum']}")
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        if "minimum" in schema and data < schema["minimum"]:
+            errors.append(f"{path}: {data} is less than {schema['minimum']}")
+        if "maximum" in schema and data > schema["maximum"]:
+            errors.append(f"{path}: {data} is greater than {schema['maximum']}")
+    if isinstance(data, str) and "pattern" in schema and not re.search(schema["pattern"], data):
+        errors.append(f"{path}: {data!r} does not match '{schema['pattern']}'")
+    if isinstance(data, dict):
+        errors.extend(f"{path}: missing required '{key}'" for key in schema.get("required", []) if key not in data)
+        for key, subschema in schema.get("properties", {}).items():
+            if key in data:
+                errors.extend(validate(data[key], subschema, f"{path}.{key}"))
+    if isinstance(data, list) and "items" in schema:
+        for i, item in enumerate(data):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def strip_comments(text: str) -> str:
+    """Removes // line comments (as used in the templates) outside of strings."""
+    return re.sub(r'("(?:[^"\\]|\\.)*")|//[^\n]*', lambda m: m.group(1) or "", text)
+
+
+def validate_templates(folder: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Validates the template files (campaign.json, character.json, npc.json, session-live.json)
+    in folder (default: next to this module) against their schemas.
+    Returns:
+        Dict[str, List[str]]: Errors per template file; an empty list means valid.
+    """
+    folder = folder or os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for filename, kind in TEMPLATES.items():
+        path = os.path.join(folder, filename)
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = storage.decode_payload("json", strip_comments(f.read()).encode("utf-8"))
+        except ValueError as e:
+            results[filename] = [f"$: not valid JSON ({e})"]
+            continue
+        results[filename] = validate(data, SCHEMAS[kind])
+    return results
+
+
+if __name__ == "__main__":
+    for filename, errors in validate_templates().items():
+        print(f"{filename}: {'ok' if not errors else '; '.join(errors)}")
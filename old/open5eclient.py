@@ -2,9 +2,26 @@
 Open5e API Client
 A Python client for accessing the Open5e API based on the OpenAPI schema.
 """
+import asyncio
+import copy
 import requests
-from typing import Dict, List, Optional, Union, Any, TypeVar
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Union, Any, Tuple, TypeVar
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+import json
 import logging
+import math
+import random
+import re
+import sqlite3
+import threading
+import time
+
+if TYPE_CHECKING:
+    from srd_mirror import SRDMirror
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,44 +33,913 @@ JSONDict = Dict[str, Any]
 JSONList = List[JSONDict]
 JSONResponse = Union[JSONDict, JSONList]
 
+# ============== RESPONSE CACHE ==============
+# Seconds a cached response is served without asking the API again, per resource
+DEFAULT_TTL = 60 * 60
+RESOURCE_TTLS = {
+    "abilities": 7 * 24 * 60 * 60,
+    "alignments": 7 * 24 * 60 * 60,
+    "conditions": 7 * 24 * 60 * 60,
+    "damagetypes": 7 * 24 * 60 * 60,
+    "languages": 7 * 24 * 60 * 60,
+    "sizes": 7 * 24 * 60 * 60,
+    "skills": 7 * 24 * 60 * 60,
+    "spellschools": 7 * 24 * 60 * 60,
+    "creatures": 24 * 60 * 60,
+    "spells": 24 * 60 * 60,
+    "items": 24 * 60 * 60,
+    "search": 10 * 60,
+}
+
+
+def cache_key(endpoint: str, params: Optional[JSONDict] = None) -> str:
+    """
+    Build a cache key from an endpoint and its query parameters.
+    
+    Parameters are sorted and None values dropped, so equivalent requests share a key.
+    
+    Args:
+        endpoint: API endpoint, e.g. "/v2/spells/"
+        params: Query parameters
+        
+    Returns:
+        The key, e.g. "/v2/spells/?level=1&school__name=Evocation"
+    """
+    if not params:
+        return endpoint
+    items = sorted((str(k), str(v)) for k, v in params.items() if v is not None)
+    return f"{endpoint}?{urlencode(items)}" if items else endpoint
+
+
+def resource_of(endpoint: str) -> str:
+    """Return the resource name of an endpoint, e.g. "spells" for "/v2/spells/fireball/"."""
+    parts = [part for part in endpoint.split("/") if part]
+    return parts[1] if len(parts) > 1 else (parts[0] if parts else "")
+
+
+@dataclass
+class CacheEntry:
+    """A cached API response with the validators needed to revalidate it."""
+    data: Any
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class SQLiteCacheStore:
+    """Persistent response store in a single SQLite file, shared across client instances and runs."""
+    
+    def __init__(self, path: str):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            path: Path of the SQLite file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body TEXT NOT NULL, stored_at REAL NOT NULL, "
+            "etag TEXT, last_modified TEXT)"
+        )
+        self._conn.commit()
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, stored_at, etag, last_modified FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2], row[3])
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        body = json.dumps(entry.data, separators=(",", ":"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, stored_at, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (key, body, entry.stored_at, entry.etag, entry.last_modified),
+            )
+    
+    def touch(self, key: str, stored_at: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (stored_at, key))
+    
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-level response cache: an in-memory LRU in front of an optional persistent store.
+    
+    Entries older than their resource's TTL are stale; the client revalidates them with
+    If-None-Match/If-Modified-Since instead of downloading them again. Entries are shared;
+    Open5eClient hands its callers deep copies, so edits never reach the cache.
+    """
+    
+    def __init__(self, max_entries: int = 512, store: Optional[SQLiteCacheStore] = None,
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = DEFAULT_TTL):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Responses kept in memory before the least recently used is evicted
+            store: Optional persistent store behind the memory layer (e.g. SQLiteCacheStore)
+            ttls: Per-resource TTL overrides in seconds, e.g. {"creatures": 3600}
+            default_ttl: TTL for resources without an entry in RESOURCE_TTLS or ttls
+        """
+        self.max_entries = max_entries
+        self.store = store
+        self.ttls = {**RESOURCE_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "stores": 0, "evictions": 0,
+                      "fallbacks": 0}
+    
+    def ttl_for(self, endpoint: str) -> float:
+        """Return the TTL in seconds for an endpoint's resource."""
+        return self.ttls.get(resource_of(endpoint), self.default_ttl)
+    
+    def lookup(self, key: str, endpoint: str) -> Tuple[Optional[CacheEntry], bool]:
+        """
+        Find a cached response and count the hit or miss.
+        
+        Args:
+            key: Cache key from cache_key()
+            endpoint: API endpoint, used to pick the TTL
+            
+        Returns:
+            (entry, fresh): entry is None on a miss; fresh is False if it needs revalidation
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None and self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            self._count("misses")
+            return None, False
+        if time.time() - entry.stored_at < self.ttl_for(endpoint):
+            self._count("hits")
+            return entry, True
+        self._count("stale")
+        return entry, False
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store a response in memory and in the persistent store."""
+        self._remember(key, entry)
+        if self.store is not None:
+            self.store.set(key, entry)
+        self._count("stores")
+    
+    def revalidated(self, key: str, entry: CacheEntry) -> None:
+        """Mark a stale entry as fresh again after the API answered 304 Not Modified."""
+        entry.stored_at = time.time()
+        if self.store is not None:
+            self.store.touch(key, entry.stored_at)
+        self._count("revalidated")
+    
+    def served_stale(self) -> None:
+        """Count a stale entry served because the API was unavailable."""
+        self._count("fallbacks")
+    
+    def clear(self) -> None:
+        """Drop every cached response, including the persistent store."""
+        with self._lock:
+            self._memory.clear()
+        if self.store is not None:
+            self.store.clear()
+    
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+    
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+
+# ============== PROJECTION AND MODELS ==============
+# Fields the compact models are built from; requested as projections so less is downloaded
+CREATURE_FIELDS = [
+    "key", "name", "size", "type", "armor_class", "hit_points", "hit_dice", "challenge_rating_decimal",
+    "challenge_rating_text", "speed", "ability_scores", "saving_throws", "passive_perception", "actions",
+]
+SPELL_FIELDS = [
+    "key", "name", "level", "school", "casting_time", "range_text", "range", "duration", "concentration",
+    "ritual", "verbal", "somatic", "material", "material_specified", "saving_throw_ability", "attack_roll",
+    "damage_roll", "damage_types", "desc", "higher_level",
+]
+
+
+def _field_tree(fields: List[str]) -> JSONDict:
+    """Turn ["name", "school.name"] into {"name": {}, "school": {"name": {}}}."""
+    tree: JSONDict = {}
+    for path in fields:
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _prune(value: Any, tree: JSONDict) -> Any:
+    if isinstance(value, dict):
+        return {k: (_prune(value[k], sub) if sub else value[k]) for k, sub in tree.items() if k in value}
+    if isinstance(value, list):
+        return [_prune(item, tree) for item in value]
+    return value
+
+
+def project(data: JSONResponse, fields: List[str]) -> JSONResponse:
+    """
+    Keep only the given fields of an object, a list of objects, or each result of a page.
+    
+    Args:
+        data: API response
+        fields: Field names or dotted paths into nested objects, e.g. ["name", "school.name"]
+        
+    Returns:
+        A pruned copy; the input (which may be a shared cache entry) is left untouched
+    """
+    tree = _field_tree(fields)
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        return {**data, "results": _prune(data["results"], tree)}
+    return _prune(data, tree)
+
+
+def _name_of(value: Any) -> Optional[str]:
+    """Name of a nested object, or the last segment of a resource URL."""
+    if isinstance(value, dict):
+        return value.get("name") or value.get("key")
+    if isinstance(value, str) and "/" in value:
+        return value.rstrip("/").rsplit("/", 1)[-1]
+    return value
+
+
+def _compact(values: Dict[str, Any]) -> JSONDict:
+    """Drop empty values, so payloads for the GPT only carry what is set."""
+    return {k: v for k, v in values.items()
+            if v is not None and v is not False and not (isinstance(v, (str, list, dict)) and not v)}
+
+
+@dataclass(slots=True)
+class Attack:
+    """One attack of a creature action."""
+    name: str
+    to_hit: Optional[int] = None
+    damage: Optional[str] = None  # Dice expression, e.g. "2d6+3"
+    damage_type: Optional[str] = None
+    reach: Optional[int] = None
+    range: Optional[str] = None  # "normal/long" in feet
+
+    @classmethod
+    def from_api(cls, data: JSONDict) -> "Attack":
+        damage = None
+        if data.get("damage_die_count") and data.get("damage_die_type"):
+            damage = f"{data['damage_die_count']}{str(data['damage_die_type']).lower()}"
+            bonus = data.get("damage_bonus") or 0
+            damage += f"{bonus:+d}" if bonus else ""
+        elif data.get("damage_bonus"):
+            damage = str(data["damage_bonus"])
+        range_ = None
+        if data.get("range"):
+            range_ = f"{data['range']}/{data['long_range']}" if data.get("long_range") else str(data["range"])
+        return cls(
+            name=data.get("name", ""),
+            to_hit=data.get("to_hit_mod"),
+            damage=damage,
+            damage_type=_name_of(data.get("damage_type")),
+            reach=data.get("reach"),
+            range=range_,
+        )
+
+    def to_dict(self) -> JSONDict:
+        return _compact({"name": self.name, "to_hit": self.to_hit, "damage": self.damage,
+                         "damage_type": self.damage_type, "reach": self.reach, "range": self.range})
+
+
+@dataclass(slots=True)
+class CreatureModel:
+    """The combat-relevant slice of an Open5e creature."""
+    key: str
+    name: str
+    armor_class: Optional[int] = None
+    hit_points: Optional[int] = None
+    hit_dice: Optional[str] = None
+    challenge_rating: Optional[float] = None
+    challenge_rating_text: Optional[str] = None
+    size: Optional[str] = None
+    type: Optional[str] = None
+    speed: Dict[str, Any] = field(default_factory=dict)
+    ability_scores: Dict[str, int] = field(default_factory=dict)
+    saving_throws: Dict[str, int] = field(default_factory=dict)
+    passive_perception: Optional[int] = None
+    attacks: List[Attack] = field(default_factory=list)
+
+    @classmethod
+    def from_api(cls, data: JSONDict) -> "CreatureModel":
+        cr = data.get("challenge_rating_decimal")
+        return cls(
+            key=data.get("key", ""),
+            name=data.get("name", ""),
+            armor_class=data.get("armor_class"),
+            hit_points=data.get("hit_points"),
+            hit_dice=data.get("hit_dice"),
+            challenge_rating=float(cr) if cr is not None else None,
+            challenge_rating_text=data.get("challenge_rating_text"),
+            size=_name_of(data.get("size")),
+            type=_name_of(data.get("type")),
+            speed={k: v for k, v in (data.get("speed") or {}).items() if v},
+            ability_scores=dict(data.get("ability_scores") or {}),
+            saving_throws={k: v for k, v in (data.get("saving_throws") or {}).items() if v is not None},
+            passive_perception=data.get("passive_perception"),
+            attacks=[Attack.from_api(attack) for action in data.get("actions") or []
+                     for attack in action.get("attacks") or []],
+        )
+
+    def to_dict(self) -> JSONDict:
+        """Compact payload for the GPT action layer; unset fields are omitted."""
+        return _compact({
+            "key": self.key, "name": self.name, "armor_class": self.armor_class, "hit_points": self.hit_points,
+            "hit_dice": self.hit_dice, "challenge_rating": self.challenge_rating_text or self.challenge_rating,
+            "size": self.size, "type": self.type, "speed": self.speed, "ability_scores": self.ability_scores,
+            "saving_throws": self.saving_throws, "passive_perception": self.passive_perception,
+            "attacks": [attack.to_dict() for attack in self.attacks],
+        })
+
+
+@dataclass(slots=True)
+class SpellModel:
+    """The rules-relevant slice of an Open5e spell."""
+    key: str
+    name: str
+    level: Optional[int] = None
+    school: Optional[str] = None
+    casting_time: Optional[str] = None
+    range: Optional[str] = None
+    duration: Optional[str] = None
+    concentration: bool = False
+    ritual: bool = False
+    components: str = ""  # e.g. "V, S, M (a tiny ball of bat guano and sulfur)"
+    save: Optional[str] = None  # Saving throw ability
+    attack_roll: bool = False
+    damage: Optional[str] = None
+    damage_types: List[str] = field(default_factory=list)
+    desc: str = ""
+    higher_level: str = ""
+
+    @classmethod
+    def from_api(cls, data: JSONDict) -> "SpellModel":
+        components = [letter for letter, flag in (("V", "verbal"), ("S", "somatic"), ("M", "material")) if data.get(flag)]
+        if data.get("material") and data.get("material_specified"):
+            components[-1] = f"M ({data['material_specified']})"
+        return cls(
+            key=data.get("key", ""),
+            name=data.get("name", ""),
+            level=data.get("level"),
+            school=_name_of(data.get("school")),
+            casting_time=data.get("casting_time"),
+            range=data.get("range_text") or (str(data["range"]) if data.get("range") is not None else None),
+            duration=data.get("duration"),
+            concentration=bool(data.get("concentration")),
+            ritual=bool(data.get("ritual")),
+            components=", ".join(components),
+            save=data.get("saving_throw_ability") or None,
+            attack_roll=bool(data.get("attack_roll")),
+            damage=data.get("damage_roll") or None,
+            damage_types=[_name_of(t) for t in data.get("damage_types") or []],
+            desc=data.get("desc") or "",
+            higher_level=data.get("higher_level") or "",
+        )
+
+    def to_dict(self) -> JSONDict:
+        """Compact payload for the GPT action layer; unset fields are omitted."""
+        return _compact({
+            "key": self.key, "name": self.name, "level": self.level, "school": self.school,
+            "casting_time": self.casting_time, "range": self.range, "duration": self.duration,
+            "concentration": self.concentration, "ritual": self.ritual, "components": self.components,
+            "save": self.save, "attack_roll": self.attack_roll, "damage": self.damage,
+            "damage_types": self.damage_types, "desc": self.desc, "higher_level": self.higher_level,
+        })
+
+
+# ============== REFERENCES ==============
+# Fields that hold a bare key of another resource
+REFERENCE_FIELDS = {
+    "document": "documents",
+    "gamesystem": "gamesystems",
+    "size": "sizes",
+    "school": "spellschools",
+    "category": "itemcategories",
+    "rarity": "itemrarities",
+    "damage_type": "damagetypes",
+    "damage_types": "damagetypes",
+    "damage_immunities": "damagetypes",
+    "damage_resistances": "damagetypes",
+    "damage_vulnerabilities": "damagetypes",
+    "condition_immunities": "conditions",
+    "environments": "environments",
+    "languages": "languages",
+}
+# Fields that are references only on objects of one resource (named by the object's "url"):
+# a creature's "type" is a creature type, but "type" inside its actions or on items is not
+OWNED_REFERENCE_FIELDS = {
+    "creatures": {"type": "creaturetypes"},
+}
+# Small lookup resources: fetched whole in one paginated pass instead of key by key
+LOOKUP_RESOURCES = {
+    "abilities", "alignments", "conditions", "creaturetypes", "damagetypes", "documents", "environments",
+    "gamesystems", "itemcategories", "itemrarities", "languages", "sizes", "skills", "spellschools",
+}
+_REFERENCE_URL = re.compile(r"^https?://[^/]+/v2/(\w+)/([^/?#]+)/?$")
+
+
+def _reference(field_name: Optional[str], value: Any, owner: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """
+    (resource, key) if a value is a reference: a /v2/ URL, or a key in a REFERENCE_FIELDS field
+    (or an OWNED_REFERENCE_FIELDS field of an object from the owner resource).
+    """
+    if not isinstance(value, str) or field_name == "url":
+        return None
+    match = _REFERENCE_URL.match(value)
+    if match:
+        return match.group(1), match.group(2)
+    resource = REFERENCE_FIELDS.get(field_name) or OWNED_REFERENCE_FIELDS.get(owner, {}).get(field_name)
+    if resource and value and "/" not in value and " " not in value:
+        return resource, value
+    return None
+
+
+def _owner(obj: JSONDict) -> Optional[str]:
+    """The resource an object comes from, read from its own "url"."""
+    match = _REFERENCE_URL.match(obj["url"]) if isinstance(obj.get("url"), str) else None
+    return match.group(1) if match else None
+
+
+def _collect_references(value: Any, found: set, field_name: Optional[str] = None, owner: Optional[str] = None) -> None:
+    if isinstance(value, dict):
+        owner = _owner(value)
+        for k, v in value.items():
+            _collect_references(v, found, k, owner)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_references(item, found, field_name, owner)
+    else:
+        ref = _reference(field_name, value, owner)
+        if ref:
+            found.add(ref)
+
+
+def _hydrate(value: Any, resolved: Dict[Tuple[str, str], JSONDict], field_name: Optional[str] = None,
+             owner: Optional[str] = None) -> Any:
+    if isinstance(value, dict):
+        owner = _owner(value)
+        return {k: _hydrate(v, resolved, k, owner) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_hydrate(item, resolved, field_name, owner) for item in value]
+    ref = _reference(field_name, value, owner)
+    return resolved.get(ref, value) if ref else value
+
+
+# ============== INSTRUMENTATION ==============
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, math.inf)
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Group endpoints for stats: "/v2/spells/fireball/" -> "/v2/spells/{key}/"."""
+    parts = [part for part in endpoint.split("/") if part]
+    if len(parts) > 2:
+        return f"/{parts[0]}/{parts[1]}/{{key}}/"
+    return endpoint
+
+
+class ClientMetrics:
+    """Thread-safe request counters, latency histograms and pagination stats for Open5eClient."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.endpoints: Dict[str, JSONDict] = {}
+            self.retries = 0
+            self.pagination = {"calls": 0, "pages": 0, "max_pages": 0}
+    
+    def record_request(self, endpoint: str, source: str, seconds: float, size: int) -> JSONDict:
+        """
+        Record one _make_request outcome.
+        
+        Args:
+            endpoint: API endpoint
+            source: "network", "revalidated" (304), "cache", "mirror", "stale" or "error"
+            seconds: Wall-clock time spent
+            size: Response body bytes received
+            
+        Returns:
+            The event passed to request listeners
+        """
+        ms = seconds * 1000
+        template = endpoint_template(endpoint)
+        with self._lock:
+            stats = self.endpoints.get(template)
+            if stats is None:
+                stats = self.endpoints[template] = {
+                    "requests": 0, "errors": 0, "bytes": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "sources": {}, "histogram": [0] * len(LATENCY_BUCKETS_MS),
+                }
+            stats["requests"] += 1
+            stats["errors"] += source == "error"
+            stats["bytes"] += size
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["sources"][source] = stats["sources"].get(source, 0) + 1
+            stats["histogram"][next(i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound)] += 1
+        return {"event": "request", "endpoint": endpoint, "source": source, "ms": ms, "bytes": size}
+    
+    def record_retry(self, url: str, reason: str) -> JSONDict:
+        with self._lock:
+            self.retries += 1
+        return {"event": "retry", "url": url, "reason": reason}
+    
+    def record_pagination(self, endpoint: str, pages: int) -> JSONDict:
+        with self._lock:
+            self.pagination["calls"] += 1
+            self.pagination["pages"] += pages
+            self.pagination["max_pages"] = max(self.pagination["max_pages"], pages)
+        return {"event": "paginate", "endpoint": endpoint, "pages": pages}
+    
+    def snapshot(self) -> JSONDict:
+        """Per-endpoint and total stats; latency percentiles are histogram bucket upper bounds."""
+        with self._lock:
+            endpoints = {}
+            totals = {"requests": 0, "network_requests": 0, "errors": 0, "bytes": 0, "retries": self.retries}
+            for template, stats in sorted(self.endpoints.items()):
+                histogram = stats["histogram"]
+                endpoints[template] = {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "bytes": stats["bytes"],
+                    "mean_ms": round(stats["total_ms"] / stats["requests"], 3),
+                    "p50_ms": self._percentile(histogram, 0.50),
+                    "p95_ms": self._percentile(histogram, 0.95),
+                    "max_ms": round(stats["max_ms"], 3),
+                    "sources": dict(stats["sources"]),
+                    "histogram": {f"<={bound}ms": n for bound, n in zip(LATENCY_BUCKETS_MS, histogram) if n},
+                }
+                totals["requests"] += stats["requests"]
+                totals["network_requests"] += stats["sources"].get("network", 0) + stats["sources"].get("revalidated", 0)
+                totals["errors"] += stats["errors"]
+                totals["bytes"] += stats["bytes"]
+            return {"endpoints": endpoints, "totals": totals, "pagination": dict(self.pagination)}
+    
+    @staticmethod
+    def _percentile(histogram: List[int], q: float) -> float:
+        target, seen = q * sum(histogram), 0
+        for bound, n in zip(LATENCY_BUCKETS_MS, histogram):
+            seen += n
+            if n and seen >= target:
+                return bound
+        return 0
+
+
+# ============== RESILIENCE ==============
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling the API while the circuit breaker is open and nothing is cached."""
+
+
+@dataclass
+class RetryPolicy:
+    """Retry, rate limit and circuit breaker settings for Open5eClient."""
+    max_retries: int = 3  # Retries after the first attempt
+    backoff_base: float = 0.5  # Upper bound of the first retry delay in seconds; doubles per attempt
+    backoff_max: float = 30.0  # Cap on any single delay, including Retry-After
+    retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    rate_limit: Optional[float] = None  # Sustained requests per second; None disables the limiter
+    burst: int = 10  # Requests allowed back to back before the rate limit applies
+    failure_threshold: int = 5  # Consecutive failed requests that open the circuit
+    reset_timeout: float = 30.0  # Seconds the circuit stays open before a trial request
+    timeout: Optional[float] = None  # Per-request timeout in seconds
+    
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff: a random delay up to base * 2**attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`."""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Take a token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing API. After `threshold` consecutive failures the circuit opens and
+    requests are refused for `reset_timeout` seconds; then one trial request is let through
+    (half-open), and its outcome closes or re-opens the circuit.
+    """
+    
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                return True # The trial request
+            return False
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logger.warning(f"Open5e circuit opened after {self.failures} failures")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
 class Open5eClient:
     """Client for accessing the Open5e API."""
     
     BASE_URL = "https://api.open5e.com"
     
-    def __init__(self, base_url: Optional[str] = None):
+    def __init__(self, base_url: Optional[str] = None, cache: Optional[ResponseCache] = None,
+                 use_cache: bool = True, page_workers: int = 4, mirror: Optional["SRDMirror"] = None,
+                 pool_size: int = 10, retry: Optional[RetryPolicy] = None):
         """
         Initialize the Open5e API client.
         
         Args:
             base_url: Optional override for the API base URL
+            cache: Optional response cache; defaults to an in-memory ResponseCache.
+                Pass ResponseCache(store=SQLiteCacheStore(path)) to keep responses across runs.
+            use_cache: If False, every call goes to the API
+            page_workers: Pages fetched concurrently when paginating; 1 fetches them one by one
+            mirror: Optional local SRDMirror (see srd_mirror.py); synced resources are answered
+                from disk and anything it can't answer goes to the API
+            pool_size: Keep-alive connections kept per host
+            retry: Retry/backoff, rate limit and circuit breaker settings; defaults to RetryPolicy()
         """
         self.base_url = base_url or self.BASE_URL
         self.session = requests.Session()
+        self.page_workers = max(1, page_workers)
+        # At least one pooled connection per page worker, so concurrent pages don't wait on the pool
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(pool_size, self.page_workers))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache = (cache or ResponseCache()) if use_cache else None
+        self.mirror = mirror
+        self.retry = retry or RetryPolicy()
+        self.rate_limiter = TokenBucket(self.retry.rate_limit, self.retry.burst) if self.retry.rate_limit else None
+        self.breaker = CircuitBreaker(self.retry.failure_threshold, self.retry.reset_timeout)
+        self.metrics = ClientMetrics()
+        # Called with every request/retry/paginate event dict, e.g. to forward to a metrics backend
+        self.request_listeners: List[Callable[[JSONDict], None]] = []
+    
+    def _make_request(self, endpoint: str, params: Optional[JSONDict] = None,
+                      fields: Optional[Union[str, List[str]]] = None) -> JSONDict:
+        """
+        Make a GET request to the API, optionally projected down to a set of fields.
+        
+        The projection is sent as `fields=` (top-level names) for servers that support sparse
+        responses, and always applied client-side, so only the requested fields are returned.
+        The result is the caller's own copy: editing it doesn't touch the cache.
+        
+        Args:
+            endpoint: API endpoint to call
+            params: Query parameters to include; a "fields" entry works like the fields argument
+            fields: Field names, or dotted paths into nested objects (e.g. "school.name"),
+                as a list or comma-separated string
+            
+        Returns:
+            JSON response as a dictionary (for a list, every result is projected)
+            
+        Raises:
+            requests.RequestException: If the request fails
+        """
+        return copy.deepcopy(self._make_shared_request(endpoint, params, fields))
     
-    def _make_request(self, endpoint: str, params: Optional[JSONDict] = None) -> JSONDict:
+    def _make_shared_request(self, endpoint: str, params: Optional[JSONDict] = None,
+                             fields: Optional[Union[str, List[str]]] = None) -> JSONDict:
+        """_make_request without the copy: the result may be a cache entry, so it must not be mutated."""
+        if params and "fields" in params:
+            params = dict(params)
+            fields = params.pop("fields")
+        if not fields:
+            return self._fetch(endpoint, params)
+        if isinstance(fields, str):
+            fields = [name.strip() for name in fields.split(",") if name.strip()]
+        top_level = ",".join(dict.fromkeys(name.split(".")[0] for name in fields))
+        return project(self._fetch(endpoint, {**(params or {}), "fields": top_level}), fields)
+    
+    def _fetch(self, endpoint: str, params: Optional[JSONDict] = None) -> JSONDict:
+        """Run _fetch_from and record its latency, size and source."""
+        start = time.perf_counter()
+        try:
+            data, source, size = self._fetch_from(endpoint, params)
+        except requests.RequestException:
+            self._notify(self.metrics.record_request(endpoint, "error", time.perf_counter() - start, 0))
+            raise
+        self._notify(self.metrics.record_request(endpoint, source, time.perf_counter() - start, size))
+        return data
+    
+    def _fetch_from(self, endpoint: str, params: Optional[JSONDict] = None) -> Tuple[JSONDict, str, int]:
         """
-        Make a GET request to the API.
+        Make a GET request to the API, answering from the local mirror or the cache when possible.
+        
+        Fresh cached responses are returned without a request; stale ones are revalidated
+        with their ETag/Last-Modified validators. If the API is unavailable (open circuit,
+        or failure after retries) a stale cached response is returned instead.
         
         Args:
             endpoint: API endpoint to call
             params: Query parameters to include
             
         Returns:
-            JSON response as a dictionary
+            (response, source, bytes received); source is "network", "revalidated", "cache",
+            "mirror" or "stale"
             
         Raises:
             requests.RequestException: If the request fails
         """
+        if self.mirror is not None:
+            local = self.mirror.lookup(endpoint, params)
+            if local is not None:
+                return local, "mirror", 0
+        
         url = f"{self.base_url}{endpoint}"
+        key = cache_key(endpoint, params)
+        entry = None
+        headers = {}
+        if self.cache is not None:
+            entry, fresh = self.cache.lookup(key, endpoint)
+            if fresh:
+                return entry.data, "cache", 0
+            if entry is not None:
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
         
         try:
-            response = self.session.get(url, params=params)
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit open; not calling {url}")
+            response = self._send(url, params, headers)
+            if entry is not None and response.status_code == 304:
+                self.cache.revalidated(key, entry)
+                return entry.data, "revalidated", 0
             response.raise_for_status()
-            return response.json()
+            data = response.json()
         except requests.RequestException as e:
+            status = e.response.status_code if isinstance(e, requests.HTTPError) and e.response is not None else None
+            if entry is not None and (status is None or status in self.retry.retry_statuses):
+                logger.warning(f"API unavailable ({e}); serving cached {key}")
+                self.cache.served_stale()
+                return entry.data, "stale", 0
             logger.error(f"API request failed: {e}")
             raise
+        
+        if self.cache is not None:
+            self.cache.set(key, CacheEntry(data, time.time(), response.headers.get("ETag"),
+                                           response.headers.get("Last-Modified")))
+        return data, "network", len(response.content)
+    
+    def _notify(self, event: JSONDict) -> None:
+        for listener in self.request_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Request listener failed: {e}")
+    
+    def stats(self) -> JSONDict:
+        """
+        Instrumentation since the client was created (or reset_stats was called).
+        
+        Returns:
+            'endpoints' (per endpoint template: requests, errors, bytes, mean/p50/p95/max latency,
+            sources and latency histogram), 'totals', 'pagination' (calls, pages, max pages per
+            call), 'cache' (counters and hit_ratio) and 'circuit' (breaker state)
+        """
+        stats = self.metrics.snapshot()
+        if self.cache is not None:
+            cache = dict(self.cache.stats)
+            lookups = cache["hits"] + cache["misses"] + cache["stale"]
+            cache["hit_ratio"] = round((cache["hits"] + cache["revalidated"]) / lookups, 4) if lookups else 0.0
+            stats["cache"] = cache
+        stats["circuit"] = self.breaker.state
+        return stats
+    
+    def reset_stats(self) -> None:
+        """Zero the request instrumentation (cache counters are kept)."""
+        self.metrics.reset()
+    
+    def _send(self, url: str, params: Optional[JSONDict] = None,
+              headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        Send a GET, rate limited, retrying connection errors and retryable statuses.
+        
+        Retries wait for the Retry-After header if present, otherwise a jittered exponential
+        backoff. The outcome is reported to the circuit breaker.
+        
+        Args:
+            url: Full URL
+            params: Query parameters
+            headers: Extra request headers
+            
+        Returns:
+            The final response (which may still carry a retryable status once retries run out)
+            
+        Raises:
+            requests.RequestException: If the last attempt could not connect
+        """
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.retry.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.retry.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                delay, reason = self.retry.backoff(attempt), type(e).__name__
+            else:
+                if response.status_code not in self.retry.retry_statuses:
+                    self.breaker.record_success()
+                    return response
+                if attempt >= self.retry.max_retries:
+                    self.breaker.record_failure()
+                    return response
+                retry_after = _retry_after(response)
+                delay = min(self.retry.backoff_max, retry_after) if retry_after is not None else self.retry.backoff(attempt)
+                reason = f"HTTP {response.status_code}"
+            attempt += 1
+            self._notify(self.metrics.record_retry(url, reason))
+            logger.warning(f"{reason} from {url}; retry {attempt}/{self.retry.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
     
     def _is_paginated_response(self, response: JSONResponse) -> bool:
         """
@@ -71,6 +957,9 @@ class Open5eClient:
         """
         Fetch all pages of results for a paginated endpoint.
         
+        The first page gives the total count and page size; the remaining pages are then
+        fetched concurrently (up to page_workers at a time) and joined in page order.
+        
         Args:
             endpoint: API endpoint to call
             params: Query parameters to include
@@ -78,31 +967,112 @@ class Open5eClient:
         Returns:
             List of all results from all pages
         """
-        all_results = []
-        params = params or {}
+        params = dict(params or {})
         
         # Get first page
         response = self._make_request(endpoint, params)
         
-        if "results" in response:
-            all_results.extend(response["results"])
+        if "results" not in response:
+            # Not a paginated response
+            return [response]
+        
+        all_results = list(response["results"])
+        pages = self._page_numbers(response, params)
+        if pages is None:
+            return self._paginate_serially(endpoint, params, response, all_results)
+        
+        def fetch(page: int) -> List[JSONDict]:
+            return self._make_request(endpoint, {**params, "page": page})["results"]
+        
+        if self.page_workers == 1 or len(pages) <= 1:
+            for page in pages:
+                all_results.extend(fetch(page))
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.page_workers, len(pages))) as pool:
+                for results in pool.map(fetch, pages):
+                    all_results.extend(results)
+        self._notify(self.metrics.record_pagination(endpoint, 1 + len(pages)))
+        return all_results
+    
+    def _page_numbers(self, response: JSONDict, params: JSONDict) -> Optional[List[int]]:
+        """
+        Work out which pages remain after a first page.
+        
+        Args:
+            response: The first page
+            params: Query parameters it was fetched with
             
-            # Continue fetching pages if there are more
-            while response.get("next"):
-                # Parse the 'next' URL to get the page parameter
-                next_url = response["next"]
-                if "page=" in next_url:
-                    page_num = int(next_url.split("page=")[1].split("&")[0])
-                    params["page"] = page_num
-                    response = self._make_request(endpoint, params)
-                    all_results.extend(response["results"])
-                else:
-                    break
+        Returns:
+            The remaining page numbers, or None if they can't be derived from count and page size
+        """
+        next_url = response.get("next")
+        if not next_url:
+            return []
+        count, page_size = response.get("count"), len(response["results"])
+        if not isinstance(count, int) or not page_size or "page=" not in next_url:
+            return None
+        first = int(params.get("page", 1))
+        return list(range(first + 1, math.ceil(count / page_size) + 1))
+    
+    def _next_page(self, response: JSONDict) -> Optional[int]:
+        """Parse the page number out of a response's 'next' URL, or None on the last page."""
+        next_url = response.get("next")
+        if not next_url or "page=" not in next_url:
+            return None
+        return int(next_url.split("page=")[1].split("&")[0])
+    
+    def _paginate_serially(self, endpoint: str, params: JSONDict, response: JSONDict,
+                           all_results: List[JSONDict]) -> List[JSONDict]:
+        """Follow 'next' links one page at a time, for responses without a usable count."""
+        page, fetched = self._next_page(response), 1
+        while page is not None:
+            params["page"] = page
+            response = self._make_request(endpoint, params)
+            all_results.extend(response["results"])
+            page, fetched = self._next_page(response), fetched + 1
+        self._notify(self.metrics.record_pagination(endpoint, fetched))
+        return all_results
+    
+    def _iter_results(self, endpoint: str, params: Optional[JSONDict] = None,
+                      prefetch: bool = True) -> Iterator[JSONDict]:
+        """
+        Yield the results of a paginated endpoint page by page.
+        
+        While the caller works through one page, the next is fetched in the background, so
+        at most two pages are held in memory. Stopping early (break or close()) cancels the
+        prefetch.
+        
+        Args:
+            endpoint: API endpoint to call
+            params: Query parameters to include
+            prefetch: If False, each page is only requested once the previous one is consumed
             
-            return all_results
-        else:
+        Yields:
+            One result at a time, in API order
+        """
+        params = dict(params or {})
+        response = self._make_request(endpoint, params)
+        if "results" not in response:
             # Not a paginated response
-            return [response]
+            yield response
+            return
+        
+        pool = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            while True:
+                page = self._next_page(response)
+                pending = None
+                if page is not None:
+                    params["page"] = page
+                    if pool is not None:
+                        pending = pool.submit(self._make_request, endpoint, dict(params))
+                yield from response["results"]
+                if page is None:
+                    return
+                response = pending.result() if pending is not None else self._make_request(endpoint, params)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
     
     # ============== API ENDPOINTS ==============
       # === ABILITIES ===
@@ -135,6 +1105,10 @@ class Open5eClient:
         endpoint = f"/v2/abilities/{key}/"
         return self._make_request(endpoint)
     
+    def iter_abilities(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all abilities, fetching pages as they are consumed."""
+        return self._iter_results("/v2/abilities/", params)
+    
     # === ALIGNMENTS ===
     def get_alignments(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of alignments."""
@@ -148,6 +1122,10 @@ class Open5eClient:
         endpoint = f"/v2/alignments/{key}/"
         return self._make_request(endpoint)
     
+    def iter_alignments(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all alignments, fetching pages as they are consumed."""
+        return self._iter_results("/v2/alignments/", params)
+    
     # === ARMOR ===
     def get_armor(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of armor."""
@@ -161,6 +1139,10 @@ class Open5eClient:
         endpoint = f"/v2/armor/{key}/"
         return self._make_request(endpoint)
     
+    def iter_armor(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all armor, fetching pages as they are consumed."""
+        return self._iter_results("/v2/armor/", params)
+    
     # === BACKGROUNDS ===
     def get_backgrounds(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of backgrounds."""
@@ -174,6 +1156,10 @@ class Open5eClient:
         endpoint = f"/v2/backgrounds/{key}/"
         return self._make_request(endpoint)
     
+    def iter_backgrounds(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all backgrounds, fetching pages as they are consumed."""
+        return self._iter_results("/v2/backgrounds/", params)
+    
     # === CLASSES ===
     def get_classes(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of classes."""
@@ -187,6 +1173,10 @@ class Open5eClient:
         endpoint = f"/v2/classes/{key}/"
         return self._make_request(endpoint)
     
+    def iter_classes(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all classes, fetching pages as they are consumed."""
+        return self._iter_results("/v2/classes/", params)
+    
     # === CONDITIONS ===
     def get_conditions(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of conditions."""
@@ -200,6 +1190,10 @@ class Open5eClient:
         endpoint = f"/v2/conditions/{key}/"
         return self._make_request(endpoint)
     
+    def iter_conditions(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all conditions, fetching pages as they are consumed."""
+        return self._iter_results("/v2/conditions/", params)
+    
     # === CREATURES ===
     def get_creatures(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of creatures (monsters)."""
@@ -213,6 +1207,10 @@ class Open5eClient:
         endpoint = f"/v2/creatures/{key}/"
         return self._make_request(endpoint)
     
+    def iter_creatures(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all creatures (monsters), fetching pages as they are consumed."""
+        return self._iter_results("/v2/creatures/", params)
+    
     # === CREATURE SETS ===
     def get_creature_sets(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of creature sets."""
@@ -226,6 +1224,10 @@ class Open5eClient:
         endpoint = f"/v2/creaturesets/{key}/"
         return self._make_request(endpoint)
     
+    def iter_creature_sets(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all creature sets, fetching pages as they are consumed."""
+        return self._iter_results("/v2/creaturesets/", params)
+    
     # === CREATURE TYPES ===
     def get_creature_types(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of creature types."""
@@ -239,6 +1241,10 @@ class Open5eClient:
         endpoint = f"/v2/creaturetypes/{key}/"
         return self._make_request(endpoint)
     
+    def iter_creature_types(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all creature types, fetching pages as they are consumed."""
+        return self._iter_results("/v2/creaturetypes/", params)
+    
     # === DAMAGE TYPES ===
     def get_damage_types(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of damage types."""
@@ -252,6 +1258,10 @@ class Open5eClient:
         endpoint = f"/v2/damagetypes/{key}/"
         return self._make_request(endpoint)
     
+    def iter_damage_types(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all damage types, fetching pages as they are consumed."""
+        return self._iter_results("/v2/damagetypes/", params)
+    
     # === DOCUMENTS ===
     def get_documents(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of documents."""
@@ -265,6 +1275,10 @@ class Open5eClient:
         endpoint = f"/v2/documents/{key}/"
         return self._make_request(endpoint)
     
+    def iter_documents(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all documents, fetching pages as they are consumed."""
+        return self._iter_results("/v2/documents/", params)
+    
     # === ENVIRONMENTS ===
     def get_environments(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of environments."""
@@ -278,6 +1292,10 @@ class Open5eClient:
         endpoint = f"/v2/environments/{key}/"
         return self._make_request(endpoint)
     
+    def iter_environments(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all environments, fetching pages as they are consumed."""
+        return self._iter_results("/v2/environments/", params)
+    
     # === FEATS ===
     def get_feats(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of feats."""
@@ -291,6 +1309,10 @@ class Open5eClient:
         endpoint = f"/v2/feats/{key}/"
         return self._make_request(endpoint)
     
+    def iter_feats(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all feats, fetching pages as they are consumed."""
+        return self._iter_results("/v2/feats/", params)
+    
     # === GAME SYSTEMS ===
     def get_game_systems(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of game systems."""
@@ -304,6 +1326,10 @@ class Open5eClient:
         endpoint = f"/v2/gamesystems/{key}/"
         return self._make_request(endpoint)
     
+    def iter_game_systems(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all game systems, fetching pages as they are consumed."""
+        return self._iter_results("/v2/gamesystems/", params)
+    
     # === ITEMS ===
     def get_items(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of items."""
@@ -317,6 +1343,10 @@ class Open5eClient:
         endpoint = f"/v2/items/{key}/"
         return self._make_request(endpoint)
     
+    def iter_items(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all items, fetching pages as they are consumed."""
+        return self._iter_results("/v2/items/", params)
+    
     # === ITEM CATEGORIES ===
     def get_item_categories(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of item categories."""
@@ -330,6 +1360,10 @@ class Open5eClient:
         endpoint = f"/v2/itemcategories/{key}/"
         return self._make_request(endpoint)
     
+    def iter_item_categories(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all item categories, fetching pages as they are consumed."""
+        return self._iter_results("/v2/itemcategories/", params)
+    
     # === ITEM RARITIES ===
     def get_item_rarities(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of item rarities."""
@@ -343,6 +1377,10 @@ class Open5eClient:
         endpoint = f"/v2/itemrarities/{key}/"
         return self._make_request(endpoint)
     
+    def iter_item_rarities(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all item rarities, fetching pages as they are consumed."""
+        return self._iter_results("/v2/itemrarities/", params)
+    
     # === ITEM SETS ===
     def get_item_sets(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of item sets."""
@@ -356,6 +1394,10 @@ class Open5eClient:
         endpoint = f"/v2/itemsets/{key}/"
         return self._make_request(endpoint)
     
+    def iter_item_sets(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all item sets, fetching pages as they are consumed."""
+        return self._iter_results("/v2/itemsets/", params)
+    
     # === LANGUAGES ===
     def get_languages(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of languages."""
@@ -369,6 +1411,10 @@ class Open5eClient:
         endpoint = f"/v2/languages/{key}/"
         return self._make_request(endpoint)
     
+    def iter_languages(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all languages, fetching pages as they are consumed."""
+        return self._iter_results("/v2/languages/", params)
+    
     # === SIZES ===
     def get_sizes(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of creature sizes."""
@@ -382,6 +1428,10 @@ class Open5eClient:
         endpoint = f"/v2/sizes/{key}/"
         return self._make_request(endpoint)
     
+    def iter_sizes(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all creature sizes, fetching pages as they are consumed."""
+        return self._iter_results("/v2/sizes/", params)
+    
     # === SKILLS ===
     def get_skills(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of skills."""
@@ -395,6 +1445,10 @@ class Open5eClient:
         endpoint = f"/v2/skills/{key}/"
         return self._make_request(endpoint)
     
+    def iter_skills(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all skills, fetching pages as they are consumed."""
+        return self._iter_results("/v2/skills/", params)
+    
     # === SPECIES ===
     def get_species(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of species (races)."""
@@ -408,6 +1462,10 @@ class Open5eClient:
         endpoint = f"/v2/species/{key}/"
         return self._make_request(endpoint)
     
+    def iter_species(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all species (races), fetching pages as they are consumed."""
+        return self._iter_results("/v2/species/", params)
+    
     # === SPELLS ===
     def get_spells(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of spells."""
@@ -421,6 +1479,10 @@ class Open5eClient:
         endpoint = f"/v2/spells/{key}/"
         return self._make_request(endpoint)
     
+    def iter_spells(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all spells, fetching pages as they are consumed."""
+        return self._iter_results("/v2/spells/", params)
+    
     # === SPELL SCHOOLS ===
     def get_spell_schools(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of spell schools."""
@@ -434,6 +1496,10 @@ class Open5eClient:
         endpoint = f"/v2/spellschools/{key}/"
         return self._make_request(endpoint)
     
+    def iter_spell_schools(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all spell schools, fetching pages as they are consumed."""
+        return self._iter_results("/v2/spellschools/", params)
+    
     # === WEAPONS ===
     def get_weapons(self, params: Optional[JSONDict] = None, paginate: bool = False) -> JSONResponse:
         """Get a list of weapons."""
@@ -446,6 +1512,83 @@ class Open5eClient:
         """Get a specific weapon by key."""
         endpoint = f"/v2/weapons/{key}/"
         return self._make_request(endpoint)
+    
+    def iter_weapons(self, params: Optional[JSONDict] = None) -> Iterator[JSONDict]:
+        """Iterate over all weapons, fetching pages as they are consumed."""
+        return self._iter_results("/v2/weapons/", params)
+    
+    # === REFERENCES ===
+    def resolve_references(self, objects: JSONResponse, resources: Optional[List[str]] = None) -> JSONResponse:
+        """
+        Replace references to other resources (URLs like ".../v2/documents/srd/", or bare keys in
+        fields such as "school" or "damage_types") with the referenced objects. A bare "type" is
+        only a reference on a creature itself (an object whose "url" is a /v2/creatures/ URL).
+        
+        References across the whole result set are collected and de-duplicated first, then
+        fetched in one pass through the cache: small lookup resources (sizes, damage types,
+        documents, ...) as a single paginated list each, the rest key by key on page_workers
+        threads. Expanding 100 creatures therefore costs a handful of requests.
+        
+        Args:
+            objects: An object, a list of objects, or a page of results
+            resources: Only resolve references to these resources, e.g. ["documents", "sizes"]
+            
+        Returns:
+            A hydrated copy of objects; references that could not be fetched are left as they were
+        """
+        found: set = set()
+        _collect_references(objects, found)
+        if resources is not None:
+            found = {ref for ref in found if ref[0] in resources}
+        if not found:
+            return objects
+        
+        resolved: Dict[Tuple[str, str], JSONDict] = {}
+        by_resource: Dict[str, List[str]] = {}
+        for resource, key in found:
+            by_resource.setdefault(resource, []).append(key)
+        
+        def fetch_list(resource: str) -> None:
+            for item in self._paginate_results(f"/v2/{resource}/"):
+                if isinstance(item, dict) and "key" in item:
+                    resolved[(resource, str(item["key"]))] = item
+        
+        def fetch_one(ref: Tuple[str, str]) -> None:
+            resolved[ref] = self._make_request(f"/v2/{ref[0]}/{ref[1]}/")
+        
+        jobs = [(fetch_list, resource) for resource, keys in by_resource.items()
+                if resource in LOOKUP_RESOURCES and len(keys) > 1]
+        listed = {resource for _, resource in jobs}
+        jobs += [(fetch_one, ref) for ref in sorted(found) if ref[0] not in listed]
+        with ThreadPoolExecutor(max_workers=min(self.page_workers, len(jobs))) as pool:
+            futures = [(pool.submit(job, arg), arg) for job, arg in jobs]
+        for future, arg in futures:
+            if future.exception() is not None:
+                logger.warning(f"Could not resolve {arg}: {future.exception()}")
+        return _hydrate(objects, resolved)
+    
+    # === COMPACT MODELS ===
+    def get_creature_model(self, key: str) -> CreatureModel:
+        """Get a creature's combat stats (AC, HP, CR, attacks, saves) as a compact model."""
+        return CreatureModel.from_api(self._make_request(f"/v2/creatures/{key}/", fields=CREATURE_FIELDS))
+    
+    def get_creature_models(self, params: Optional[JSONDict] = None, paginate: bool = False) -> List[CreatureModel]:
+        """Get a list of creatures as compact models (the first page unless paginate)."""
+        params = {**(params or {}), "fields": CREATURE_FIELDS}
+        results = self._paginate_results("/v2/creatures/", params) if paginate else \
+            self._make_request("/v2/creatures/", params).get("results", [])
+        return [CreatureModel.from_api(result) for result in results]
+    
+    def get_spell_model(self, key: str) -> SpellModel:
+        """Get a spell's rules text and mechanics as a compact model."""
+        return SpellModel.from_api(self._make_request(f"/v2/spells/{key}/", fields=SPELL_FIELDS))
+    
+    def get_spell_models(self, params: Optional[JSONDict] = None, paginate: bool = False) -> List[SpellModel]:
+        """Get a list of spells as compact models (the first page unless paginate)."""
+        params = {**(params or {}), "fields": SPELL_FIELDS}
+        results = self._paginate_results("/v2/spells/", params) if paginate else \
+            self._make_request("/v2/spells/", params).get("results", [])
+        return [SpellModel.from_api(result) for result in results]
       # === SEARCH ===
     def search(self, query: str, params: Optional[JSONDict] = None) -> JSONDict:
         """
@@ -464,6 +1607,115 @@ class Open5eClient:
         return self._make_request(endpoint, params)
 
 
+class AsyncOpen5eClient:
+    """
+    asyncio front end for Open5eClient.
+    
+    Requests run on a bounded thread pool that shares one pooled requests.Session, the cache
+    and the mirror. Concurrent identical GETs are coalesced: while a request is in flight,
+    later callers await the same future instead of sending it again.
+    """
+    
+    def __init__(self, base_url: Optional[str] = None, max_connections: int = 10,
+                 cache: Optional[ResponseCache] = None, use_cache: bool = True,
+                 mirror: Optional["SRDMirror"] = None):
+        """
+        Initialize the async client.
+        
+        Args:
+            base_url: Optional override for the API base URL
+            max_connections: Requests in flight at once (and pooled keep-alive connections)
+            cache: Optional response cache; defaults to an in-memory ResponseCache
+            use_cache: If False, every call goes to the API
+            mirror: Optional local SRDMirror backend
+        """
+        self.max_connections = max(1, max_connections)
+        self.client = Open5eClient(base_url, cache, use_cache, page_workers=self.max_connections,
+                                   mirror=mirror, pool_size=self.max_connections)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="open5e")
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"requests": 0, "coalesced": 0}
+    
+    async def __aenter__(self) -> "AsyncOpen5eClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+    
+    async def request(self, endpoint: str, params: Optional[JSONDict] = None) -> JSONDict:
+        """
+        GET an endpoint, sharing the result with identical requests already in flight.
+        
+        Args:
+            endpoint: API endpoint to call
+            params: Query parameters to include
+            
+        Returns:
+            JSON response as a dictionary; the caller's own copy
+            
+        Raises:
+            requests.RequestException: If the request fails
+        """
+        key = cache_key(endpoint, params)
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, self.client._make_shared_request, endpoint,
+                                          dict(params) if params else None)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._in_flight.pop(key, None)
+                                     if self._in_flight.get(key) is done else None)
+            self.stats["requests"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        # Shielded, so one caller being cancelled doesn't cancel the request for the others.
+        # Every caller gets its own copy of the shared result.
+        return copy.deepcopy(await asyncio.shield(future))
+    
+    async def get(self, resource: str, key: str) -> JSONDict:
+        """Get one object, e.g. get("spells", "fireball")."""
+        return await self.request(f"/v2/{resource}/{key}/")
+    
+    async def get_list(self, resource: str, params: Optional[JSONDict] = None,
+                       paginate: bool = False) -> JSONResponse:
+        """Get a list resource, e.g. get_list("spells", {"level": 1}); paginate fetches all pages."""
+        endpoint = f"/v2/{resource}/"
+        if paginate:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.client._paginate_results, endpoint, params)
+        return await self.request(endpoint, params)
+    
+    async def search(self, query: str, params: Optional[JSONDict] = None) -> JSONDict:
+        """Search across all resources."""
+        return await self.request("/v2/search/", {**(params or {}), "search": query})
+    
+    async def get_many(self, resource: str, keys: List[str]) -> Dict[str, JSONDict]:
+        """
+        Fetch many objects of one resource concurrently.
+        
+        Args:
+            resource: Resource name, e.g. "creatures"
+            keys: Object keys; duplicates are fetched once
+            
+        Returns:
+            Dict[str, JSONDict]: Objects by key. Keys that failed to load are logged and left out.
+        """
+        unique = list(dict.fromkeys(keys))
+        results = await asyncio.gather(*(self.get(resource, key) for key in unique), return_exceptions=True)
+        found = {}
+        for key, result in zip(unique, results):
+            if isinstance(result, Exception):
+                logger.error(f"Could not load {resource}/{key}: {result}")
+            else:
+                found[key] = result
+        return found
+    
+    def close(self) -> None:
+        """Stop the worker threads and close pooled connections."""
+        self._executor.shutdown(wait=False)
+        self.client.session.close()
+
+
 # Example usage
 if __name__ == "__main__":
     client = Open5eClient()
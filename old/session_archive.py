@@ -0,0 +1,167 @@
+"""
+session_archive.py – compressed, indexed session archive for a campaign's /archive/ folder.
+
+Sessions are appended to segment files (segment_0001.gz, ...) as independent gzip members,
+SEGMENT_SESSIONS per segment. manifest.json indexes every session by number with its real
+and in-game date, location, segment, byte offset and length, and counts the members written to
+each segment, so appending never scans the index and any single session is read with one seek
+and one small decompress – the rest of the segment is never touched.
+
+Legacy session_N.json files stay readable; compact_legacy() moves them into segments.
+"""
+import gzip
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+import storage
+
+MANIFEST_FILE = "manifest.json"
+SEGMENT_SESSIONS = 50  # Sessions per segment file
+COMPRESS_LEVEL = 6
+
+_LEGACY_FILE = re.compile(r"^session_(\d+)\.json$")
+
+
+class SessionArchive:
+    """Append-only session archive with a manifest index. Safe to share between threads."""
+
+    def __init__(self, archive_path: str, segment_sessions: int = SEGMENT_SESSIONS):
+        """
+        Opens the archive in archive_path, creating the manifest on first use.
+        Args:
+            archive_path (str): The campaign's archive folder.
+            segment_sessions (int): Sessions per segment file for new segments.
+        """
+        self.path = archive_path
+        self.segment_sessions = segment_sessions
+        self._lock = threading.Lock()
+        os.makedirs(archive_path, exist_ok=True)
+        manifest_path = os.path.join(archive_path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            self._manifest = storage.read_json(manifest_path)
+        else: # First use: one scan to pick up legacy session files
+            self._manifest = {"version": 1, "codec": "gzip", "sessions": [], "legacy": self._scan_legacy()}
+        if "segments" not in self._manifest: # Manifests written before segment counts were kept
+            self._manifest["segments"] = {}
+            for entry in self._manifest["sessions"]:
+                self._manifest["segments"][entry["segment"]] = self._manifest["segments"].get(entry["segment"], 0) + 1
+        self._index = {entry["session"]: entry for entry in self._manifest["sessions"]}
+        self._highest = max(max(self._index, default=0), max(self._manifest["legacy"], default=0))
+
+    def _scan_legacy(self) -> List[int]:
+        numbers = []
+        for filename in os.listdir(self.path):
+            match = _LEGACY_FILE.match(filename)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _save_manifest(self) -> None:
+        storage.write_json(os.path.join(self.path, MANIFEST_FILE), self._manifest)
+
+    @property
+    def next_number(self) -> int:
+        """The number the next appended session gets."""
+        with self._lock:
+            return self._next_number()
+
+    def _next_number(self) -> int:
+        return self._highest + 1
+
+    def append(self, session_data: Dict[str, Any], number: Optional[int] = None) -> int:
+        """
+        Compresses a session onto the current segment and indexes it. The segment write is
+        fsynced before the manifest is replaced, so a crash can only leave unindexed bytes
+        at the end of a segment, never an index entry pointing at missing data.
+        Returns:
+            int: The session number.
+        """
+        member = gzip.compress(storage.encode_json(session_data), COMPRESS_LEVEL)
+        with self._lock:
+            if number is None:
+                number = self._next_number()
+            sessions, segments = self._manifest["sessions"], self._manifest["segments"]
+            last = next(reversed(segments), None) # Segments are kept in creation order
+            if last is not None and segments[last] < self.segment_sessions:
+                segment = last
+            else:
+                segment = f"segment_{int(last[8:12]) + 1 if last else 1:04d}.gz"
+            with open(os.path.join(self.path, segment), "ab") as f:
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            entry = {"session": number, "date": session_data.get("date"), "igDate": session_data.get("igStart"),
+                     "loc": session_data.get("loc"), "segment": segment, "offset": offset, "length": len(member)}
+            old = self._index.get(number)
+            if old is not None:
+                position = sessions.index(old)
+                del sessions[position] # Re-archived: the old bytes become dead space
+            sessions.append(entry)
+            segments[segment] = segments.get(segment, 0) + 1
+            self._index[number] = entry
+            try:
+                self._save_manifest()
+            except BaseException: # Keep memory in step with the manifest on disk
+                sessions.pop()
+                segments[segment] -= 1
+                if not segments[segment]:
+                    del segments[segment]
+                if old is not None:
+                    sessions.insert(position, old)
+                    self._index[number] = old
+                else:
+                    del self._index[number]
+                raise
+            self._highest = max(self._highest, number)
+        return number
+
+    def get(self, number: int) -> Optional[Dict[str, Any]]:
+        """Loads one session, or None if it isn't archived."""
+        with self._lock:
+            entry = self._index.get(number)
+            legacy = number in self._manifest["legacy"]
+        if entry is None:
+            if legacy:
+                return storage.read_json(os.path.join(self.path, f"session_{number}.json"))
+            return None
+        with open(os.path.join(self.path, entry["segment"]), "rb") as f:
+            f.seek(entry["offset"])
+            member = f.read(entry["length"])
+        return storage.decode_payload("json", gzip.decompress(member))
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        """Index entries (session, date, igDate, loc) for every archived session, oldest first."""
+        with self._lock:
+            entries = [{key: e[key] for key in ("session", "date", "igDate", "loc")} for e in self._manifest["sessions"]]
+            entries += [{"session": n, "date": None, "igDate": None, "loc": None}
+                        for n in self._manifest["legacy"] if n not in self._index]
+        return sorted(entries, key=lambda e: e["session"])
+
+    def compact_legacy(self) -> int:
+        """
+        Moves legacy session_N.json files into segments and deletes them once indexed.
+        Returns:
+            int: The number of sessions moved.
+        """
+        moved = 0
+        for number in list(self._manifest["legacy"]):
+            file_path = os.path.join(self.path, f"session_{number}.json")
+            if number not in self._index:
+                self.append(storage.read_json(file_path), number)
+            with self._lock:
+                self._manifest["legacy"].remove(number)
+                self._save_manifest()
+            os.remove(file_path)
+            moved += 1
+        return moved
+
+    def disk_usage(self) -> int:
+        """Bytes used by the manifest, segments and any legacy files."""
+        with self._lock:
+            names = {MANIFEST_FILE} | {e["segment"] for e in self._manifest["sessions"]}
+            names |= {f"session_{n}.json" for n in self._manifest["legacy"]}
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in names
+                   if os.path.exists(os.path.join(self.path, name)))
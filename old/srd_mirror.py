@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+srd_mirror.py – offline mirror of the Open5e v2 API in a local SQLite database.
+
+Sync once (and re-sync now and then), then let Open5eClient answer from disk:
+    python old/srd_mirror.py sync --db srd.db
+    python old/srd_mirror.py sync --db srd.db --resources spells creatures
+    python old/srd_mirror.py search --db srd.db "fire bal"
+
+    client = Open5eClient(mirror=SRDMirror("srd.db"))
+"""
+import argparse
+import bisect
+import difflib
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from open5eclient import JSONDict, Open5eClient, logger
+
+# Every /v2/ list resource the client knows
+RESOURCES = [
+    "abilities", "alignments", "armor", "backgrounds", "classes", "conditions", "creatures",
+    "creaturesets", "creaturetypes", "damagetypes", "documents", "environments", "feats",
+    "gamesystems", "items", "itemcategories", "itemrarities", "itemsets", "languages", "sizes",
+    "skills", "species", "spells", "spellschools", "weapons",
+]
+
+# Query parameters the local backend can answer: param -> (SQL condition, value converter)
+FILTERS = {
+    "key": ("key = ?", str),
+    "name": ("name = ? COLLATE NOCASE", str),
+    "name__icontains": ("name LIKE '%' || ? || '%'", str),
+    "level": ("level = ?", int),
+    "level__gte": ("level >= ?", int),
+    "level__lte": ("level <= ?", int),
+    "school__name": ("school = ? COLLATE NOCASE", str),
+    "school__key": ("school = ? COLLATE NOCASE", str),
+    "challenge_rating_decimal": ("challenge_rating = ?", float),
+    "challenge_rating_decimal__gte": ("challenge_rating >= ?", float),
+    "challenge_rating_decimal__lte": ("challenge_rating <= ?", float),
+    "document__key": ("document_key = ?", str),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    resource TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT,
+    level INTEGER,
+    challenge_rating REAL,
+    school TEXT,
+    document_key TEXT,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (resource, key)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_name ON documents (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_documents_level ON documents (resource, level);
+CREATE INDEX IF NOT EXISTS idx_documents_cr ON documents (resource, challenge_rating);
+CREATE INDEX IF NOT EXISTS idx_documents_school ON documents (resource, school COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS sync_pages (
+    resource TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    next_page INTEGER,
+    keys TEXT NOT NULL,
+    PRIMARY KEY (resource, page)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL,
+    count INTEGER NOT NULL
+);
+"""
+
+# Full-text index over names and descriptions; rowids match the documents table
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(name, body, tokenize = 'unicode61 remove_diacritics 2');
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_vocab USING fts5vocab(documents_fts, 'row');
+"""
+NAME_WEIGHT = 10.0  # bm25 weight of a name match relative to a description match
+FUZZY_CUTOFF = 0.75  # Minimum difflib similarity for a typo correction
+
+UPSERT = """
+INSERT INTO documents (resource, key, name, level, challenge_rating, school, document_key, content_hash, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resource, key) DO UPDATE SET
+    name = excluded.name, level = excluded.level, challenge_rating = excluded.challenge_rating,
+    school = excluded.school, document_key = excluded.document_key,
+    content_hash = excluded.content_hash, data = excluded.data
+"""
+
+
+def _search_text(value: Any) -> List[str]:
+    """Collects the prose of a document (descriptions, nested names) for the full-text index."""
+    if isinstance(value, str):
+        return [] if value.startswith("http") else [value]
+    if isinstance(value, dict):
+        return [text for k, v in value.items() if k not in ("key", "url") for text in _search_text(v)]
+    if isinstance(value, list):
+        return [text for item in value for text in _search_text(item)]
+    return []
+
+
+def _label(value: Any, field: str = "name") -> Optional[str]:
+    """Reads a name or key from a nested object, a resource URL, or a plain string."""
+    if isinstance(value, dict):
+        return value.get(field) or value.get("key")
+    if isinstance(value, str) and value:
+        return value.rstrip("/").rsplit("/", 1)[-1] if "/" in value else value
+    return None
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _row(resource: str, doc: JSONDict) -> Tuple[Any, ...]:
+    """The documents table row for one API object."""
+    data = json.dumps(doc, separators=(",", ":"), sort_keys=True)
+    level = doc.get("level")
+    return (
+        resource,
+        str(doc.get("key")),
+        doc.get("name"),
+        level if isinstance(level, int) else None,
+        _number(doc.get("challenge_rating_decimal", doc.get("challenge_rating"))),
+        _label(doc.get("school")),
+        _label(doc.get("document"), "key"),
+        hashlib.sha1(data.encode("utf-8")).hexdigest(),
+        data,
+    )
+
+
+class SRDMirror:
+    """Local SQLite copy of the Open5e v2 resources, usable as an Open5eClient backend."""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the mirror database.
+
+        Args:
+            path: Path of the SQLite file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self.synced = {row[0] for row in self._conn.execute("SELECT resource FROM sync_state")}
+        self._vocab: Optional[List[str]] = None
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite was built without FTS5; search falls back to name matching")
+            self.fts = False
+        if self.fts and self._conn.execute("SELECT count(*) FROM documents_fts").fetchone()[0] != \
+                self._conn.execute("SELECT count(*) FROM documents").fetchone()[0]:
+            self.rebuild_search_index()
+
+    # --- Sync ---
+    def sync(self, client: Open5eClient, resources: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Download resources into the mirror. Re-syncs are incremental: pages the API reports as
+        unchanged (304 via their stored ETag/Last-Modified) are skipped, and only documents whose
+        content changed are rewritten. Documents no longer listed are deleted.
+
+        Args:
+            client: Client whose base URL and session are used
+            resources: Resource names to sync (default: all of RESOURCES)
+
+        Returns:
+            Dict[str, Any]: Per-resource counts, plus 'errors' for resources that failed.
+        """
+        summary: Dict[str, Any] = {"errors": {}}
+        for resource in resources or RESOURCES:
+            try:
+                summary[resource] = self.sync_resource(client, resource)
+            except requests.RequestException as e:
+                logger.error(f"Syncing {resource} failed: {e}")
+                summary["errors"][resource] = str(e)
+        return summary
+
+    def sync_resource(self, client: Open5eClient, resource: str) -> Dict[str, int]:
+        """
+        Sync one resource page by page.
+
+        Returns:
+            Dict[str, int]: 'pages', 'unchanged_pages', 'written', 'deleted' and 'count'.
+
+        Raises:
+            requests.RequestException: If a page request fails; the mirror keeps its previous copy
+        """
+        url = f"{client.base_url}/v2/{resource}/"
+        with self._lock:
+            hashes = dict(self._conn.execute(
+                "SELECT key, content_hash FROM documents WHERE resource = ?", (resource,)))
+            validators = {row[0]: row[1:] for row in self._conn.execute(
+                "SELECT page, etag, last_modified, next_page, keys FROM sync_pages WHERE resource = ?",
+                (resource,))}
+
+        stats = {"pages": 0, "unchanged_pages": 0, "written": 0, "deleted": 0, "count": 0}
+        seen: set = set()
+        rows: List[Tuple[Any, ...]] = []
+        pages: List[Tuple[Any, ...]] = []
+        page: Optional[int] = 1
+        while page is not None:
+            known = validators.get(page)
+            headers = {}
+            if known and known[0]:
+                headers["If-None-Match"] = known[0]
+            if known and known[1]:
+                headers["If-Modified-Since"] = known[1]
+            response = client._send(url, {"page": page} if page > 1 else None, headers)
+            stats["pages"] += 1
+            if known and response.status_code == 304:
+                stats["unchanged_pages"] += 1
+                keys = json.loads(known[3])
+                seen.update(keys)
+                pages.append((resource, page, known[0], known[1], known[2], known[3]))
+                page = known[2]
+                continue
+            response.raise_for_status()
+            data = response.json()
+            results = data["results"] if "results" in data else [data]
+            keys = []
+            for doc in results:
+                row = _row(resource, doc)
+                keys.append(row[1])
+                if hashes.get(row[1]) != row[7]:
+                    rows.append(row)
+            seen.update(keys)
+            next_page = client._next_page(data) if "results" in data else None
+            pages.append((resource, page, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                          next_page, json.dumps(keys)))
+            page = next_page
+
+        removed = [(resource, key) for key in hashes if key not in seen]
+        with self._lock, self._conn:
+            if self.fts:
+                self._conn.executemany(
+                    "DELETE FROM documents_fts WHERE rowid = "
+                    "(SELECT rowid FROM documents WHERE resource = ? AND key = ?)", removed)
+            self._conn.executemany("DELETE FROM documents WHERE resource = ? AND key = ?", removed)
+            self._conn.executemany(UPSERT, rows)
+            if self.fts:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO documents_fts (rowid, name, body) "
+                    "SELECT rowid, ?, ? FROM documents WHERE resource = ? AND key = ?",
+                    [(row[2] or "", " ".join(_search_text(json.loads(row[8]))), row[0], row[1]) for row in rows])
+            self._conn.execute("DELETE FROM sync_pages WHERE resource = ?", (resource,))
+            self._conn.executemany("INSERT INTO sync_pages VALUES (?, ?, ?, ?, ?, ?)", pages)
+            self._conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                               (resource, time.time(), len(seen)))
+        self.synced.add(resource)
+        self._vocab = None
+        stats.update(written=len(rows), deleted=len(removed), count=len(seen))
+        return stats
+
+    # --- Queries ---
+    def get(self, resource: str, key: str) -> Optional[JSONDict]:
+        """Return one document by key, or None if it isn't mirrored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM documents WHERE resource = ? AND key = ?", (resource, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, resource: str, params: Optional[JSONDict] = None) -> Optional[List[JSONDict]]:
+        """
+        Return the documents of a resource matching simple API filters (see FILTERS).
+
+        Returns:
+            Optional[List[JSONDict]]: Matching documents ordered by key, or None if a parameter
+            can't be answered locally.
+        """
+        conditions, values = ["resource = ?"], [resource]
+        for param, value in (params or {}).items():
+            if value is None or param in ("page", "limit", "fields"):
+                continue
+            if param not in FILTERS:
+                return None
+            condition, convert = FILTERS[param]
+            try:
+                values.append(convert(value))
+            except (TypeError, ValueError):
+                return None
+            conditions.append(condition)
+        sql = f"SELECT data FROM documents WHERE {' AND '.join(conditions)} ORDER BY key"
+        with self._lock:
+            rows = self._conn.execute(sql, values).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def rebuild_search_index(self) -> None:
+        """Rebuild the full-text index from the mirrored documents."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents_fts")
+            rows = self._conn.execute("SELECT rowid, name, data FROM documents").fetchall()
+            self._conn.executemany(
+                "INSERT INTO documents_fts (rowid, name, body) VALUES (?, ?, ?)",
+                [(rowid, name or "", " ".join(_search_text(json.loads(data)))) for rowid, name, data in rows])
+        self._vocab = None
+
+    def search(self, query: str, resources: Optional[Iterable[str]] = None, limit: int = 50,
+               fuzzy: bool = True) -> List[JSONDict]:
+        """
+        Full-text search over names and descriptions, ranked by BM25 with name matches weighted
+        highest. Every word matches as a prefix ("fire bal" also finds "Fireball"); with fuzzy, words
+        that match nothing are swapped for the closest indexed words ("firebll" finds "Fireball").
+
+        Args:
+            query: Search words
+            resources: Only search these resources, e.g. ["spells", "creatures"]
+            limit: Maximum results
+            fuzzy: Correct words that match no indexed word
+
+        Returns:
+            List[JSONDict]: Entries shaped like /v2/search/ results, best match first.
+        """
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        if not self.fts:
+            return self._search_names(query, resources, limit)
+        alternatives = [self._fuzzy_terms(word) if fuzzy else [] for word in words]
+        match = " AND ".join(
+            "(" + " OR ".join([f'"{word}"*'] + [f'"{term}"' for term in terms]) + ")"
+            for word, terms in zip(words, alternatives))
+        if len(words) > 1:
+            match = f'({match}) OR "{"".join(words)}"*' # "fire bal" also matches "fireball"
+        sql = ("SELECT d.resource, d.key, d.name FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid "
+               "WHERE documents_fts MATCH ?")
+        values: List[Any] = [match]
+        if resources:
+            resources = list(resources)
+            sql += f" AND d.resource IN ({', '.join('?' * len(resources))})"
+            values.extend(resources)
+        sql += f" ORDER BY bm25(documents_fts, {NAME_WEIGHT}, 1.0) LIMIT ?"
+        values.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, values).fetchall()
+        return [{"object_name": name, "object_pk": key, "object_model": resource, "route": f"v2/{resource}/{key}/"}
+                for resource, key, name in rows]
+
+    def _fuzzy_terms(self, word: str) -> List[str]:
+        """Indexed words close to a word that isn't a prefix of any indexed word."""
+        if self._vocab is None:
+            with self._lock:
+                self._vocab = [row[0] for row in self._conn.execute("SELECT term FROM documents_vocab ORDER BY term")]
+        idx = bisect.bisect_left(self._vocab, word)
+        if idx < len(self._vocab) and self._vocab[idx].startswith(word):
+            return [] # The prefix match already finds it
+        candidates = [term for term in self._vocab if abs(len(term) - len(word)) <= 2 and term[0] == word[0]]
+        return difflib.get_close_matches(word, candidates, n=3, cutoff=FUZZY_CUTOFF)
+
+    def _search_names(self, query: str, resources: Optional[Iterable[str]], limit: int) -> List[JSONDict]:
+        """Name-only search for SQLite builds without FTS5, exact and prefix matches first."""
+        sql = "SELECT resource, key, name FROM documents WHERE name LIKE '%' || ? || '%'"
+        values: List[Any] = [query]
+        if resources:
+            resources = list(resources)
+            sql += f" AND resource IN ({', '.join('?' * len(resources))})"
+            values.extend(resources)
+        sql += (" ORDER BY (name = ? COLLATE NOCASE) DESC, (name LIKE ? || '%') DESC, length(name), name LIMIT ?")
+        values.extend([query, query, limit])
+        with self._lock:
+            rows = self._conn.execute(sql, values).fetchall()
+        return [{"object_name": name, "object_pk": key, "object_model": resource, "route": f"v2/{resource}/{key}/"}
+                for resource, key, name in rows]
+
+    def lookup(self, endpoint: str, params: Optional[JSONDict] = None) -> Optional[JSONDict]:
+        """
+        Answer an Open5eClient request from the mirror.
+
+        Args:
+            endpoint: API endpoint, e.g. "/v2/spells/" or "/v2/spells/fireball/"
+            params: Query parameters
+
+        Returns:
+            Optional[JSONDict]: The response, or None if the client should ask the API instead
+            (resource not synced, unsupported filter, or unknown key).
+        """
+        parts = [part for part in endpoint.split("/") if part]
+        if len(parts) < 2 or parts[0] != "v2":
+            return None
+        resource = parts[1]
+        params = dict(params or {})
+        if resource == "search":
+            query = params.pop("search", None)
+            if query is None or set(params) - {"page", "limit", "fields"} or not self.synced:
+                return None
+            results = self.search(str(query))
+        elif resource not in self.synced:
+            return None
+        elif len(parts) == 3:
+            return self.get(resource, parts[2])
+        else:
+            results = self.query(resource, params)
+            if results is None:
+                return None
+        if int(params.get("page", 1)) > 1:
+            results = [] # Everything is returned on the first page
+        return {"count": len(results), "next": None, "previous": None, "results": results}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Mirror the Open5e API into a local SQLite database.")
+    sub = p.add_subparsers(dest="command", required=True)
+    sync = sub.add_parser("sync", help="Download (or incrementally update) resources")
+    sync.add_argument("--db", default="srd.db", help="Mirror database path")
+    sync.add_argument("--resources", nargs="+", choices=RESOURCES, help="Resources to sync (default: all)")
+    sync.add_argument("--base-url", help="Override the API base URL")
+    search = sub.add_parser("search", help="Search the mirror")
+    search.add_argument("query", help="Search words")
+    search.add_argument("--db", default="srd.db", help="Mirror database path")
+    search.add_argument("--resources", nargs="+", choices=RESOURCES, help="Only search these resources")
+    search.add_argument("--limit", type=int, default=10, help="Maximum results")
+    args = p.parse_args()
+
+    mirror = SRDMirror(args.db)
+    if args.command == "search":
+        for result in mirror.search(args.query, args.resources, args.limit):
+            print(f"{result['object_model']:<16} {result['object_pk']:<40} {result['object_name']}")
+        mirror.close()
+        return
+    client = Open5eClient(args.base_url, use_cache=False)
+    start = time.perf_counter()
+    summary = mirror.sync(client, args.resources)
+    errors = summary.pop("errors")
+    for resource, stats in summary.items():
+        print(f"{resource:<16} {stats['count']:>6} documents, {stats['written']:>5} written, "
+              f"{stats['deleted']:>4} deleted, {stats['unchanged_pages']}/{stats['pages']} pages unchanged")
+    for resource, error in errors.items():
+        print(f"{resource:<16} FAILED: {error}")
+    print(f"Synced in {time.perf_counter() - start:.1f}s")
+    mirror.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+storage.py – crash-safe file storage for the "ChatGPT Table Top/<campaign>/{state,lore,archive}" tree.
+
+Every file is written to a temporary file in the same folder, fsynced and atomically renamed
+over the target, so a crash mid-save leaves either the old or the new file, never a truncated
+one. Files start with a one-line header carrying the payload format, length and SHA-256, so
+corruption from outside (partial copies, sync conflicts) is detected on load instead of being
+silently misread. Plain JSON files without a header still load.
+
+Payloads are JSON (stdlib, or orjson when installed) or msgpack when that package is installed
+and requested; the header's format field selects the decoder on load.
+"""
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+STORE_MAGIC = b"DNDSTORE1"  # Header: b"DNDSTORE1 <format> <length> <sha256>\n"
+AUTOSAVE_DELAY = 1.0  # Seconds a write-behind save waits for later saves to the same file
+
+
+class CorruptFileError(ValueError):
+    """A stored file's header doesn't match its contents."""
+
+
+def encode_record(payload: bytes, fmt: str = "json") -> bytes:
+    """Prefixes a payload with its checksummed header."""
+    digest = hashlib.sha256(payload).hexdigest()
+    return b"%s %s %d %s\n" % (STORE_MAGIC, fmt.encode("ascii"), len(payload), digest.encode("ascii")) + payload
+
+
+def decode_record(raw: bytes) -> Tuple[str, bytes]:
+    """
+    Splits a stored file into its format and verified payload.
+    Files without a header are returned as ("json", raw).
+    Raises:
+        CorruptFileError: If the length or checksum doesn't match the header.
+    """
+    if not raw.startswith(STORE_MAGIC + b" "):
+        return "json", raw
+    header, _, payload = raw.partition(b"\n")
+    try:
+        _, fmt, length, digest = header.decode("ascii").split(" ")
+        length = int(length)
+    except ValueError:
+        raise CorruptFileError("Unreadable storage header.")
+    if len(payload) != length:
+        raise CorruptFileError(f"Expected {length} bytes, found {len(payload)} (truncated file?).")
+    if hashlib.sha256(payload).hexdigest() != digest:
+        raise CorruptFileError("Checksum mismatch.")
+    return fmt, payload
+
+
+def atomic_write(file_path: str, data: bytes) -> None:
+    """
+    Replaces file_path with data atomically: write to a temp file in the same folder, fsync,
+    rename over the target, then fsync the folder so the rename itself survives a crash.
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if hasattr(os, "O_DIRECTORY"): # Folder fsync isn't available on Windows
+        dir_fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+# --- Serializers ---
+@dataclass(frozen=True)
+class Serializer:
+    """An encoder/decoder pair and the header format it writes."""
+    name: str
+    fmt: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+def _numpy_default(value: Any) -> Any:
+    """Converts numpy arrays and scalars (e.g. roll_many results) to lists and plain numbers."""
+    if hasattr(value, "ndim") and hasattr(value, "tolist"):
+        return value.tolist() if value.ndim else value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _stdlib_dumps(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":"), default=_numpy_default).encode("utf-8")
+
+
+SERIALIZERS: Dict[str, Serializer] = {"json": Serializer("json", "json", _stdlib_dumps, json.loads)}
+if orjson is not None:
+    # orjson writes plain JSON, so its files stay readable without it. OPT_NON_STR_KEYS matches
+    # the stdlib's handling of int keys; numpy values from the dice engine serialize as numbers
+    # (the default hook catches the arrays OPT_SERIALIZE_NUMPY rejects, e.g. non-contiguous ones).
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    SERIALIZERS["orjson"] = Serializer("orjson", "json",
+                                       lambda data: orjson.dumps(data, default=_numpy_default, option=_ORJSON_OPTS),
+                                       orjson.loads)
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = Serializer("msgpack", "msgpack",
+                                        lambda data: msgpack.packb(data, use_bin_type=True, default=_numpy_default),
+                                        lambda payload: msgpack.unpackb(payload, raw=False, strict_map_key=False))
+
+DEFAULT_SERIALIZER = "orjson" if "orjson" in SERIALIZERS else "json"
+# Loading picks the decoder from the header format; JSON goes through the fastest one installed
+DECODERS: Dict[str, Callable[[bytes], Any]] = {s.fmt: s.loads for s in SERIALIZERS.values() if s.fmt != "json"}
+DECODERS["json"] = SERIALIZERS[DEFAULT_SERIALIZER].loads
+
+
+def get_serializer(name: Optional[str] = None) -> Serializer:
+    """
+    Returns the named serializer, or the fastest available JSON one.
+    Raises:
+        ValueError: If the serializer is unknown or its package isn't installed.
+    """
+    name = name or DEFAULT_SERIALIZER
+    if name not in SERIALIZERS:
+        raise ValueError(f"Serializer '{name}' is not available (installed: {', '.join(SERIALIZERS)}).")
+    return SERIALIZERS[name]
+
+
+def decode_payload(fmt: str, payload: bytes) -> Any:
+    """
+    Decodes a verified payload by its header format.
+    Raises:
+        CorruptFileError: If the format is unknown or its package isn't installed.
+    """
+    if fmt not in DECODERS:
+        raise CorruptFileError(f"Unsupported storage format '{fmt}' (is its package installed?).")
+    return DECODERS[fmt](payload)
+
+
+def encode_json(data: Any) -> bytes:
+    """Minified JSON, through orjson when it is installed."""
+    return SERIALIZERS[DEFAULT_SERIALIZER].dumps(data)
+
+
+def encode(data: Any, serializer: Optional[str] = None) -> bytes:
+    """Encodes data with the named serializer and prefixes the checksummed header."""
+    chosen = get_serializer(serializer)
+    return encode_record(chosen.dumps(data), chosen.fmt)
+
+
+def write_json(file_path: str, data: Any, serializer: Optional[str] = None) -> None:
+    """Atomically saves data as minified, checksummed JSON (or another serializer's format)."""
+    atomic_write(file_path, encode(data, serializer))
+
+
+def read_json(file_path: str) -> Any:
+    """
+    Loads a file written by write_json (or a plain JSON file); the format is detected from
+    the header, so msgpack files load the same way.
+    Raises:
+        OSError, CorruptFileError, ValueError: If the file is missing, corrupt or undecodable.
+    """
+    with open(file_path, "rb") as f:
+        fmt, payload = decode_record(f.read())
+    return decode_payload(fmt, payload)
+
+
+class WriteBehindWriter:
+    """
+    Coalesces bursts of saves: each save replaces the pending payload for its file, and one
+    background flush writes the latest version of every pending file after `delay` seconds.
+    Data is encoded at save time, so later changes to the caller's objects don't leak in.
+    Pending saves are flushed at interpreter exit.
+    """
+
+    def __init__(self, delay: float = AUTOSAVE_DELAY):
+        self.delay = delay
+        self._pending: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.stats = {"saves": 0, "writes": 0, "errors": 0}
+        atexit.register(self.flush)
+
+    def save(self, file_path: str, data: Any, serializer: Optional[str] = None) -> None:
+        """Queues data to be written to file_path on the next flush."""
+        record = encode(data, serializer)
+        with self._lock:
+            self._pending[file_path] = record
+            self.stats["saves"] += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> bool:
+        """Writes every pending file now. Returns False if any write failed."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            ok = True
+            for file_path, record in pending.items():
+                try:
+                    atomic_write(file_path, record)
+                    self.stats["writes"] += 1
+                except Exception as e:
+                    print(f"Error saving JSON to {file_path}: {e}")
+                    self.stats["errors"] += 1
+                    ok = False
+                    with self._lock: # Keep it for the next flush unless a newer save replaced it
+                        self._pending.setdefault(file_path, record)
+            return ok
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
@@ -0,0 +1,97 @@
+"""The modules in old/ are flat scripts that import each other by name."""
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubAPI:
+    """
+    A local stand-in for the Open5e API. Every path answers 200 with a small JSON body, an ETag
+    and a Last-Modified date, and 304 when the request's validators match. Faults are scripted
+    per path and consumed in order:
+
+        stub.script("/v2/spells/fireball/", (503, {"Retry-After": "1"}), "drop", 200)
+
+    An int is a status (optionally with headers), "drop" closes the connection without a reply.
+    serve() replaces a path's default body, e.g. with a page of results.
+    """
+
+    LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+    def __init__(self):
+        self.etag = '"v1"'
+        self.requests: List[Dict[str, Any]] = []
+        self._scripts: Dict[str, deque] = defaultdict(deque)
+        self._bodies: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub._handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def script(self, path: str, *actions) -> None:
+        with self._lock:
+            self._scripts[path].extend(actions)
+
+    def serve(self, path: str, body: Any) -> None:
+        with self._lock:
+            self._bodies[path] = body
+
+    def hits(self, path: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [r for r in self.requests if path is None or r["path"] == path]
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        path = handler.path.split("?")[0]
+        with self._lock:
+            self.requests.append({"path": path, "query": handler.path.partition("?")[2],
+                                  "headers": dict(handler.headers), "at": time.monotonic()})
+            action = self._scripts[path].popleft() if self._scripts[path] else 200
+            payload = self._bodies.get(path, {"key": path.rstrip("/").split("/")[-1], "path": path})
+        if action == "drop":
+            handler.close_connection = True
+            return
+        status, headers = action if isinstance(action, tuple) else (action, {})
+        if status == 200 and handler.headers.get("If-None-Match") == self.etag:
+            status = 304
+        body = b"" if status == 304 else json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("ETag", self.etag)
+        handler.send_header("Last-Modified", self.LAST_MODIFIED)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_api():
+    stub = StubAPI()
+    yield stub
+    stub.close()
@@ -0,0 +1,67 @@
+import json
+
+from campaign_store import CampaignStore
+from session_archive import SessionArchive
+
+
+def test_import_reads_the_session_archive(tmp_path):
+    archive_path = tmp_path / "Camp" / "archive"
+    archive_path.mkdir(parents=True)
+    with open(archive_path / "session_1.json", "w") as f:
+        json.dump({"session": 1, "loc": "loc_old"}, f)
+    archive = SessionArchive(str(archive_path))
+    archive.append({"session": 2, "date": "2025-02-01", "loc": "loc_tidebreak"})
+    archive.append({"session": 3, "date": "2025-02-08", "loc": "loc_harbor"})
+    store = CampaignStore(str(tmp_path / "campaigns.db"))
+    assert store.import_folder(str(tmp_path / "Camp"))["sessions"] == 3
+    assert [s["session"] for s in store.sessions("Camp")] == [1, 2, 3]
+    assert store.get_session("Camp", 3) == {"session": 3, "date": "2025-02-08", "loc": "loc_harbor"}
+    assert store.get_session("Camp", 1) == {"session": 1, "loc": "loc_old"}
+    assert store.get_campaign("Camp")["lastSession"] == 3
+    store.close()
+
+
+NPCS = [{"id": "npc_vexa", "name": "Captain Vexa", "loc": "loc_tidebreak", "standing": "ally"},
+        {"id": "npc_orrin", "name": "Orrin", "loc": "loc_harbor"},
+        {"id": "npc_sable", "name": "Sable", "loc": "loc_tidebreak", "notes": ["Owes Vexa a ship"]}]
+
+
+def filled_store(path):
+    store = CampaignStore(path)
+    store.put_campaign("Camp", {"id": "camp_tides", "title": "Tides", "lastSession": 0, "players": []})
+    for npc in NPCS:
+        store.put_npc("Camp", npc)
+    store.put_character("Camp", {"id": "pc_arin", "player": "ana", "class": {"name": "Fighter", "lv": 3}})
+    store.put_live_session("Camp", {"session": 3, "loc": "loc_harbor"})
+    store.archive_session("Camp", {"session": 1, "loc": "loc_tidebreak"})
+    store.archive_session("Camp", {"session": 2, "loc": "loc_harbor"})
+    store.log_roll("Camp", "1d20+5", 17, "ana", 2, {"rolls": [12]}, "2025-02-01 20:00:00")
+    return store
+
+
+def snapshot(store):
+    return {"campaign": store.get_campaign("Camp"), "npcs": store.npcs("Camp"), "characters": store.characters("Camp"),
+            "live": store.get_live_session("Camp"), "sessions": store.sessions("Camp"), "rolls": store.rolls("Camp")}
+
+
+def test_export_and_import_round_trip(tmp_path):
+    source = filled_store(str(tmp_path / "source.db"))
+    exported = source.export_folder("Camp", str(tmp_path / "out"))
+    assert exported == {"campaign": 1, "characters": 1, "npcs": 3, "sessions": 2, "live": 1, "rolls": 1}
+    copy = CampaignStore(str(tmp_path / "copy.db"))
+    assert copy.import_folder(str(tmp_path / "out" / "Camp")) == exported
+    assert snapshot(copy) == snapshot(source)
+    assert copy.get_campaign("Camp")["lastSession"] == 2
+    source.close()
+    copy.close()
+
+
+def test_npcs_by_location_use_the_index(tmp_path):
+    store = filled_store(str(tmp_path / "campaigns.db"))
+    assert [npc["id"] for npc in store.npcs("Camp", loc="loc_tidebreak")] == ["npc_sable", "npc_vexa"]
+    assert store.npcs("Camp", loc="loc_tidebreak", name="sable") == [NPCS[2]]
+    assert store.npcs("Other", loc="loc_tidebreak") == []
+    plan = " ".join(row[-1] for row in store._query(
+        "EXPLAIN QUERY PLAN SELECT data FROM npcs WHERE campaign = ? AND loc = ? ORDER BY id", ("Camp", "loc_tidebreak")))
+    assert "idx_npcs_loc" in plan
+    store.close()
@@ -0,0 +1,63 @@
+import pytest
+
+from bot import DnDBot
+
+
+def test_initiative_order_keeps_dict_access():
+    dnd = DnDBot()
+    dnd.add_combatant("Arin", 18, 20)
+    dnd.add_combatant("Goblin", 10, 7, npc=True)
+    assert [c["name"] for c in dnd.initiative_order] == ["Arin", "Goblin"]
+    assert list(dnd.initiative_order) == dnd.get_initiative_order_details()
+    assert [c.name for c in dnd.combatants] == ["Arin", "Goblin"]
+
+
+def test_returned_details_are_snapshots():
+    dnd = DnDBot()
+    dnd.add_combatant("Goblin", 10, 7, npc=True)
+    dnd.get_combatant("Goblin")["current_hp"] = 1
+    assert dnd.get_combatant("Goblin")["current_hp"] == 7
+    dnd.set_hp("Goblin", 3)
+    assert dnd.get_combatant("Goblin")["current_hp"] == 3
+
+
+def test_initiative_order_entries_are_read_only():
+    dnd = DnDBot()
+    dnd.add_combatant("Goblin", 10, 7, npc=True)
+    with pytest.raises(TypeError):
+        dnd.initiative_order[0]["current_hp"] = 1
+    with pytest.raises(TypeError):
+        dnd.initiative_order[0] = {"name": "Ogre"}
+    assert dnd.initiative_order[0]["current_hp"] == 7
+
+
+def effect_names(dnd, name):
+    return [e["name"] for e in dnd.get_combatant(name)["status_effects"]]
+
+
+def test_effects_expire_at_the_start_or_end_of_the_anchors_turn():
+    dnd = DnDBot()
+    for name, initiative in (("Arin", 18), ("Goblin", 10), ("Orc", 5)):
+        dnd.add_combatant(name, initiative, 10)
+    dnd.add_status_effect("Arin", "Shield of Faith", ends="start_of_turn", anchor="Orc")
+    dnd.add_status_effect("Arin", "Frightened", ends="end_of_turn", anchor="Orc")
+    dnd.add_status_effect("Arin", "Blessed", duration_rounds=1)
+    assert dnd.next_turn() == "Goblin" and dnd.expired_effects == []
+    assert dnd.next_turn() == "Orc"
+    assert [e["effect"] for e in dnd.expired_effects] == ["Shield of Faith"]
+    assert effect_names(dnd, "Arin") == ["Frightened", "Blessed"]
+    assert dnd.next_turn() == "Arin" and dnd.combat_round == 2
+    assert [(e["effect"], e["ends"]) for e in dnd.expired_effects] == [("Frightened", "end_of_turn"), ("Blessed", "round")]
+    assert effect_names(dnd, "Arin") == []
+
+
+def test_anchor_that_already_acted_ends_the_effect_next_round():
+    dnd = DnDBot()
+    dnd.add_combatant("Arin", 18, 10)
+    dnd.add_combatant("Goblin", 10, 7, npc=True)
+    dnd.next_turn() # Goblin's turn: Arin has already acted this round
+    dnd.add_status_effect("Goblin", "Frightened", ends="end_of_turn", anchor="Arin")
+    dnd.next_turn()
+    assert effect_names(dnd, "Goblin") == ["Frightened"] # Arin's turn has only started
+    dnd.next_turn()
+    assert effect_names(dnd, "Goblin") == [] and dnd.expired_effects[0]["round"] == 2
@@ -0,0 +1,70 @@
+import pytest
+
+from bot import MAX_EXPLOSIONS, DnDBot
+
+
+@pytest.mark.parametrize("expression", ["4d6k0", "4d6kl0", "0d6kh", "4d6kh3", "4d6kl1", "3d6kh5", "2d20kl1+2"])
+def test_keep_rules_agree_across_engines(expression):
+    dnd = DnDBot()
+    odds = dnd.dice_odds(expression)
+    batch = dnd.roll_many([expression] * 200, seed=1)["totals"]
+    singles = [dnd.roll(expression)["total"] for _ in range(200)]
+    for totals in (batch.tolist(), singles):
+        assert odds["min"] <= min(totals) and max(totals) <= odds["max"]
+
+
+@pytest.mark.parametrize("expression", ["4d6k0", "0d6kh", "4d6kl0+3"])
+def test_zero_keep_keeps_no_dice(expression):
+    dnd = DnDBot()
+    modifier = 3 if expression.endswith("+3") else 0
+    assert dnd.roll(expression)["total"] == modifier
+    assert dnd.roll_many([expression] * 3, seed=1)["totals"].tolist() == [modifier] * 3
+    assert dnd.dice_odds(expression)["distribution"] == {modifier: 1.0}
+
+
+def exact(table, denominator):
+    return {total: round(count / denominator, 6) for total, count in table.items()}
+
+
+def test_dice_odds_matches_known_distributions():
+    dnd = DnDBot()
+    two_d6 = dnd.dice_odds("2d6")
+    assert two_d6["distribution"] == exact({t: 6 - abs(t - 7) for t in range(2, 13)}, 36)
+    assert (two_d6["min"], two_d6["max"], two_d6["mean"]) == (2, 12, 7.0)
+    counts = [1, 4, 10, 21, 38, 62, 91, 122, 148, 167, 172, 160, 131, 94, 54, 21] # 4d6, best 3, out of 1296
+    stats = dnd.dice_odds("4d6kh3", target=15)
+    assert stats["distribution"] == exact(dict(zip(range(3, 19), counts)), 1296)
+    assert stats["mean"] == round(15869 / 1296, 4)
+    assert stats["at_least"] == round(sum(counts[12:]) / 1296, 6)
+    advantage = dnd.dice_odds("1d20+2", advantage=True)
+    assert advantage["distribution"] == exact({face + 2: 2 * face - 1 for face in range(1, 21)}, 400)
+    disadvantage = dnd.dice_odds("1d20", disadvantage=True)
+    assert disadvantage["distribution"] == exact({face: 41 - 2 * face for face in range(1, 21)}, 400)
+
+
+def test_exploding_odds_report_the_roller_cap():
+    odds = DnDBot().dice_odds("1d6!")
+    assert odds["min"] == 1 and odds["max"] == 6 * (MAX_EXPLOSIONS + 1)
+    assert odds["explosion_cap"] == MAX_EXPLOSIONS and odds["mean"] == 4.2
+    distribution = odds["distribution"]
+    assert all(p > 0 for p in distribution.values())
+    assert not any(total % 6 == 0 for total in distribution) # A 6 always explodes
+    assert distribution[5] == round(1 / 6, 6) and distribution[7] == round(1 / 36, 6)
+    assert "explosion_cap" not in DnDBot().dice_odds("2d6")
+
+
+@pytest.mark.parametrize("expression", ["2d6+3", "4d6kl3-1", "2d6ro<2", "2d8r1", "-1d4+1d20", "3d6kh5"])
+def test_bounds_match_the_distribution_without_explosions(expression):
+    odds = DnDBot().dice_odds(expression)
+    assert (odds["min"], odds["max"]) == (min(odds["distribution"]), max(odds["distribution"]))
+
+
+def test_hit_chance_against_ac():
+    dnd = DnDBot()
+    assert dnd.hit_chance(5, 15) == {"hit": 0.55, "crit": 0.05, "miss": 0.45}
+    assert dnd.hit_chance(5, 15, advantage=True) == {"hit": 0.7975, "crit": 0.0975, "miss": 0.2025}
+    assert dnd.hit_chance(5, 15, disadvantage=True)["hit"] == round(0.55 ** 2, 6)
+    assert dnd.hit_chance(20, 5)["hit"] == 0.95 # A natural 1 still misses
+    assert dnd.hit_chance(0, 30) == {"hit": 0.05, "crit": 0.05, "miss": 0.95} # A natural 20 still hits
+    assert dnd.hit_chance(5, 15, crit_range=19)["crit"] == 0.1
+    assert dnd.expected_damage(5, 15, "1d8+3")["expected_damage"] == round(0.5 * 7.5 + 0.05 * 12, 4)
@@ -0,0 +1,45 @@
+import pytest
+
+import lazy_json
+import storage
+
+TRICKY = [{"id": "npc_vexa", "name": 'Vexa "the {Tide}" [II]', "notes": ["a, b: c", "back\\slash\\"]},
+          {"id": 'npc_"odd"\\', "name": "}]", "deeper": [{"x": [[{"y": "]"}]]}]},
+          {"name": "Orrin \\\"", "id": "npc_orrin"}]
+
+
+@pytest.mark.parametrize("chunk", [1, 3, lazy_json.SCAN_CHUNK]) # Tiny chunks split strings and escapes across passes
+def test_escaped_quotes_and_brackets_inside_strings(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(lazy_json, "SCAN_CHUNK", chunk)
+    path = str(tmp_path / "campaign.json")
+    campaign = {"title": 'The "{Sunken}" Crown, part [1]', "npcs": TRICKY, "quests": []}
+    storage.write_json(path, campaign)
+    with lazy_json.LazyJSONFile(path) as lazy:
+        assert lazy.find("npcs", "npc_vexa") == TRICKY[0]
+        assert lazy.find("npcs", 'npc_"odd"\\') == TRICKY[1]
+        assert lazy.find("npcs", "npc_orrin") == TRICKY[2]
+        assert lazy.count("npcs") == 3 and lazy["title"] == campaign["title"]
+        assert lazy.load() == campaign
+
+
+@pytest.mark.parametrize("text", ['{"npcs": [{"id": "npc_a"}', '{"title": "unterminated}', '{"npcs": [1, 2}'])
+def test_truncated_documents_are_rejected(tmp_path, text):
+    path = tmp_path / "broken.json"
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        lazy_json.LazyJSONFile(str(path))
+
+
+def test_templates_validate():
+    results = lazy_json.validate_templates()
+    assert results and all(errors == [] for errors in results.values())
+
+
+def test_lazy_file_finds_records(tmp_path):
+    path = str(tmp_path / "campaign.json")
+    npcs = [{"id": "npc_vexa", "name": 'Vexa "the Tide"'}, {"name": "Orrin", "id": "npc_orrin"}]
+    storage.write_json(path, {"id": "camp_test", "npcs": npcs, "quests": []})
+    with lazy_json.LazyJSONFile(path) as campaign:
+        assert campaign.find("npcs", "npc_vexa") == npcs[0]
+        assert campaign.find("npcs", "npc_orrin") == npcs[1]
+        assert campaign.ids("npcs") == ["npc_vexa", "npc_orrin"] and campaign.count("quests") == 0
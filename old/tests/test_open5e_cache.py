@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from open5eclient import AsyncOpen5eClient, Open5eClient, ResponseCache, SQLiteCacheStore
+
+SPELL = "/v2/spells/fireball/"
+CONDITION = "/v2/conditions/prone/"
+
+
+def test_ttl_is_per_resource(stub_api):
+    client = Open5eClient(base_url=stub_api.url, cache=ResponseCache(ttls={"conditions": 0.2}))
+    client.get_spell("fireball")
+    client.get_condition("prone")
+    time.sleep(0.3)
+    client.get_spell("fireball")
+    client.get_condition("prone")
+    assert len(stub_api.hits(SPELL)) == 1 # Spells are cached for a day
+    assert len(stub_api.hits(CONDITION)) == 2 # Expired, so revalidated
+    assert client.cache.stats["stale"] == 1
+
+
+def test_stale_entries_are_revalidated_and_refreshed_by_304(stub_api):
+    client = Open5eClient(base_url=stub_api.url, cache=ResponseCache(ttls={"spells": 0.2}))
+    first = client.get_spell("fireball")
+    time.sleep(0.3)
+    assert client.get_spell("fireball") == first
+    revalidation = stub_api.hits(SPELL)[-1]["headers"]
+    assert revalidation["If-None-Match"] == stub_api.etag
+    assert revalidation["If-Modified-Since"] == stub_api.LAST_MODIFIED
+    assert client.cache.stats["revalidated"] == 1
+    client.get_spell("fireball") # The 304 made the entry fresh again
+    assert len(stub_api.hits(SPELL)) == 2
+    assert client.stats()["endpoints"]["/v2/spells/{key}/"]["sources"] == {"network": 1, "revalidated": 1, "cache": 1}
+
+
+def test_changed_resource_replaces_the_entry(stub_api):
+    client = Open5eClient(base_url=stub_api.url, cache=ResponseCache(ttls={"spells": 0.0}))
+    client.get_spell("fireball")
+    stub_api.etag = '"v2"'
+    client.get_spell("fireball")
+    assert client.cache.stats["revalidated"] == 0 and client.cache.stats["stores"] == 2
+    assert client.cache.lookup("/v2/spells/fireball/", SPELL)[0].etag == '"v2"'
+
+
+def test_sqlite_store_persists_across_clients(stub_api, tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = Open5eClient(base_url=stub_api.url, cache=ResponseCache(store=SQLiteCacheStore(path)))
+    data = first.get_spell("fireball")
+    first.cache.store.close()
+    second = Open5eClient(base_url=stub_api.url, cache=ResponseCache(store=SQLiteCacheStore(path)))
+    assert second.get_spell("fireball") == data
+    assert len(stub_api.hits()) == 1
+    assert second.cache.stats["hits"] == 1 and second.cache.stats["misses"] == 0
+
+
+def test_hit_and_miss_counters(stub_api):
+    client = Open5eClient(base_url=stub_api.url)
+    client.get_spell("fireball")
+    client.get_spell("fireball")
+    client.get_spell("fireball")
+    client.get_condition("prone")
+    stats = client.stats()["cache"]
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (2, 2, 2)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_lru_evicts_least_recently_used(stub_api):
+    client = Open5eClient(base_url=stub_api.url, cache=ResponseCache(max_entries=2))
+    for key in ("fireball", "shield", "fireball", "sleep", "fireball"):
+        client.get_spell(key)
+    assert client.cache.stats["evictions"] == 1
+    assert len(stub_api.hits(SPELL)) == 1 # Kept by being used most recently
+
+
+def test_callers_get_their_own_copies(stub_api):
+    client = Open5eClient(base_url=stub_api.url)
+    first = client.get_spell("fireball") # From the network, and stored in the cache
+    first["key"] = "edited"
+    second = client.get_spell("fireball") # A cache hit
+    second["path"] = "edited"
+    assert client.get_spell("fireball") == {"key": "fireball", "path": SPELL}
+    assert client.get_spell("fireball") is not client.get_spell("fireball")
+
+
+def test_coalesced_async_callers_get_their_own_copies(stub_api):
+    async def fetch():
+        async with AsyncOpen5eClient(base_url=stub_api.url) as client:
+            results = await asyncio.gather(*(client.get("spells", "fireball") for _ in range(3)))
+            results[0]["key"] = "edited"
+            return results, await client.get("spells", "fireball"), client.stats
+    (first, second, third), later, stats = asyncio.run(fetch())
+    assert stats["coalesced"] >= 1
+    assert second == third == later == {"key": "fireball", "path": SPELL}
+    assert len({id(first), id(second), id(third), id(later)}) == 4
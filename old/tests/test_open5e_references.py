@@ -0,0 +1,22 @@
+from open5eclient import Open5eClient
+
+API = "https://api.open5e.com/v2"
+GOBLIN = {
+    "key": "srd_goblin", "url": f"{API}/creatures/srd_goblin/", "type": "humanoid", "size": "small",
+    "document": f"{API}/documents/srd/",
+    "actions": [{"name": "Scimitar", "type": "melee", "attacks": [{"damage_type": "slashing"}]}],
+}
+DAGGER = {"key": "srd_dagger", "url": f"{API}/weapons/srd_dagger/", "type": "simple"}
+
+
+def test_type_is_a_reference_only_on_the_creature_itself(stub_api):
+    client = Open5eClient(base_url=stub_api.url)
+    resolved = client.resolve_references([GOBLIN, DAGGER])
+    goblin, dagger = resolved
+    assert goblin["type"] == {"key": "humanoid", "path": "/v2/creaturetypes/humanoid/"}
+    assert goblin["size"]["key"] == "small" and goblin["document"]["key"] == "srd"
+    assert goblin["actions"][0]["type"] == "melee" # An action's type is not a creature type
+    assert goblin["actions"][0]["attacks"][0]["damage_type"]["key"] == "slashing"
+    assert dagger == DAGGER
+    fetched = {hit["path"] for hit in stub_api.hits()}
+    assert fetched == {"/v2/creaturetypes/humanoid/", "/v2/sizes/small/", "/v2/documents/srd/", "/v2/damagetypes/slashing/"}
@@ -0,0 +1,103 @@
+import random
+import time
+
+import pytest
+import requests
+
+from open5eclient import CircuitOpenError, Open5eClient, ResponseCache, RetryPolicy, TokenBucket
+
+SPELL = "/v2/spells/fireball/"
+
+
+def gaps(hits):
+    return [later["at"] - earlier["at"] for earlier, later in zip(hits, hits[1:])]
+
+
+def test_retry_after_sets_the_delay(stub_api):
+    stub_api.script(SPELL, (503, {"Retry-After": "0.3"}), (429, {"Retry-After": "0.2"}))
+    client = Open5eClient(base_url=stub_api.url, retry=RetryPolicy(backoff_base=10))
+    assert client.get_spell("fireball")["key"] == "fireball"
+    first, second = gaps(stub_api.hits(SPELL))
+    assert 0.3 <= first < 1 and 0.2 <= second < 1 # Not the 10s backoff
+    assert client.stats()["totals"]["retries"] == 2
+
+
+def test_retry_after_is_capped_by_backoff_max(stub_api):
+    stub_api.script(SPELL, (503, {"Retry-After": "120"}))
+    client = Open5eClient(base_url=stub_api.url, retry=RetryPolicy(backoff_max=0.1))
+    client.get_spell("fireball")
+    assert gaps(stub_api.hits(SPELL))[0] < 1
+
+
+def test_backoff_is_jittered_and_bounded(stub_api):
+    policy = RetryPolicy(backoff_base=0.5, backoff_max=3)
+    random.seed(5)
+    for attempt, bound in enumerate((0.5, 1, 2, 3, 3)):
+        delays = [policy.backoff(attempt) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= bound
+        assert max(delays) - min(delays) > bound / 2 # Spread out, not a fixed step
+    stub_api.script(SPELL, 503, 503, 503)
+    client = Open5eClient(base_url=stub_api.url, retry=RetryPolicy(backoff_base=0.05))
+    client.get_spell("fireball")
+    assert [gap < 0.05 * 2 ** attempt + 0.1 for attempt, gap in enumerate(gaps(stub_api.hits(SPELL)))] == [True] * 3
+
+
+def test_dropped_connections_are_retried(stub_api):
+    stub_api.script(SPELL, "drop", "drop")
+    client = Open5eClient(base_url=stub_api.url, retry=RetryPolicy(backoff_base=0.01))
+    assert client.get_spell("fireball")["key"] == "fireball"
+    assert len(stub_api.hits(SPELL)) == 3
+
+
+def test_dropped_connections_raise_once_retries_run_out(stub_api):
+    stub_api.script(SPELL, "drop", "drop")
+    client = Open5eClient(base_url=stub_api.url, retry=RetryPolicy(max_retries=1, backoff_base=0.01))
+    with pytest.raises(requests.ConnectionError):
+        client.get_spell("fireball")
+
+
+def test_open_circuit_falls_back_to_stale_cache(stub_api):
+    retry = RetryPolicy(max_retries=0, failure_threshold=2, reset_timeout=60)
+    client = Open5eClient(base_url=stub_api.url, cache=ResponseCache(ttls={"spells": 0.0}), retry=retry)
+    cached = client.get_spell("fireball")
+    stub_api.script(SPELL, 503, "drop")
+    assert client.get_spell("fireball") == cached # HTTP 503: first failure
+    assert client.stats()["circuit"] == "closed"
+    assert client.get_spell("fireball") == cached # Dropped connection: circuit opens
+    assert client.stats()["circuit"] == "open"
+    assert client.get_spell("fireball") == cached # Served without calling the API
+    assert len(stub_api.hits(SPELL)) == 3
+    assert client.cache.stats["fallbacks"] == 3
+    assert client.stats()["endpoints"]["/v2/spells/{key}/"]["sources"]["stale"] == 3
+    with pytest.raises(CircuitOpenError): # Nothing cached to fall back on
+        client.get_spell("shield")
+    assert stub_api.hits("/v2/spells/shield/") == []
+
+
+def test_circuit_closes_after_a_successful_trial(stub_api):
+    retry = RetryPolicy(max_retries=0, failure_threshold=1, reset_timeout=0.2)
+    client = Open5eClient(base_url=stub_api.url, cache=ResponseCache(ttls={"spells": 0.0}), retry=retry)
+    client.get_spell("fireball")
+    stub_api.script(SPELL, 503)
+    client.get_spell("fireball")
+    assert client.stats()["circuit"] == "open"
+    time.sleep(0.3)
+    client.get_spell("fireball") # The half-open trial gets a 304
+    assert client.stats()["circuit"] == "closed"
+
+
+def test_rate_limit_throttles_requests(stub_api):
+    client = Open5eClient(base_url=stub_api.url, use_cache=False, retry=RetryPolicy(rate_limit=20, burst=2))
+    for _ in range(6):
+        client.get_spell("fireball")
+    hits = stub_api.hits(SPELL)
+    assert hits[1]["at"] - hits[0]["at"] < 0.05 # The burst goes straight through
+    assert hits[-1]["at"] - hits[0]["at"] >= 4 / 20 - 0.01 # Then one request per 1/rate seconds
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    assert 10 / 50 - 0.01 <= time.monotonic() - start < 0.5
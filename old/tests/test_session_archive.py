@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+import storage
+from session_archive import MANIFEST_FILE, SessionArchive
+
+
+def session(number):
+    return {"session": number, "date": f"2025-01-{number:02d}", "igStart": f"Day {number}", "loc": "loc_tidebreak",
+            "scenes": [f"scene {number}"]}
+
+
+def test_random_access_across_segments(tmp_path):
+    archive = SessionArchive(str(tmp_path), segment_sessions=3)
+    for number in range(1, 8):
+        assert archive.append(session(number)) == number
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith(".gz")) == \
+        ["segment_0001.gz", "segment_0002.gz", "segment_0003.gz"]
+    reopened = SessionArchive(str(tmp_path), segment_sessions=3)
+    assert reopened.get(5) == session(5) and reopened.get(8) is None
+    assert reopened.next_number == 8
+    assert reopened.sessions()[0] == {"session": 1, "date": "2025-01-01", "igDate": "Day 1", "loc": "loc_tidebreak"}
+
+
+def test_rearchiving_replaces_the_session(tmp_path):
+    archive = SessionArchive(str(tmp_path))
+    archive.append(session(1))
+    archive.append(session(2))
+    archive.append({**session(1), "scenes": ["retold"]}, number=1)
+    assert archive.get(1)["scenes"] == ["retold"]
+    assert [e["session"] for e in SessionArchive(str(tmp_path)).sessions()] == [1, 2]
+
+
+def test_failed_manifest_save_keeps_the_old_entry(tmp_path, monkeypatch):
+    archive = SessionArchive(str(tmp_path))
+    archive.append(session(1))
+    def fail():
+        raise OSError("disk full")
+    monkeypatch.setattr(archive, "_save_manifest", fail)
+    with pytest.raises(OSError):
+        archive.append({**session(1), "scenes": ["lost"]}, number=1)
+    with pytest.raises(OSError):
+        archive.append(session(2))
+    assert archive.get(1) == session(1) and archive.get(2) is None
+    assert archive.sessions() == SessionArchive(str(tmp_path)).sessions()
+    monkeypatch.undo()
+    assert archive.append(session(2)) == 2 and archive.get(2) == session(2)
+
+
+def test_legacy_sessions_are_readable_and_compacted(tmp_path):
+    with open(tmp_path / "session_1.json", "w") as f:
+        json.dump(session(1), f)
+    storage.write_json(str(tmp_path / "session_2.json"), session(2))
+    archive = SessionArchive(str(tmp_path))
+    assert archive.next_number == 3 and archive.get(1) == session(1)
+    assert archive.compact_legacy() == 2
+    assert not any(f.startswith("session_") for f in os.listdir(tmp_path))
+    reopened = SessionArchive(str(tmp_path))
+    assert [reopened.get(n) for n in (1, 2)] == [session(1), session(2)]
+    assert reopened.next_number == 3
+
+
+def test_manifest_without_segment_counts_is_upgraded(tmp_path):
+    archive = SessionArchive(str(tmp_path), segment_sessions=2)
+    archive.append(session(1))
+    manifest = storage.read_json(str(tmp_path / MANIFEST_FILE))
+    del manifest["segments"]
+    storage.write_json(str(tmp_path / MANIFEST_FILE), manifest)
+    reopened = SessionArchive(str(tmp_path), segment_sessions=2)
+    reopened.append(session(2))
+    reopened.append(session(3))
+    assert [e["segment"] for e in storage.read_json(str(tmp_path / MANIFEST_FILE))["sessions"]] == \
+        ["segment_0001.gz", "segment_0001.gz", "segment_0002.gz"]
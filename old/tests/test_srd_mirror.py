@@ -0,0 +1,54 @@
+from open5eclient import Open5eClient
+from srd_mirror import SRDMirror
+
+SPELLS = [
+    {"key": "srd_fireball", "name": "Fireball", "level": 3, "school": {"name": "Evocation", "key": "evocation"},
+     "desc": "A bright streak flashes from your pointing finger and blossoms into an explosion of flame."},
+    {"key": "srd_fire-bolt", "name": "Fire Bolt", "level": 0, "school": {"name": "Evocation", "key": "evocation"},
+     "desc": "You hurl a mote of fire at a creature or object within range."},
+    {"key": "srd_shield", "name": "Shield", "level": 1, "school": {"name": "Abjuration", "key": "abjuration"},
+     "desc": "An invisible barrier of magical force appears and protects you."},
+]
+
+
+def synced_mirror(stub_api, tmp_path):
+    stub_api.serve("/v2/spells/", {"count": len(SPELLS), "next": None, "previous": None, "results": SPELLS})
+    mirror = SRDMirror(str(tmp_path / "srd.db"))
+    summary = mirror.sync(Open5eClient(base_url=stub_api.url, use_cache=False), ["spells"])
+    assert summary["spells"]["count"] == 3 and summary["errors"] == {}
+    return mirror
+
+
+def test_synced_lookups_are_answered_offline(stub_api, tmp_path):
+    synced_mirror(stub_api, tmp_path).close()
+    synced = len(stub_api.hits())
+    client = Open5eClient(base_url=stub_api.url, mirror=SRDMirror(str(tmp_path / "srd.db")), use_cache=False)
+    assert client.get_spell("srd_fireball") == SPELLS[0]
+    assert [s["key"] for s in client.get_spells({"level__lte": 1})["results"]] == ["srd_fire-bolt", "srd_shield"]
+    assert [s["key"] for s in client.get_spells({"school__name": "evocation"})["results"]] == ["srd_fire-bolt", "srd_fireball"]
+    assert len(stub_api.hits()) == synced # Nothing went to the API
+    client.get_creature("srd_goblin") # Not synced, so still fetched
+    assert len(stub_api.hits()) == synced + 1
+
+
+def keys(results):
+    return [r["object_pk"] for r in results]
+
+
+def test_search_ranks_prefixes_and_corrects_typos(stub_api, tmp_path):
+    mirror = synced_mirror(stub_api, tmp_path)
+    assert keys(mirror.search("fire bal", resources=["spells"]))[0] == "srd_fireball"
+    assert keys(mirror.search("firebll")) == ["srd_fireball"] # Typo corrected from the index vocabulary
+    assert keys(mirror.search("firebll", fuzzy=False)) == []
+    assert keys(mirror.search("fire")) == ["srd_fire-bolt", "srd_fireball"] # "Fire" in the name and the text first
+    assert keys(mirror.search("barrier")) == ["srd_shield"] # Descriptions are indexed too
+    assert keys(mirror.search("fire", resources=["creatures"])) == []
+
+
+def test_client_search_uses_the_mirror(stub_api, tmp_path):
+    mirror = synced_mirror(stub_api, tmp_path)
+    synced = len(stub_api.hits())
+    results = Open5eClient(base_url=stub_api.url, mirror=mirror, use_cache=False).search("shield")["results"]
+    assert results[0] == {"object_name": "Shield", "object_pk": "srd_shield", "object_model": "spells",
+                          "route": "v2/spells/srd_shield/"}
+    assert len(stub_api.hits()) == synced
@@ -0,0 +1,109 @@
+import json
+
+from bot import DnDBot
+
+
+def horde(size):
+    dnd = DnDBot()
+    dnd.add_group("Skeletons", 12, size, 13)
+    return dnd
+
+
+def delta_bytes(dnd, action):
+    version = dnd.state_version
+    action(dnd)
+    return len(json.dumps(dnd.get_state_delta(version)["ops"]))
+
+
+def test_group_hp_deltas_do_not_grow_with_horde_size():
+    for action in (lambda d: d.deal_damage("Skeletons", 5), lambda d: d.heal("Skeletons", 2),
+                   lambda d: d.damage_group("Skeletons", 4, members=[1, 3])):
+        assert delta_bytes(horde(5000), action) - delta_bytes(horde(10), action) < 10 # Only the HP total's digits
+
+
+def test_group_hp_ops_replay_and_undo():
+    dnd = horde(6)
+    start = dnd.get_full_state()
+    dnd.damage_group("Skeletons", [5, 20], members=[0, 4])
+    dnd.deal_damage("Skeletons", 3)
+    dnd.set_max_hp("Skeletons", 10)
+    dnd.set_hp("Skeletons", 9)
+    final = dnd.get_full_state()
+    replica = DnDBot()
+    assert replica.apply_delta(dnd.get_state_delta(0))
+    assert replica.get_full_state()["initiative_order"] == final["initiative_order"]
+    assert dnd.undo(4) == ["set_hp", "set_max_hp", "deal_damage", "damage_group"]
+    assert dnd.get_full_state()["initiative_order"] == start["initiative_order"]
+    dnd.redo(4)
+    assert dnd.get_full_state()["initiative_order"] == final["initiative_order"]
+
+
+def test_damage_group_hits_a_repeated_member_once():
+    dnd = horde(4)
+    result = dnd.damage_group("Skeletons", 5, members=[2, 2, 2])
+    assert result["targets"] == 1 and result["damage_dealt"] == 5
+    assert dnd.get_combatant("Skeletons")["member_hp"] == [13, 13, 8, 13]
+    assert "error" in dnd.damage_group("Skeletons", [1, 2], members=[1, 1])
+
+
+def test_apply_delta_is_all_or_nothing():
+    source = DnDBot()
+    source.add_combatant("Arin", 18, 20)
+    source.add_combatant("Goblin", 10, 7, npc=True)
+    target = DnDBot()
+    assert target.apply_delta(source.get_state_delta(0))
+    target.deal_damage("Arin", 4)
+    before = target.get_full_state()
+    version = source.state_version
+    source.deal_damage("Goblin", 3)
+    delta = source.get_state_delta(version)
+    delta["ops"] = [dict(op, v=op["v"] + 1) for op in delta["ops"]] # Continue from target's version
+    delta["ops"].append({"op": "hp", "name": "Nobody", "current_hp": 1, "max_hp": 1, "v": delta["ops"][-1]["v"] + 1})
+    assert target.apply_delta(delta) is False
+    assert target.get_full_state() == before
+    assert target.get_state_delta(0)["version"] == before["version"]
+    assert target.undo() == ["deal_damage"]
+
+
+def test_state_delta_ops_are_copies():
+    dnd = DnDBot()
+    dnd.add_combatant("Arin", 18, 20)
+    dnd.get_state_delta(0)["ops"][0]["combatant"]["name"] = "Changed"
+    assert dnd.get_state_delta(0)["ops"][0]["combatant"]["name"] == "Arin"
+
+
+def fight(dnd):
+    """Full state without the version, which undo and redo advance like any other change."""
+    return {k: v for k, v in dnd.get_full_state().items() if k != "version"}
+
+
+def test_undo_and_redo_across_remove_combatant():
+    dnd = DnDBot()
+    for name, initiative in (("Arin", 18), ("Goblin", 10), ("Orc", 5)):
+        dnd.add_combatant(name, initiative, 12)
+    dnd.next_turn()
+    dnd.deal_damage("Goblin", 5)
+    dnd.add_status_effect("Goblin", "Prone")
+    before = fight(dnd)
+    dnd.remove_combatant("Goblin") # The current combatant leaves
+    after = fight(dnd)
+    assert dnd.get_current_combatant_details()["name"] == "Orc"
+    assert dnd.undo() == ["remove_combatant"]
+    assert fight(dnd) == before
+    assert dnd.get_current_combatant_details()["name"] == "Goblin"
+    assert dnd.redo() == ["remove_combatant"]
+    assert fight(dnd) == after
+    assert dnd.undo(2) == ["remove_combatant", "add_status_effect"]
+    assert dnd.get_combatant("Goblin")["current_hp"] == 7 and dnd.get_combatant("Goblin")["status_effects"] == []
+
+
+def test_undo_brings_back_the_last_combatant_and_the_round():
+    dnd = DnDBot()
+    dnd.add_combatant("Arin", 18, 20)
+    dnd.next_turn()
+    dnd.next_turn()
+    before = fight(dnd)
+    dnd.remove_combatant("Arin")
+    assert dnd.combat_round == 0
+    dnd.undo()
+    assert fight(dnd) == before and dnd.combat_round == 3
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+import storage
+from bot import DnDBot
+
+
+@pytest.mark.parametrize("name", list(storage.SERIALIZERS))
+def test_serializers_encode_numpy_values(name, tmp_path):
+    rolls = DnDBot().roll_many(["1d20+5", "2d6kh1"] * 3, seed=7)
+    data = {"totals": rolls["totals"], "best": rolls["totals"].max(), "hit": np.bool_(True),
+            "strided": np.arange(6)[::2]}
+    path = str(tmp_path / "rolls.json")
+    storage.write_json(path, data, serializer=name)
+    assert storage.read_json(path) == {"totals": rolls["totals"].tolist(), "best": int(rolls["totals"].max()),
+                                       "hit": True, "strided": [0, 2, 4]}
+
+
+def test_stdlib_json_still_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        storage.SERIALIZERS["json"].dumps({"value": object()})
+
+
+def test_truncated_or_edited_files_are_rejected(tmp_path):
+    path = str(tmp_path / "state.json")
+    storage.write_json(path, {"round": 3, "names": ["Vexa", "Orrin"]})
+    with open(path, "rb") as f:
+        raw = f.read()
+    for damaged in (raw[:-4], raw.replace(b"Vexa", b"Vexy")):
+        with open(path, "wb") as f:
+            f.write(damaged)
+        with pytest.raises(storage.CorruptFileError):
+            storage.read_json(path)
+        assert DnDBot().load_json(path) is None
+
+
+def test_plain_json_files_still_load(tmp_path):
+    path = tmp_path / "legacy.json"
+    path.write_text('{"round": 3}')
+    assert DnDBot().load_json(str(path)) == {"round": 3}
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.json")
+    storage.write_json(path, {"round": 1})
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(storage.os, "replace", fail)
+    with pytest.raises(OSError):
+        storage.write_json(path, {"round": 2})
+    assert DnDBot().save_json(path, {"round": 3}) is False
+    monkeypatch.undo()
+    assert storage.read_json(path) == {"round": 1}
+    assert os.listdir(tmp_path) == ["state.json"] # No temp files left behind
+
+
+def test_write_behind_merges_saves_into_one_write(tmp_path):
+    writer = storage.WriteBehindWriter(delay=60)
+    path = str(tmp_path / "live.json")
+    for round_number in range(1, 6):
+        writer.save(path, {"round": round_number})
+    assert writer.pending == 1 and not os.path.exists(path)
+    assert writer.flush()
+    assert storage.read_json(path) == {"round": 5}
+    assert writer.stats == {"saves": 5, "writes": 1, "errors": 0}
+
+
+def test_write_behind_keeps_failed_writes_for_the_next_flush(tmp_path, monkeypatch):
+    writer = storage.WriteBehindWriter(delay=60)
+    path = str(tmp_path / "live.json")
+    writer.save(path, {"round": 1})
+    def fail(file_path, data):
+        raise OSError("disk full")
+    monkeypatch.setattr(storage, "atomic_write", fail)
+    assert writer.flush() is False
+    assert writer.pending == 1 and writer.stats["errors"] == 1
+    monkeypatch.undo()
+    assert writer.flush()
+    assert storage.read_json(path) == {"round": 1} and writer.pending == 0
+
+
+def test_newer_save_replaces_a_failed_one(tmp_path, monkeypatch):
+    writer = storage.WriteBehindWriter(delay=60)
+    path = str(tmp_path / "live.json")
+    writer.save(path, {"round": 1})
+    def save_during_failed_write(file_path, data): # A newer save arrives while the write fails
+        writer.save(path, {"round": 2})
+        raise OSError("disk full")
+    monkeypatch.setattr(storage, "atomic_write", save_during_failed_write)
+    assert writer.flush() is False
+    monkeypatch.undo()
+    assert writer.flush()
+    assert storage.read_json(path) == {"round": 2}